@@ -2,22 +2,32 @@ from pygame import color
 from ursina import *
 from ursina import lerp_angle
 from random import uniform
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from weather import Weather
+from camera_rig import CameraRig
+from collision import SpatialHash
+from profiler import FrameProfiler
+from config import Config
+import gamelog
 
 app = Ursina()
 
-SPEED = 5
-DASH_SPEED = 25
-DASH_TIME = 0.15
-DASH_COOLDOWN = 1.0
-JUMP_HEIGHT = 5
-GRAVITY = 9.8
-CAM_DIST = 10
-CAM_HEIGHT = 2
-MOUSE_SENS = 800
+gamelog.setup()
+log = gamelog.get('dragon')
+log_fireball = gamelog.get('fireball')
+
+# Настройки - в config.toml, правки применяются на лету
+config = Config().watch()
 
 Sky()
 ground = Entity(model='plane', scale=(100,0,100), collider='box')
 
+colliders = SpatialHash(cell_size=4)
+colliders.add(ground, static=True)
+
 class DragonBoss(Entity):
     def __init__(self, target=None, **kwargs):
         super().__init__(
@@ -30,50 +40,48 @@ class DragonBoss(Entity):
         self.target = target
         self.state = 'idle'
         self.in_fight = False
-        self.trigger_radius = 30
-        self.fly_height = 15
         self.attack_cooldown = 0
-        self.attack_interval = 3
 
         self.animation = 'stand'  # стартовая анимация
+        colliders.add(self)
 
     def play_anim(self, name):
         try:
             self.animation = name
-            print(f"▶️ Анимация: {name}")
+            log.debug("▶️ Анимация: %s", name)
         except Exception as e:
-            print(f"Не удалось запустить анимацию {name}: {e}")
+            log.error("Не удалось запустить анимацию %s: %s", name, e)
 
     def start_fight(self):
         if not self.in_fight:
             self.in_fight = True
             self.play_anim('run')
-            print("Босс проснулся!")
+            log.info("Босс проснулся!")
             invoke(self.fly_up, delay=0.5)
 
     def stop_fight(self):
         if self.in_fight:
-            print("Игрок ушёл — дракон возвращается в ожидание.")
+            log.info("Игрок ушёл — дракон возвращается в ожидание.")
             self.in_fight = False
             self.play_anim('stand')
             self.animate_y(2, duration=2, curve=curve.in_out_sine)
 
     def fly_up(self):
-        self.animate_y(self.fly_height, duration=3, curve=curve.out_cubic)
+        self.animate_y(config.dragon.fly_height, duration=3, curve=curve.out_cubic)
         invoke(self.start_attack, delay=3)
 
     def start_attack(self):
         if self.in_fight:
             self.state = 'attack'
             self.play_anim('skill01')
-            print("Дракон атакует!")
+            log.info("Дракон атакует!")
 
     def update(self):
         if not self.target:
             return
 
         dist = distance(self, self.target)
-        if dist <= self.trigger_radius:
+        if dist <= config.dragon.trigger_radius:
             if not self.in_fight:
                 self.start_fight()
         else:
@@ -86,7 +94,7 @@ class DragonBoss(Entity):
 
         dist = distance(self, self.target)
 
-        if dist <= self.trigger_radius:
+        if dist <= config.dragon.trigger_radius:
             if not self.in_fight:
                 self.start_fight()
         else:
@@ -98,23 +106,23 @@ class DragonBoss(Entity):
             self.attack_cooldown -= time.dt
             if self.attack_cooldown <= 0:
                 self.shoot_fireball()
-                self.attack_cooldown = self.attack_interval
+                self.attack_cooldown = config.dragon.attack_interval
 
     def shoot_fireball(self):
-        Fireball(position=self.position + Vec3(0, -1, 0), target=self.target)
+        Fireball(position=self.position + Vec3(0, -1, 0), target=self.target, owner=self)
 
 class Fireball(Entity):
-    def __init__(self, position, target=None, **kwargs):
+    def __init__(self, position, target=None, owner=None, **kwargs):
         super().__init__(
             model='sphere',
             color=color.orange,
             scale=0.6,
             position=position,
-            collider='sphere',
             **kwargs
         )
-        self.speed = 10
         self.target = target
+        self.owner = owner
+        self.radius = self.scale_x * 0.5
         self.tail_timer = 0
 
     def update(self):
@@ -126,17 +134,18 @@ class Fireball(Entity):
         else:
             direction = Vec3(0, -1, 0)
 
-        self.position += direction * time.dt * self.speed
+        start = self.position
+        self.position += direction * time.dt * config.fireball.speed
 
         self.tail_timer += time.dt
         if self.tail_timer > 0.03:
             self.create_tail()
             self.tail_timer = 0
 
-        hit_info = raycast(self.position, direction, distance=0.6, ignore=[self])
+        hit_info = colliders.sweep(start, self.position, self.radius, ignore=(self.owner,))
         if hit_info.hit:
             if self.target and hit_info.entity == self.target:
-                print("Игрок получил урон!")
+                log_fireball.info("Игрок получил урон!")
             self.explode()
             return
 
@@ -178,11 +187,9 @@ player = Entity(
     position=(0, 10, 0),
     collider='box'
 )
+colliders.add(player)
 
 mouse.locked = True
-camera.rotation_x = 15
-yaw = 0
-pitch = 15
 
 is_dashing = False
 dash_time = 0
@@ -195,23 +202,17 @@ is_grounded = False
 
 
 def update():
-    global yaw, pitch, is_dashing, dash_time, dash_cooldown, dash_dir, move
+    global is_dashing, dash_time, dash_cooldown, dash_dir, move
     global velocity_y, is_grounded
 
     dt = time.dt
 
     if mouse.locked:
-        yaw += mouse.velocity[0] * MOUSE_SENS * dt
-        pitch -= mouse.velocity[1] * MOUSE_SENS * dt
-        pitch = clamp(pitch, -10, 60)
+        sensitivity = config.camera.mouse_sensitivity * dt
+        camera_rig.aim(mouse.velocity[0] * sensitivity, -mouse.velocity[1] * sensitivity)
 
-    camera.rotation = Vec3(pitch, yaw, 0)
-    cam_target = player.position + Vec3(0, CAM_HEIGHT, 0)
-    camera.position = cam_target - camera.forward * CAM_DIST
-    camera.look_at(cam_target)
-
-    forward = Vec3(camera.forward.x, 0, camera.forward.z).normalized()
-    right = Vec3(camera.right.x, 0, camera.right.z).normalized()
+    camera_rig.update(dt)
+    forward, right = camera_rig.flat_forward, camera_rig.right
 
     move = Vec3(0, 0, 0)
     if held_keys['w']: move += forward
@@ -222,13 +223,13 @@ def update():
         move = move.normalized()
 
     if is_dashing:
-        player.position += dash_dir * DASH_SPEED * dt
+        player.position += dash_dir * config.player.dash_speed * dt
         dash_time -= dt
         if dash_time <= 0:
             is_dashing = False
-            dash_cooldown = DASH_COOLDOWN
+            dash_cooldown = config.player.dash_cooldown
     else:
-        player.position += move * SPEED * dt
+        player.position += move * config.player.speed * dt
         if dash_cooldown > 0:
             dash_cooldown -= dt
 
@@ -236,13 +237,13 @@ def update():
     is_grounded = ray.hit
 
     if not is_grounded:
-        velocity_y -= GRAVITY * dt
+        velocity_y -= config.player.gravity * dt
     else:
         velocity_y = max(0, velocity_y)
 
     player.position += Vec3(0, velocity_y * dt, 0)
 
-    player.rotation_y = lerp_angle(player.rotation_y, camera.rotation_y + 180, 8 * dt)
+    player.rotation_y = lerp_angle(player.rotation_y, camera_rig.yaw + 180, 8 * dt)
 
 
 def input(key):
@@ -256,58 +257,43 @@ def input(key):
         if move.length() > 0:
             dash_dir = move.normalized()
             is_dashing = True
-            dash_time = DASH_TIME
+            dash_time = config.player.dash_time
 
     if key == 'space' and is_grounded:
-        velocity_y = JUMP_HEIGHT
-
-dragon = DragonBoss(target = player, trigger_radius=50)
-
-snowflakes = []
-
-def spawn_snowflake():
-    flake = Entity(
-        model='quad',
-        color=color.rgb(240, 240, 255),
-        scale=0.03,
-        position=(uniform(-20, 20), uniform(5, 10), uniform(-20, 20)),
-        rotation=(uniform(0, 360), 0, 0),
-        billboard=True
-    )
-    snowflakes.append(flake)
-
-for i in range(100):
-    spawn_snowflake()
-
-def update_snow():
-    for flake in snowflakes:
-        flake.y -= time.dt * 1.5
-        flake.rotation_x += time.dt * 50
-        if flake.y < -1:
-            flake.y = uniform(5, 10)
-            flake.x = uniform(-20, 20)
-            flake.z = uniform(-20, 20)
+        velocity_y = config.player.jump_height
+
+dragon = DragonBoss(target=player)
+
+camera_rig = CameraRig(player, colliders=colliders, distance=config.camera.distance, height=config.camera.height,
+                       ignore=(player, dragon))
+
+
+@config.on_change
+def apply_config(config, changed):
+    if 'camera' in changed:
+        camera_rig.distance = config.camera.distance
+        camera_rig.height = config.camera.height
+
+snow = Weather('snow', count=2000, area=20)
+
+# F3 - оверлей профайлера, F4 - запись трассы
+profiler = FrameProfiler()
+profiler.time_entity(snow, 'snow')
 
 def update():
-    global yaw, pitch, is_dashing, dash_time, dash_cooldown, dash_dir, move
+    global is_dashing, dash_time, dash_cooldown, dash_dir, move
     global velocity_y, is_grounded
 
     dt = time.dt
-
-    update_snow()
+    config.apply_pending()
+    colliders.refresh()
 
     if mouse.locked:
-        yaw += mouse.velocity[0] * MOUSE_SENS * dt
-        pitch -= mouse.velocity[1] * MOUSE_SENS * dt
-        pitch = clamp(pitch, -10, 60)
-
-    camera.rotation = Vec3(pitch, yaw, 0)
-    cam_target = player.position + Vec3(0, CAM_HEIGHT, 0)
-    camera.position = cam_target - camera.forward * CAM_DIST
-    camera.look_at(cam_target)
+        sensitivity = config.camera.mouse_sensitivity * dt
+        camera_rig.aim(mouse.velocity[0] * sensitivity, -mouse.velocity[1] * sensitivity)
 
-    forward = Vec3(camera.forward.x, 0, camera.forward.z).normalized()
-    right = Vec3(camera.right.x, 0, camera.right.z).normalized()
+    camera_rig.update(dt)
+    forward, right = camera_rig.flat_forward, camera_rig.right
 
     move = Vec3(0, 0, 0)
     if held_keys['w']: move += forward
@@ -318,13 +304,13 @@ def update():
         move = move.normalized()
 
     if is_dashing:
-        player.position += dash_dir * DASH_SPEED * dt
+        player.position += dash_dir * config.player.dash_speed * dt
         dash_time -= dt
         if dash_time <= 0:
             is_dashing = False
-            dash_cooldown = DASH_COOLDOWN
+            dash_cooldown = config.player.dash_cooldown
     else:
-        player.position += move * SPEED * dt
+        player.position += move * config.player.speed * dt
         if dash_cooldown > 0:
             dash_cooldown -= dt
 
@@ -332,10 +318,10 @@ def update():
     is_grounded = ray.hit
 
     if not is_grounded:
-        velocity_y -= GRAVITY * dt
+        velocity_y -= config.player.gravity * dt
     else:
         velocity_y = max(0, velocity_y)
 
     player.position += Vec3(0, velocity_y * dt, 0)
-    player.rotation_y = lerp_angle(player.rotation_y, camera.rotation_y + 180, 8 * dt)
+    player.rotation_y = lerp_angle(player.rotation_y, camera_rig.yaw + 180, 8 * dt)
 app.run()
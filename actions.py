@@ -0,0 +1,221 @@
+from ursina import *
+from collections import deque
+from pathlib import Path
+import json
+
+import gamelog
+
+log = gamelog.get('input')
+
+RECORDING_VERSION = 1
+
+# Кнопки: действие -> клавиши (клавиатура и геймпад)
+DEFAULT_BUTTONS = {
+    'jump': ('space', 'gamepad a'),
+    'dash': ('q', 'gamepad b'),
+    'test_damage': ('f', 'gamepad y'),
+}
+
+# Оси: ось -> (клавиши "минус", клавиши "плюс", аналоговая ось из held_keys)
+DEFAULT_AXES = {
+    'move_x': (('a',), ('d',), 'gamepad left stick x'),
+    'move_y': (('s',), ('w',), 'gamepad left stick y'),
+}
+
+
+class ActionInput(Entity):
+    """Клавиши и оси геймпада -> именованные действия.
+
+    Нажатия не обрабатываются сразу, а копятся в очереди с номером тика и применяются в начале тика
+    симуляции (tick - система Simulation). Поэтому действие можно "запомнить" на несколько тиков
+    (буфер прыжка и рывка), а поток событий - записать и потом воспроизвести тик в тик.
+    """
+
+    def __init__(self, sim=None, buttons=DEFAULT_BUTTONS, axes=DEFAULT_AXES, **kwargs):
+        super().__init__(ignore_paused=True, eternal=True, **kwargs)
+        self.dt = sim.dt if sim is not None else 1 / 60
+        self.tick_count = 0             # номер следующего тика; им помечаются новые события
+
+        self._buttons = {}              # клавиша -> действие
+        for action, keys in buttons.items():
+            for key in keys:
+                self._buttons[key] = action
+        self._axis_keys = {}            # клавиша -> (ось, знак)
+        self._analog = {}               # имя аналоговой оси в held_keys -> ось
+        for axis, (negative, positive, analog) in axes.items():
+            for key in negative:
+                self._axis_keys[key] = (axis, -1)
+            for key in positive:
+                self._axis_keys[key] = (axis, 1)
+            if analog:
+                self._analog[analog] = axis
+
+        self._held = {}                 # нажатые клавиши -> действие или ось
+        self._axis_digital = dict.fromkeys(axes, 0)
+        self._axis_analog = dict.fromkeys(axes, 0.0)
+        self._values = {}               # значения из track() (например поворот камеры)
+        self._presses = {action: deque() for action in buttons}   # тики ещё не использованных нажатий
+        self._pending = deque()         # (тик, имя, значение) - ждут своего тика
+
+        self.recording = None           # список событий, если идёт запись
+        self._recording_start = 0
+        self._recording_state = None
+        self.replaying = False
+
+    # --- события ---
+
+    def input(self, key):
+        if self.replaying:
+            return
+        down = True
+        if key.endswith(' up'):
+            key, down = key[:-3], False
+        if key in self._buttons or key in self._axis_keys:     # остальные клавиши действиям не нужны
+            self._pending.append((self.tick_count, key, 1 if down else 0))
+
+    def _apply(self, name, value):
+        if name in self._analog:
+            self._axis_analog[self._analog[name]] = value
+            return
+        if name not in self._buttons and name not in self._axis_keys:
+            self._values[name] = value
+            return
+
+        if value:
+            if name in self._held:      # повтор без отпускания
+                return
+            if name in self._buttons:
+                action = self._buttons[name]
+                self._held[name] = action
+                self._presses[action].append(self.tick_count)
+            else:
+                axis, sign = self._axis_keys[name]
+                self._held[name] = axis
+                self._axis_digital[axis] += sign
+        elif name in self._held:
+            del self._held[name]
+            if name in self._axis_keys:
+                axis, sign = self._axis_keys[name]
+                self._axis_digital[axis] -= sign
+
+    def tick(self, dt=None):
+        """Применяет события, накопленные к этому тику (вызывать первым в тике)"""
+        pending = self._pending
+        while pending and pending[0][0] <= self.tick_count:
+            event = pending.popleft()
+            if self.recording is not None:
+                self.recording.append(event)
+            self._apply(event[1], event[2])
+
+        if not self.replaying:
+            # Аналоговые оси событий не присылают - записываем только изменения
+            for analog, axis in self._analog.items():
+                value = round(float(held_keys[analog]), 3)
+                if value != self._axis_analog[axis]:
+                    self._axis_analog[axis] = value
+                    if self.recording is not None:
+                        self.recording.append((self.tick_count, analog, value))
+        elif not pending:
+            self.replaying = False
+            log.info("⏹ Воспроизведение ввода закончено (тик %s)", self.tick_count)
+
+        self.tick_count += 1
+
+    # --- чтение в тике ---
+
+    def held(self, action):
+        return action in self._held.values()
+
+    def axis(self, name):
+        value = self._axis_digital[name] + self._axis_analog[name]
+        return -1.0 if value < -1 else 1.0 if value > 1 else float(value)
+
+    def track(self, name, value):
+        """Значение, которое не приходит событиями (например поворот камеры мышью).
+
+        При записи изменения попадают в поток событий, при воспроизведении значение берётся из записи.
+        """
+        if self.replaying:
+            return self._values.get(name, value)
+        if self._values.get(name) != value:
+            self._values[name] = value
+            if self.recording is not None:
+                self.recording.append((self.tick_count - 1, name, value))
+        return value
+
+    def consume(self, action, buffer_time=0.0):
+        """Было ли нажатие за последние buffer_time секунд; использованное нажатие снимается с буфера"""
+        presses = self._presses[action]
+        oldest = self.tick_count - 1 - round(buffer_time / self.dt)
+        while presses and presses[0] < oldest:
+            presses.popleft()
+        if presses:
+            presses.popleft()
+            return True
+        return False
+
+    def clear(self):
+        """Забывает ещё не использованные нажатия (например после перезапуска).
+
+        Нажатия кнопок, пришедшие на паузе и ещё не применённые, тоже снимаются; отпускания и оси
+        остаются, чтобы зажатые клавиши не залипли. При воспроизведении очередь - это запись, её не трогаем.
+        """
+        for presses in self._presses.values():
+            presses.clear()
+        if not self.replaying:
+            buttons = self._buttons
+            self._pending = deque(event for event in self._pending if not (event[2] and event[1] in buttons))
+
+    # --- запись и воспроизведение ---
+
+    def start_recording(self, state=None):
+        """Начинает запись; state - снимок мира, с которого её нужно воспроизводить"""
+        self.recording = []
+        self._recording_start = self.tick_count
+        self._recording_state = state
+        # Уже зажатые клавиши и наклон стиков - первыми событиями записи
+        for key in self._held:
+            self.recording.append((self.tick_count, key, 1))
+        for analog, axis in self._analog.items():
+            if self._axis_analog[axis]:
+                self.recording.append((self.tick_count, analog, self._axis_analog[axis]))
+        # Значения track() записываются при изменении - первое должно попасть в запись
+        self._values.clear()
+
+    def stop_recording(self, path=None):
+        """Заканчивает запись; возвращает её (и сохраняет в JSON, если указан path)"""
+        data = {
+            'version': RECORDING_VERSION,
+            'tick_rate': round(1 / self.dt),
+            'start_tick': self._recording_start,
+            'state': self._recording_state,
+            'events': [list(event) for event in self.recording],
+        }
+        self.recording = None
+        if path is not None:
+            Path(path).write_text(json.dumps(data), encoding='utf-8')
+        return data
+
+    def replay(self, recording):
+        """Подаёт записанные события вместо живого ввода (запись или путь к файлу).
+
+        Возвращает запись: её снимок мира ('state') восстанавливает вызывающий.
+        """
+        if not isinstance(recording, dict):
+            recording = json.loads(Path(recording).read_text(encoding='utf-8'))
+        if recording.get('version') != RECORDING_VERSION:
+            raise ValueError(f"Неподдерживаемая версия записи ввода: {recording.get('version')}")
+        if recording['tick_rate'] != round(1 / self.dt):
+            raise ValueError(f"Запись сделана при {recording['tick_rate']} тиках/с, а игра идёт при {round(1 / self.dt)}")
+        # Тики записи отсчитываются от её начала
+        offset = self.tick_count - recording['start_tick']
+        self.clear()
+        self._pending = deque((tick + offset, name, value) for tick, name, value in recording['events'])
+        self._held.clear()
+        self._axis_digital = dict.fromkeys(self._axis_digital, 0)
+        self._axis_analog = dict.fromkeys(self._axis_analog, 0.0)
+        self._values.clear()
+        self.replaying = True
+        log.info("▶️ Воспроизведение ввода: %s событий", len(self._pending))
+        return recording
+
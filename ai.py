@@ -0,0 +1,94 @@
+from ursina import *
+from collections import deque
+from time import perf_counter
+
+
+class AIScheduler:
+    """Планировщик ИИ существ: бой - каждый тик, остальные реже и в пределах бюджета времени"""
+
+    def __init__(self, focus=None, near_radius=60, near_interval=4, far_interval=15,
+                 budget_ms=2.0, history=120):
+        self.focus = focus                  # сущность (или функция, её возвращающая), от которой меряем дистанцию
+        self.near_radius = near_radius
+        self.near_interval = near_interval  # раз в сколько тиков думают существа рядом с игроком
+        self.far_interval = far_interval    # ... и далеко от него
+        self.budget_ms = budget_ms          # бюджет на всех, кто не в бою, за один тик
+        self.agents = []
+        self.tick_index = 0
+        self.stats = {'combat': 0, 'near': 0, 'far': 0, 'deferred': 0, 'ms': 0}
+        self.history = deque(maxlen=history)   # сколько агентов отработало в каждом тике
+        self._cursor = 0
+
+    def add(self, agent):
+        """Регистрирует существо с методом tick(dt); dt - время с его прошлого обновления"""
+        agent.ai_elapsed = 0
+        # Разносим первые обновления по разным тикам, чтобы все не думали одновременно
+        agent.ai_next_tick = self.tick_index + len(self.agents) % self.far_interval
+        self.agents.append(agent)
+        return agent
+
+    def remove(self, agent):
+        if agent in self.agents:
+            self.agents.remove(agent)
+
+    def clear(self):
+        self.agents.clear()
+
+    def _tier(self, agent, focus):
+        if getattr(agent, 'in_fight', False):
+            return 'combat'
+        if focus is not None and distance(agent, focus) <= self.near_radius:
+            return 'near'
+        return 'far'
+
+    def tick(self, dt):
+        self.tick_index += 1
+        if any(a.is_empty() for a in self.agents):
+            self.agents = [a for a in self.agents if not a.is_empty()]
+
+        focus = self.focus() if callable(self.focus) else self.focus
+        if focus is not None and focus.is_empty():
+            focus = None
+
+        stats = {'combat': 0, 'near': 0, 'far': 0, 'deferred': 0}
+        start = perf_counter()
+        budget = self.budget_ms / 1000
+        count = len(self.agents)
+
+        # Обход по кругу со сдвигом, чтобы при нехватке бюджета откладывались разные агенты
+        for i in range(count):
+            agent = self.agents[(self._cursor + i) % count]
+            if not agent.enabled:
+                agent.ai_elapsed = 0    # иначе после включения первый тик получит всё время простоя
+                continue
+            agent.ai_elapsed += dt
+
+            tier = self._tier(agent, focus)
+            if tier != 'combat':
+                if self.tick_index < agent.ai_next_tick:
+                    continue
+                if perf_counter() - start > budget:
+                    stats['deferred'] += 1
+                    continue
+                interval = self.near_interval if tier == 'near' else self.far_interval
+                agent.ai_next_tick = self.tick_index + interval
+
+            agent.tick(agent.ai_elapsed)
+            agent.ai_elapsed = 0
+            stats[tier] += 1
+
+        if count:
+            self._cursor = (self._cursor + 1) % count
+        stats['ms'] = (perf_counter() - start) * 1000
+        self.stats = stats
+        self.history.append(stats['combat'] + stats['near'] + stats['far'])
+
+    def summary(self):
+        """Сводка для отладки: агентов всего, сколько отработало в последнем тике и в среднем"""
+        history = self.history
+        return {
+            'agents': len(self.agents),
+            'last': dict(self.stats),
+            'avg_ran_per_tick': sum(history) / len(history) if history else 0,
+            'max_ran_per_tick': max(history) if history else 0,
+        }
@@ -0,0 +1,232 @@
+from ursina import *
+
+# Состояния дракона: какой клип играет, зациклен ли он, сколько длится плавный переход в него.
+# fallback - состояние, клип которого берётся, если у модели нет своего (например нет 'fly')
+DRAGON_STATES = {
+    'stand': dict(clip='stand', loop=True, blend=0.25),
+    'fly': dict(clip='fly', fallback='stand', loop=True, blend=0.4),
+    'skill01': dict(clip='skill01', fallback='stand', loop=True, blend=0.2),
+    'deaddown': dict(clip='deaddown', loop=False, blend=0.15),
+}
+
+# Разрешённые переходы; из смерти выйти нельзя
+DRAGON_TRANSITIONS = {
+    'stand': ('fly', 'skill01', 'deaddown'),
+    'fly': ('stand', 'skill01', 'deaddown'),
+    'skill01': ('stand', 'fly', 'deaddown'),
+    'deaddown': (),
+}
+
+
+class AnimationSet:
+    """Разобранная таблица состояний для одной модели: общая для всех её копий"""
+    _cache = {}
+
+    def __init__(self, clip_names, states, transitions):
+        self.clip_names = frozenset(clip_names)
+        self.states = states
+        self.transitions = {state: frozenset(targets) for state, targets in transitions.items()}
+        self.clips = {}         # состояние -> имя клипа в модели (или None)
+        for state in states:
+            self.clips[state] = self._resolve(state, set())
+
+    def _resolve(self, state, seen):
+        if state in seen or state not in self.states:
+            return None
+        seen.add(state)
+        spec = self.states[state]
+        if spec['clip'] in self.clip_names:
+            return spec['clip']
+        return self._resolve(spec.get('fallback'), seen)
+
+    @classmethod
+    def get(cls, model_name, clip_names, states=DRAGON_STATES, transitions=DRAGON_TRANSITIONS):
+        """Таблица для модели строится один раз, дальше берётся из кэша"""
+        key = (model_name, id(states), id(transitions))
+        animation_set = cls._cache.get(key)
+        if animation_set is None:
+            animation_set = cls._cache[key] = cls(clip_names, states, transitions)
+        return animation_set
+
+
+class AnimationStateMachine:
+    """Состояния анимации одного Actor: переходы по таблице и плавное смешивание клипов"""
+
+    def __init__(self, actor, animation_set, state='stand', owner=None):
+        self.actor = actor
+        self.set = animation_set
+        self.owner = owner          # сущность, по которой проверяется видимость (по умолчанию - сам actor)
+        self.state = None
+        self.paused = False         # вне экрана или слишком далеко: клипы остановлены
+        self._controls = {}         # имя клипа -> AnimControl этой копии модели
+        self._fading = []           # [клип, вес] - клипы, которые сейчас затухают
+        self._blend_time = 0
+        self._blend_elapsed = 0
+        self._t = 1.0               # вес текущего клипа в идущем переходе
+        actor.enableBlend()
+        self.request(state, blend=0)
+
+    def _control(self, clip):
+        control = self._controls.get(clip)
+        if control is None:
+            control = self._controls[clip] = self.actor.getAnimControl(clip)
+        return control
+
+    @property
+    def clip(self):
+        return self.set.clips.get(self.state)
+
+    def request(self, state, blend=None):
+        """Переходит в состояние; False, если переход запрещён или ничего не меняет"""
+        if state == self.state or state not in self.set.clips:
+            return False
+        if self.state is not None and state not in self.set.transitions.get(self.state, ()):
+            return False
+
+        old_clip = self.clip
+        self.state = state
+        new_clip = self.clip
+        if new_clip == old_clip:
+            return True     # то же самое движение (например клипа нет и берётся запасной) - не перезапускаем
+
+        spec = self.set.states[state]
+        blend = spec.get('blend', 0) if blend is None else blend
+
+        # Переход посреди другого перехода: затухание продолжается с текущих весов,
+        # а клип, который ещё не успел затухнуть, набирает вес с того же места
+        resumed = 0.0
+        for fade in self._fading:
+            fade[1] *= 1 - self._t
+            if fade[0] == new_clip:
+                resumed = fade[1]
+        if new_clip is not None:
+            control = self._control(new_clip)
+            self._fading = [f for f in self._fading if f[0] != new_clip]
+            if spec.get('loop', True):
+                control.loop(True)
+            else:
+                control.play()
+            if self.paused:
+                control.stop()
+
+        if old_clip is not None:
+            if blend > 0:
+                self._fading.append([old_clip, self._t])
+            else:
+                self._stop(old_clip)
+
+        self._blend_time = blend
+        self._blend_elapsed = resumed * blend
+        self._apply_weights(1.0 if blend <= 0 else resumed)
+        return True
+
+    def reset(self, state):
+        """Сразу ставит состояние без проверки переходов и смешивания (восстановление снимка)"""
+        for clip, weight in self._fading:
+            self._stop(clip)
+        self._fading.clear()
+        if self.clip is not None and self.set.clips.get(state) != self.clip:
+            self._stop(self.clip)
+        self.state = None
+        self._t = 1.0
+        self.request(state, blend=0)
+
+    def _stop(self, clip):
+        self.actor.setControlEffect(clip, 0)
+        self._control(clip).stop()
+
+    def _apply_weights(self, t):
+        self._t = t
+        clip = self.clip
+        if clip is not None:
+            self.actor.setControlEffect(clip, t)
+        for fade in self._fading:
+            self.actor.setControlEffect(fade[0], fade[1] * (1 - t))
+
+    def update(self, dt):
+        if not self._fading:
+            return
+        self._blend_elapsed += dt
+        t = min(self._blend_elapsed / self._blend_time, 1) if self._blend_time > 0 else 1
+        self._apply_weights(t)
+        if t >= 1:
+            for clip, weight in self._fading:
+                self._stop(clip)
+            self._fading.clear()
+
+    def set_paused(self, paused):
+        """Останавливает (или продолжает с того же кадра) все играющие клипы"""
+        if paused == self.paused:
+            return
+        self.paused = paused
+        clips = [self.clip] + [f[0] for f in self._fading]
+        for clip in clips:
+            if clip is None:
+                continue
+            control = self._control(clip)
+            if paused:
+                control.stop()
+            elif self.set.states[self.state].get('loop', True) or clip != self.clip:
+                control.loop(False)
+            elif control.getFrame() < control.getNumFrames() - 1:
+                control.play(control.getFrame(), control.getNumFrames() - 1)
+
+
+class AnimationSystem(Entity):
+    """Обновляет переходы всех автоматов и ставит на паузу анимации невидимых и далёких моделей.
+
+    visibility(machine) - своя проверка видимости (например CreatureLOD.is_visible) вместо расстояния и линзы.
+    """
+
+    def __init__(self, max_distance=120, check_interval=0.2, visibility=None, **kwargs):
+        super().__init__(eternal=True, **kwargs)
+        self.max_distance = max_distance        # дальше этого скиннинг не нужен - деталей не видно
+        self.check_interval = check_interval    # видимость проверяется реже, чем идут переходы
+        self.visibility = visibility
+        self.machines = []
+        self._check_timer = 0
+
+    def add(self, machine):
+        self.machines.append(machine)
+        return machine
+
+    def remove(self, machine):
+        if machine in self.machines:
+            self.machines.remove(machine)
+
+    @property
+    def paused_count(self):
+        return sum(1 for m in self.machines if m.paused)
+
+    def _is_visible(self, machine, lens_bounds):
+        node = machine.owner if machine.owner is not None else machine.actor
+        if distance(node.getPos(scene), camera.world_position) > self.max_distance:
+            return False
+        if lens_bounds is None:     # без окна (headless) линзы нет - судим только по расстоянию
+            return True
+        bounds = machine.actor.getBounds()
+        if bounds.isEmpty():
+            return True
+        bounds = bounds.makeCopy()
+        bounds.xform(machine.actor.getMat(application.base.cam))
+        return bool(lens_bounds.contains(bounds))
+
+    def update(self):
+        if any(m.actor.is_empty() for m in self.machines):
+            self.machines = [m for m in self.machines if not m.actor.is_empty()]
+
+        dt = time.dt
+        self._check_timer -= dt
+        if self._check_timer <= 0:
+            self._check_timer = self.check_interval
+            lens = getattr(camera, 'lens', None)
+            lens_bounds = lens.makeBounds() if lens is not None and application.base.cam else None
+            for machine in self.machines:
+                if self.visibility is not None:
+                    machine.set_paused(not self.visibility(machine))
+                else:
+                    machine.set_paused(not self._is_visible(machine, lens_bounds))
+
+        for machine in self.machines:
+            if not machine.paused:
+                machine.update(dt)
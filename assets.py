@@ -0,0 +1,120 @@
+from ursina import *
+from direct.actor.Actor import Actor
+from panda3d.core import Filename
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import hashlib
+import threading
+
+CACHE_FOLDER = Path(__file__).resolve().parent / '.cache' / 'models'
+
+
+class CachedModel:
+    """Загруженная модель и её таблица анимаций"""
+    __slots__ = ('name', 'model', 'anim_names', 'size')
+
+    def __init__(self, name, model, size):
+        self.name = name
+        self.model = model
+        self.anim_names = None
+        self.size = size
+
+
+class AssetManager:
+    """Кэш моделей GLB/glTF: фоновая загрузка, вытеснение по памяти и .bam-кэш на диске"""
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, cache_folder=CACHE_FOLDER, workers=1):
+        self.max_bytes = max_bytes
+        self.cache_folder = Path(cache_folder)
+        self.used_bytes = 0
+        self._entries = OrderedDict()   # имя -> CachedModel, в порядке последнего использования
+        self._pending = {}              # имя -> Future фоновой загрузки
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='assets')
+
+    def preload(self, *names):
+        """Ставит модели в очередь фоновой загрузки"""
+        for name in names:
+            self._request(name)
+
+    def is_loaded(self, name):
+        with self._lock:
+            return name in self._entries
+
+    def get(self, name):
+        """Возвращает загруженную модель (ждёт фоновую загрузку, если она ещё идёт)"""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry:
+                self._entries.move_to_end(name)
+                return entry
+        return self._request(name).result()
+
+    def actor(self, name):
+        """Создаёт Actor - собственную копию закэшированной модели со всеми анимациями"""
+        entry = self.get(name)
+        actor = Actor(entry.model)
+        if entry.anim_names is None:
+            entry.anim_names = tuple(actor.getAnimNames())
+        return actor
+
+    def anim_names(self, name):
+        entry = self.get(name)
+        if entry.anim_names is None:
+            self.actor(name).cleanup()
+        return entry.anim_names
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.used_bytes = 0
+
+    def _request(self, name):
+        with self._lock:
+            future = self._pending.get(name)
+            if future is None:
+                future = self._executor.submit(self._load, name)
+                self._pending[name] = future
+            return future
+
+    def _load(self, name):
+        """Загружает модель в рабочем потоке: сначала из .bam-кэша, иначе парсит glTF"""
+        try:
+            path = Path(application.asset_folder) / name
+            data = path.read_bytes()
+            digest = hashlib.sha1(data).hexdigest()[:16]
+            bam_path = self.cache_folder / f'{path.stem}-{digest}.bam'
+
+            model = None
+            if bam_path.exists():
+                model = self._load_file(bam_path)
+            if not model:
+                model = self._load_file(path)
+                if not model:
+                    raise IOError(f'Не удалось загрузить модель {name}')
+                self.cache_folder.mkdir(parents=True, exist_ok=True)
+                model.writeBamFile(Filename.fromOsSpecific(str(bam_path)))
+
+            size = bam_path.stat().st_size if bam_path.exists() else len(data)
+            entry = CachedModel(name, model, size)
+            with self._lock:
+                self._entries[name] = entry
+                self.used_bytes += size
+                self._evict()
+            return entry
+        finally:
+            with self._lock:
+                self._pending.pop(name, None)
+
+    def _load_file(self, path):
+        try:
+            return application.base.loader.loadModel(Filename.fromOsSpecific(str(path)), noCache=True)
+        except Exception:
+            return None
+
+    def _evict(self):
+        # Самые давно использованные модели выгружаются первыми, последняя остаётся всегда
+        while self.used_bytes > self.max_bytes and len(self._entries) > 1:
+            name, entry = self._entries.popitem(last=False)
+            self.used_bytes -= entry.size
@@ -0,0 +1,348 @@
+from ursina import *
+from panda3d.core import LVecBase4f, OmniBoundingVolume, PTA_LVecBase3f, PTA_LVecBase4f
+from time import perf_counter
+import numpy as np
+
+from particles import QUAD_CORNERS, QUAD_UVS, VERTEX_FORMAT, VERTEX_SIZE, quad_indices, upload_billboards
+
+# Вершинный шейдер с аппаратным инстансингом: позиция, поворот, масштаб и цвет - из массивов по gl_InstanceID
+INSTANCING_VERTEX = '''#version 140
+uniform mat4 p3d_ModelViewProjectionMatrix;
+in vec4 p3d_Vertex;
+in vec2 p3d_MultiTexCoord0;
+out vec2 texcoords;
+out vec4 instance_color;
+
+uniform vec3 instance_positions[{count}];
+uniform vec4 instance_rotations[{count}];
+uniform vec3 instance_scales[{count}];
+uniform vec4 instance_colors[{count}];
+
+void main() {{
+    vec3 v = p3d_Vertex.xyz * instance_scales[gl_InstanceID];
+    vec4 q = instance_rotations[gl_InstanceID];
+    v = v + 2.0 * cross(q.xyz, cross(q.xyz, v) + q.w * v);
+    gl_Position = p3d_ModelViewProjectionMatrix * vec4(v + instance_positions[gl_InstanceID], 1.0);
+    texcoords = p3d_MultiTexCoord0;
+    instance_color = instance_colors[gl_InstanceID];
+}}
+'''
+
+INSTANCING_FRAGMENT = '''#version 140
+uniform sampler2D p3d_Texture0;
+uniform vec4 p3d_ColorScale;
+in vec2 texcoords;
+in vec4 instance_color;
+out vec4 fragColor;
+
+void main() {
+    fragColor = texture(p3d_Texture0, texcoords) * p3d_ColorScale * instance_color;
+}
+'''
+
+
+def geom_count(node):
+    """Сколько Geom (= вызовов отрисовки без учёта отсечения) в видимой части поддерева"""
+    total = 0
+    for path in node.findAllMatches('**/+GeomNode'):      # спрятанные через stash() сюда не попадают
+        if not path.isHidden():
+            total += path.node().getNumGeoms()
+    # TextNode (Text в Ursina) строит геометрию сам при отрисовке - обычно один Geom на узел
+    for path in node.findAllMatches('**/+TextNode'):
+        if not path.isHidden():
+            total += 1
+    return total
+
+
+class _BatchGroup:
+    __slots__ = ('state', 'members', 'node', 'source_geoms', 'batch_geoms')
+
+    def __init__(self, state):
+        self.state = state
+        self.members = []
+        self.node = None
+        self.source_geoms = 0
+        self.batch_geoms = 0
+
+
+class StaticBatcher(Entity):
+    """Склеивает неподвижные объекты с одинаковым материалом в общие меши (flattenStrong).
+
+    Объекты остаются сущностями (логика, коллайдеры), рисуется только их копия в общем меше.
+    Группы - по материалу (RenderState сущности) и по клеткам cell_size, чтобы добавление или
+    удаление объекта пересобирало одну клетку, а отсечение по видимости продолжало работать.
+    Пересборка - в update(); батчер стоит создавать после тех, кто добавляет в него объекты.
+    """
+
+    def __init__(self, cell_size=64, **kwargs):
+        super().__init__(**kwargs)
+        self.cell_size = cell_size      # None - одна группа на материал (например для UI)
+        self._groups = {}               # (RenderState, клетка) -> _BatchGroup
+        self._keys = {}                 # id(сущности) -> ключ её группы
+        self._dirty = set()
+        self.rebuilds = 0
+        self.rebuild_ms = 0.0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _key(self, entity):
+        cell = None
+        if self.cell_size:
+            p = entity.getPos(self)
+            cell = (math.floor(p[0] / self.cell_size), math.floor(p[2] / self.cell_size))
+        return entity.getState(), cell
+
+    def add(self, entity):
+        if id(entity) in self._keys or not entity.model:
+            return entity
+        key = self._key(entity)
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = _BatchGroup(key[0])
+        group.members.append(entity)
+        self._keys[id(entity)] = key
+        self._dirty.add(key)
+        return entity
+
+    def remove(self, entity):
+        key = self._keys.pop(id(entity), None)
+        if key is None:
+            return
+        self._groups[key].members.remove(entity)
+        if not entity.is_empty():
+            entity.visible_self = True
+        self._dirty.add(key)
+
+    def refresh(self, entity):
+        """Объект сдвинули или поменяли ему цвет/размер - пересобрать его группу"""
+        if id(entity) in self._keys:
+            self.remove(entity)
+            self.add(entity)
+
+    def _rebuild(self, key):
+        group = self._groups[key]
+        if group.node is not None:
+            group.node.removeNode()
+            group.node = None
+        group.source_geoms = group.batch_geoms = 0
+        if not group.members:
+            del self._groups[key]
+            return
+
+        node = self.attachNewNode('batch')
+        node.setState(group.state)
+        for entity in group.members:
+            copy = entity.model.copyTo(node)
+            copy.show()
+            copy.setTransform(entity.model.getTransform(self))
+            group.source_geoms += geom_count(copy)
+            entity.visible_self = False
+        node.flattenStrong()
+        group.node = node
+        group.batch_geoms = geom_count(node)
+
+    def flush(self):
+        """Пересобирает изменившиеся группы сейчас, не дожидаясь update()"""
+        if not self._dirty:
+            return
+        start = perf_counter()
+        for key in self._dirty:
+            self._rebuild(key)
+        self.rebuilds += len(self._dirty)
+        self._dirty.clear()
+        self.rebuild_ms += (perf_counter() - start) * 1000
+
+    def update(self):
+        self.flush()
+
+    @property
+    def saved_draw_calls(self):
+        return sum(g.source_geoms - g.batch_geoms for g in self._groups.values())
+
+    def stats(self):
+        return {'objects': len(self), 'groups': len(self._groups), 'saved_draw_calls': self.saved_draw_calls,
+                'rebuilds': self.rebuilds, 'rebuild_ms': self.rebuild_ms}
+
+
+class InstancedBatch(Entity):
+    """Одинаковые подвижные объекты (файрболы и т.п.) одним вызовом отрисовки с инстансингом.
+
+    Каждый кадр позиции, повороты, масштабы и цвета включённых участников пишутся в массивы
+    шейдера (PTA - без повторной передачи set_shader_input). Участники свою модель не рисуют.
+    Без участников-сущностей экземпляры можно задать прямо массивами NumPy - write().
+    """
+
+    def __init__(self, model, capacity=256, **kwargs):
+        super().__init__(model=model, **kwargs)
+        self.capacity = capacity
+        self.members = []
+        self.shader = Shader(language=Shader.GLSL, vertex=INSTANCING_VERTEX.format(count=capacity),
+                             fragment=INSTANCING_FRAGMENT)
+        self._positions = PTA_LVecBase3f.emptyArray(capacity)
+        self._rotations = PTA_LVecBase4f.emptyArray(capacity)
+        self._scales = PTA_LVecBase3f.emptyArray(capacity)
+        self._colors = PTA_LVecBase4f.emptyArray(capacity)
+        self.setShaderInput('instance_positions', self._positions)
+        self.setShaderInput('instance_rotations', self._rotations)
+        self.setShaderInput('instance_scales', self._scales)
+        self.setShaderInput('instance_colors', self._colors)
+        # Те же массивы глазами NumPy - для write()
+        self._position_view = np.frombuffer(memoryview(self._positions), dtype=np.float32).reshape(-1, 3)
+        self._rotation_view = np.frombuffer(memoryview(self._rotations), dtype=np.float32).reshape(-1, 4)
+        self._scale_view = np.frombuffer(memoryview(self._scales), dtype=np.float32).reshape(-1, 3)
+        self._color_view = np.frombuffer(memoryview(self._colors), dtype=np.float32).reshape(-1, 4)
+        self.hide()                     # instance_count = 0 выключает инстансинг, а не рисование
+        # Сам меш стоит в начале координат - границы считать бессмысленно, отсекать нельзя
+        self.node().setBounds(OmniBoundingVolume())
+        self.node().setFinal(True)
+        self._geoms = geom_count(self.model)
+        self.active = 0
+        self._written = False           # экземпляры задаются через write(), участников нет
+
+    def add(self, entity):
+        """Участник рисуется батчем; сверх capacity - как раньше, сам"""
+        if len(self.members) >= self.capacity:
+            return entity
+        self.members.append(entity)
+        entity.visible_self = False
+        return entity
+
+    def remove(self, entity):
+        if entity in self.members:
+            self.members.remove(entity)
+            if not entity.is_empty():
+                entity.visible_self = True
+
+    def write(self, positions, rotations=None, scales=None, colors=None):
+        """Экземпляры из массивов: позиции N×3, кватернионы (x, y, z, w) N×4, масштабы, цвета.
+
+        Масштабы и цвета можно дать одним значением на всех; не переданное остаётся с прошлого раза.
+        """
+        n = min(len(positions), self.capacity)
+        self._position_view[:n] = positions[:n]
+        if rotations is not None:
+            self._rotation_view[:n] = rotations[:n]
+        if scales is not None:
+            self._scale_view[:n] = scales[:n] if np.ndim(scales) > 1 else scales
+        if colors is not None:
+            self._color_view[:n] = colors[:n] if np.ndim(colors) > 1 else colors
+        self._written = True
+        self._set_active(n)
+
+    def update(self):
+        if self._written:
+            return
+        n = 0
+        for entity in self.members:
+            if not entity.enabled or entity.is_empty():
+                continue
+            q = entity.getQuat(scene)
+            self._positions.setElement(n, entity.getPos(scene))
+            self._rotations.setElement(n, LVecBase4f(q.getI(), q.getJ(), q.getK(), q.getR()))
+            self._scales.setElement(n, entity.getScale(scene))
+            self._colors.setElement(n, entity.color)
+            n += 1
+        self._set_active(n)
+
+    def _set_active(self, n):
+        if n != self.active:
+            if n == 0:
+                self.hide()
+            elif self.active == 0:
+                self.show()
+            self.active = n
+            self.setInstanceCount(max(n, 1))
+
+    @property
+    def saved_draw_calls(self):
+        return self.active * self._geoms - (self._geoms if self.active else 0)
+
+    def stats(self):
+        return {'members': len(self.members), 'active': self.active, 'saved_draw_calls': self.saved_draw_calls}
+
+
+class BarBatch(Entity):
+    """Полоски над сущностями (здоровье боссов) одним мешем: billboard-квады фона и заполнения для всех.
+
+    Место и размер полоски - позиция и масштаб её якоря (сущность без модели). Квады повёрнуты к
+    камере, поэтому меш собирается каждый кадр (NumPy), а перезаливается, только если он изменился.
+    """
+
+    def __init__(self, background=color.dark_gray, capacity=32, **kwargs):
+        mesh = Mesh(static=False, vertex_buffer_format=VERTEX_FORMAT)
+        super().__init__(model=mesh, double_sided=True, **kwargs)
+        self.mesh = mesh
+        self.background = tuple(background)
+        self._bars = {}                 # id(якоря) -> [якорь, заполнение 0..1, цвет]
+        self._indices = quad_indices(capacity * 2)
+        self._buffer = np.zeros((0, 4, VERTEX_SIZE), dtype=np.float32)
+        self.uploads = 0
+
+    def __len__(self):
+        return len(self._bars)
+
+    def add(self, anchor, value=1.0, fill_color=color.green):
+        self._bars[id(anchor)] = [anchor, value, tuple(fill_color)]
+        return anchor
+
+    def set(self, anchor, value, fill_color):
+        bar = self._bars[id(anchor)]
+        bar[1] = value
+        bar[2] = tuple(fill_color)
+
+    def remove(self, anchor):
+        self._bars.pop(id(anchor), None)
+
+    def _visible(self):
+        for anchor, value, fill_color in self._bars.values():
+            if not anchor.is_empty() and anchor.enabled and not anchor.has_disabled_ancestor():
+                yield anchor, value, fill_color
+
+    def update(self):
+        bars = list(self._visible())[:len(self._indices) // 12]
+        count = len(bars)
+        buffer = np.empty((count * 2, 4, VERTEX_SIZE), dtype=np.float32)
+        if count:
+            centers = np.array([anchor.getPos(scene) for anchor, _, _ in bars], dtype=np.float32)
+            sizes = np.array([anchor.getScale(scene) for anchor, _, _ in bars], dtype=np.float32)
+            values = np.clip(np.array([value for _, value, _ in bars], dtype=np.float32), 0, 1)
+            right = np.array(camera.right, dtype=np.float32)
+            up = np.array(camera.up, dtype=np.float32)
+            toward = -np.array(camera.forward, dtype=np.float32)
+
+            half_w = sizes[:, 0] * 0.5
+            half_h = sizes[:, 1] * 0.5
+            # Заполнение прижато к левому краю и чуть ближе к камере, чтобы не мерцать с фоном
+            fill_centers = centers + right * (-(1 - values) * half_w)[:, None] + toward * (half_h * 0.1)[:, None]
+            quads = (
+                (centers, half_w, np.broadcast_to(self.background, (count, 4))),
+                (fill_centers, half_w * values, np.array([c for _, _, c in bars], dtype=np.float32)),
+            )
+            for i, (c, w, colors) in enumerate(quads):
+                part = buffer[i::2]
+                part[:, :, 0:3] = (c[:, None, :] + QUAD_CORNERS[None, :, 0, None] * right * w[:, None, None]
+                                   + QUAD_CORNERS[None, :, 1, None] * up * half_h[:, None, None])
+                part[:, :, 3:7] = colors[:, None, :]
+                part[:, :, 7:9] = QUAD_UVS
+        if buffer.shape != self._buffer.shape or not np.array_equal(buffer, self._buffer):
+            upload_billboards(self.mesh, buffer.reshape(-1, 4, VERTEX_SIZE), self._indices)
+            self._buffer = buffer
+            self.uploads += 1
+
+    @property
+    def saved_draw_calls(self):
+        # Без батча у каждой видимой полоски два квада-сущности (фон и заполнение)
+        count = len(self._buffer) // 2
+        return count * 2 - 1 if count else 0
+
+    def stats(self):
+        return {'bars': len(self), 'uploads': self.uploads, 'saved_draw_calls': self.saved_draw_calls}
+
+
+def draw_call_report(batches, roots=None):
+    """Вызовы отрисовки сейчас и сколько их было бы без батчей (оценка по числу Geom, без отсечения)"""
+    roots = roots or (scene, camera.ui)
+    after = sum(geom_count(root) for root in roots)
+    saved = sum(batch.saved_draw_calls for batch in batches)
+    return {'before': after + saved, 'after': after}
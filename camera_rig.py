@@ -0,0 +1,85 @@
+from ursina import *
+import math
+
+
+class CameraRig:
+    """Камера от третьего лица на "пружинной штанге".
+
+    Направления считаются из yaw/pitch формулами (без пересчёта трансформов сцены),
+    штанга укорачивается по одному свип-тесту в SpatialHash, чтобы камера не уходила в ландшафт,
+    а затем плавно возвращается к полной длине. Векторы выделяются один раз и переиспользуются.
+    """
+
+    def __init__(self, target, colliders=None, distance=10, height=2, yaw=0, pitch=15, pitch_limits=(-10, 60),
+                 radius=0.3, min_distance=1, return_speed=6, ignore=()):
+        self.target = target
+        self.colliders = colliders      # SpatialHash; None - без столкновений
+        self.distance = distance
+        self.height = height
+        self.yaw = yaw
+        self.pitch = pitch
+        self.pitch_limits = pitch_limits
+        self.radius = radius            # толщина штанги: камера держится на таком расстоянии от стен
+        self.min_distance = min_distance
+        self.return_speed = return_speed
+        self.ignore = tuple(ignore)     # кого камера не обходит (игрок, крупные враги)
+        self.arm = distance             # текущая длина штанги
+
+        # Базис камеры: forward - взгляд, flat_forward - он же в плоскости XZ (для ходьбы), right - вправо (крена нет)
+        self.forward = Vec3(0, 0, 1)
+        self.flat_forward = Vec3(0, 0, 1)
+        self.right = Vec3(1, 0, 0)
+        self._pivot = Vec3(0, 0, 0)
+        self._end = Vec3(0, 0, 0)
+        self.aim(0, 0)
+
+    def aim(self, d_yaw, d_pitch):
+        """Поворачивает штангу и пересчитывает базис (один sin/cos на угол)"""
+        self.yaw += d_yaw
+        self.pitch = clamp(self.pitch + d_pitch, *self.pitch_limits)
+        yaw, pitch = math.radians(self.yaw), math.radians(self.pitch)
+        sy, cy = math.sin(yaw), math.cos(yaw)
+        sp, cp = math.sin(pitch), math.cos(pitch)
+        self.forward.set(sy * cp, -sp, cy * cp)
+        self.flat_forward.set(sy, 0, cy)
+        self.right.set(cy, 0, -sy)
+
+    def _arm_length(self, dt):
+        """Длина штанги: сразу короче при препятствии, обратно - плавно"""
+        wanted = self.distance
+        if self.colliders is not None:
+            pivot, end, f = self._pivot, self._end, self.forward
+            end.set(pivot[0] - f[0] * wanted, pivot[1] - f[1] * wanted, pivot[2] - f[2] * wanted)
+            hit = self.colliders.sweep(pivot, end, self.radius, ignore=self.ignore)
+            if hit.hit:
+                wanted = max(self.min_distance, hit.distance)
+
+        if wanted < self.arm or dt <= 0:
+            self.arm = wanted
+        else:
+            self.arm += (wanted - self.arm) * (1 - math.exp(-self.return_speed * dt))
+        return self.arm
+
+    def update(self, dt):
+        """Ставит камеру за целью: позиция и поворот одним setPosHpr"""
+        p = self.target.getPos()
+        pivot = self._pivot
+        pivot.set(p[0], p[1] + self.height, p[2])
+        arm = self._arm_length(dt)
+        f = self.forward
+        # Ursina хранит rotation как (pitch, yaw) с обратными знаками относительно HPR Panda3D
+        camera.setPosHpr(pivot[0] - f[0] * arm, pivot[1] - f[1] * arm, pivot[2] - f[2] * arm,
+                         -self.yaw, -self.pitch, 0)
+
+    def snap(self):
+        """Сразу на полную длину штанги (после телепорта или загрузки)"""
+        self.arm = self.distance
+        self.update(0)
+
+    def snapshot(self):
+        return {'yaw': self.yaw, 'pitch': self.pitch}
+
+    def restore(self, state):
+        self.yaw, self.pitch = state['yaw'], state['pitch']
+        self.aim(0, 0)
+        self.snap()
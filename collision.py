@@ -0,0 +1,189 @@
+from ursina import *
+from ursina.hit_info import HitInfo
+import math
+
+
+def world_aabb(entity):
+    """AABB коллайдера сущности в мировых координатах (с учётом поворота и масштаба)"""
+    if hasattr(entity, 'world_bounds'):     # сущность сама знает свои границы (чанки ландшафта)
+        return entity.world_bounds
+
+    collider = entity.collider
+    if isinstance(collider, SphereCollider):
+        center = Vec3(*collider.center)
+        half = Vec3(collider.radius, collider.radius, collider.radius)
+    elif isinstance(collider, BoxCollider):
+        center = Vec3(*collider.center)
+        half = Vec3(*collider.size) * 0.5
+    else:
+        center = Vec3(0, 0, 0)
+        half = Vec3(0.5, 0.5, 0.5)
+
+    m = entity.getMat(scene)
+    c = m.xformPoint(center)
+    extents = [
+        abs(m[0][j]) * half[0] + abs(m[1][j]) * half[1] + abs(m[2][j]) * half[2]
+        for j in range(3)
+    ]
+    return (c[0] - extents[0], c[1] - extents[1], c[2] - extents[2]), \
+           (c[0] + extents[0], c[1] + extents[1], c[2] + extents[2])
+
+
+def segment_vs_aabb(start, delta, lo, hi):
+    """Момент входа отрезка start + delta*t (t в 0..1) в AABB или None (slab-тест)"""
+    t_enter, t_exit = 0.0, 1.0
+    for i in range(3):
+        s, d = start[i], delta[i]
+        if abs(d) < 1e-9:
+            if s < lo[i] or s > hi[i]:
+                return None
+            continue
+        t0 = (lo[i] - s) / d
+        t1 = (hi[i] - s) / d
+        if t0 > t1:
+            t0, t1 = t1, t0
+        if t0 > t_enter:
+            t_enter = t0
+        if t1 < t_exit:
+            t_exit = t1
+        if t_enter > t_exit:
+            return None
+    return t_enter
+
+
+class SpatialBody:
+    """Запись о коллайдере в сетке: его AABB и занятые клетки"""
+    __slots__ = ('entity', 'static', 'lo', 'hi', 'cells')
+
+    def __init__(self, entity, static):
+        self.entity = entity
+        self.static = static
+        self.lo = self.hi = None
+        self.cells = None
+
+
+class SpatialHash:
+    """Равномерная сетка по XZ для широкой фазы столкновений снарядов"""
+
+    def __init__(self, cell_size=4, max_cells=64):
+        self.cell_size = cell_size
+        self.max_cells = max_cells    # объекты крупнее (например земля) проверяются всегда
+        self.cells = {}               # (ix, iz) -> список SpatialBody
+        self.large = []
+        self.bodies = {}              # id(entity) -> SpatialBody
+        self.queries = 0
+        self.candidates_tested = 0
+
+    def __len__(self):
+        return len(self.bodies)
+
+    def add(self, entity, static=False):
+        body = SpatialBody(entity, static)
+        self.bodies[id(entity)] = body
+        self._rebin(body)
+        return entity
+
+    def remove(self, entity):
+        body = self.bodies.pop(id(entity), None)
+        if body:
+            self._unlink(body)
+
+    def clear(self):
+        self.cells.clear()
+        self.large.clear()
+        self.bodies.clear()
+
+    def refresh(self, dt=None):
+        """Обновляет подвижные коллайдеры; перекладывает только тех, кто сменил клетки"""
+        for key, body in list(self.bodies.items()):
+            if body.entity.is_empty():
+                del self.bodies[key]
+                self._unlink(body)
+            elif not body.static:
+                self._rebin(body)
+
+    def _cell_range(self, lo, hi):
+        size = self.cell_size
+        return (math.floor(lo[0] / size), math.floor(hi[0] / size),
+                math.floor(lo[2] / size), math.floor(hi[2] / size))
+
+    def _rebin(self, body):
+        body.lo, body.hi = world_aabb(body.entity)
+        cells = self._cell_range(body.lo, body.hi)
+        if cells == body.cells:
+            return
+        self._unlink(body)
+        body.cells = cells
+        x0, x1, z0, z1 = cells
+        if (x1 - x0 + 1) * (z1 - z0 + 1) > self.max_cells:
+            self.large.append(body)
+            return
+        for ix in range(x0, x1 + 1):
+            for iz in range(z0, z1 + 1):
+                self.cells.setdefault((ix, iz), []).append(body)
+
+    def _unlink(self, body):
+        if body.cells is None:
+            return
+        if body in self.large:
+            self.large.remove(body)
+        else:
+            x0, x1, z0, z1 = body.cells
+            for ix in range(x0, x1 + 1):
+                for iz in range(z0, z1 + 1):
+                    bucket = self.cells.get((ix, iz))
+                    if bucket:
+                        bucket.remove(body)
+                        if not bucket:
+                            del self.cells[(ix, iz)]
+        body.cells = None
+
+    def nearby(self, lo, hi):
+        """Коллайдеры, чьи клетки пересекают область lo..hi"""
+        x0, x1, z0, z1 = self._cell_range(lo, hi)
+        found = {id(b): b for b in self.large}
+        for ix in range(x0, x1 + 1):
+            for iz in range(z0, z1 + 1):
+                for body in self.cells.get((ix, iz), ()):
+                    found[id(body)] = body
+        return found.values()
+
+    def sweep(self, start, end, radius, ignore=(), where=None):
+        """Сфера радиуса radius, летящая из start в end: первое касание коллайдера.
+
+        Коллайдеры, внутри которых сфера уже находится, пропускаются (из них можно выйти).
+        where - необязательный фильтр сущностей.
+        """
+        self.queries += 1
+        delta = end - start
+        lo = (min(start[0], end[0]) - radius, min(start[1], end[1]) - radius, min(start[2], end[2]) - radius)
+        hi = (max(start[0], end[0]) + radius, max(start[1], end[1]) + radius, max(start[2], end[2]) + radius)
+
+        ignore_ids = {id(e) for e in ignore}
+        best_t, best = None, None
+        for body in self.nearby(lo, hi):
+            entity = body.entity
+            if id(entity) in ignore_ids or entity.is_empty() or not entity.enabled or not entity.collision:
+                continue
+            if where is not None and not where(entity):
+                continue
+            self.candidates_tested += 1
+            # Сфера против AABB = отрезок против AABB, расширенного на радиус
+            box_lo = (body.lo[0] - radius, body.lo[1] - radius, body.lo[2] - radius)
+            box_hi = (body.hi[0] + radius, body.hi[1] + radius, body.hi[2] + radius)
+            t = segment_vs_aabb(start, delta, box_lo, box_hi)
+            if t == 0 and all(box_lo[i] <= start[i] <= box_hi[i] for i in range(3)) \
+                    and not hasattr(entity, 'sweep_test'):
+                continue
+            if t is not None and hasattr(entity, 'sweep_test'):
+                t = entity.sweep_test(start, delta, radius)
+            if t is not None and (best_t is None or t < best_t):
+                best_t, best = t, entity
+
+        hit_info = HitInfo(hit=best is not None)
+        if best is not None:
+            hit_info.entity = best
+            hit_info.entities = [best]
+            hit_info.world_point = start + delta * best_t
+            hit_info.distance = delta.length() * best_t
+        return hit_info
@@ -0,0 +1,89 @@
+from time import perf_counter
+
+import gamelog
+
+log = gamelog.get('combat')
+
+DAMAGE = 'damage'
+HEAL = 'heal'
+DEATH = 'death'
+
+
+class CombatEvents:
+    """Шина боевых событий: урон и лечение за тик копятся в очереди и разбираются один раз в конце тика.
+
+    Несколько попаданий по одной цели за тик складываются в одно изменение здоровья, поэтому шкала
+    и эффекты получения урона срабатывают один раз. Цель - сущность с is_alive, health_bar,
+    on_damage(amount) (эффекты; возвращает, сколько урона принять) и die().
+    Подписчики on(вид) получают (цель, величина); для смерти величина - весь урон этого тика.
+    """
+
+    def __init__(self):
+        self._queue = []            # (вид, цель, величина)
+        self._handlers = {DAMAGE: [], HEAL: [], DEATH: []}
+        self.events = 0
+        self.applied = 0            # изменений здоровья после слияния
+        self.resolve_ms = 0.0
+
+    def __len__(self):
+        return len(self._queue)
+
+    def damage(self, target, amount):
+        self._queue.append((DAMAGE, target, amount))
+
+    def heal(self, target, amount):
+        self._queue.append((HEAL, target, amount))
+
+    def on(self, kind):
+        """Декоратор: подписывает функцию на события вида kind"""
+        def register(handler):
+            self._handlers[kind].append(handler)
+            return handler
+        return register
+
+    def clear(self):
+        """Забывает неразобранные события (при восстановлении снимка)"""
+        self._queue.clear()
+
+    def _emit(self, kind, target, amount):
+        for handler in self._handlers[kind]:
+            handler(target, amount)
+
+    def resolve(self, dt=None):
+        """Применяет накопленное за тик (последняя система Simulation)"""
+        if not self._queue:
+            return
+        start = perf_counter()
+        queue, self._queue = self._queue, []
+        self.events += len(queue)
+
+        # Цель -> [урон, лечение] в порядке первого события
+        totals = {}
+        for kind, target, amount in queue:
+            entry = totals.get(id(target))
+            if entry is None:
+                entry = totals[id(target)] = [target, 0, 0]
+            entry[1 if kind == DAMAGE else 2] += amount
+
+        for target, damage, heal in totals.values():
+            if target.is_empty() or not target.is_alive:
+                continue
+            bar = target.health_bar
+            if heal:
+                self.applied += 1
+                bar.heal(heal)
+                self._emit(HEAL, target, heal)
+            if damage:
+                damage = target.on_damage(damage)
+                if damage:
+                    self.applied += 1
+                    if bar.take_damage(damage):
+                        log.debug("💀 %s: смерть от %s урона за тик", type(target).__name__, damage)
+                        target.die()
+                        self._emit(DEATH, target, damage)
+                        continue
+                    self._emit(DAMAGE, target, damage)
+        self.resolve_ms += (perf_counter() - start) * 1000
+
+    def stats(self):
+        return {'events': self.events, 'applied': self.applied, 'resolve_ms': self.resolve_ms}
@@ -0,0 +1,131 @@
+from pathlib import Path
+import threading
+import tomllib
+
+import gamelog
+
+CONFIG_PATH = Path(__file__).resolve().parent / 'config.toml'
+
+log = gamelog.get('config')
+
+
+class Section:
+    """Неизменяемый раздел настроек; поля - слоты, поэтому чтение в горячем коде дешёвое"""
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'Настройки только для чтения: {type(self).__name__}.{name}')
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.as_dict()})'
+
+
+def make_section(name, values):
+    """Класс со слотами под ключи раздела и его экземпляр с этими значениями"""
+    cls = type(name, (Section,), {'__slots__': tuple(values)})
+    section = cls()
+    for key, value in values.items():
+        object.__setattr__(section, key, value)
+    return section
+
+
+class Config:
+    """Настройки игры из TOML: разделы доступны как атрибуты (config.player.speed).
+
+    watch() запускает поток, который следит за файлом; изменения применяются
+    в игровом потоке при вызове apply_pending() - без перезапуска и перезагрузки ассетов.
+    """
+
+    def __init__(self, path=CONFIG_PATH, poll_interval=0.5):
+        self.path = Path(path)
+        self.poll_interval = poll_interval
+        self._schema = {}           # раздел -> {ключ: тип} из первой загрузки
+        self._listeners = []
+        self._pending = None
+        self._mtime = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._apply(self._read(strict=True))
+
+    def _read(self, strict=False):
+        """Разбирает файл; при повторной загрузке ключи и типы проверяются по первой"""
+        self._mtime = self.path.stat().st_mtime_ns
+        with open(self.path, 'rb') as f:
+            data = tomllib.load(f)
+
+        if strict:
+            self._schema = {name: {key: type(value) for key, value in values.items()}
+                            for name, values in data.items()}
+            return data
+
+        checked = {}
+        for name, schema in self._schema.items():
+            values = data.get(name, {})
+            section = {}
+            for key, kind in schema.items():
+                if key not in values:
+                    raise ValueError(f'нет ключа [{name}] {key}')
+                value = values[key]
+                if kind is float and isinstance(value, int) and not isinstance(value, bool):
+                    value = float(value)
+                if not isinstance(value, kind):
+                    raise ValueError(f'[{name}] {key}: ожидался {kind.__name__}, а не {type(value).__name__}')
+                section[key] = value
+            extra = set(values) - set(schema)
+            if extra:
+                log.warning("⚙️ Новые ключи [%s] %s применятся только после перезапуска", name, sorted(extra))
+            checked[name] = section
+        return checked
+
+    def _apply(self, data):
+        changed = []
+        for name, values in data.items():
+            old = getattr(self, name, None)
+            if old is None or old.as_dict() != values:
+                setattr(self, name, make_section(name.capitalize() + 'Config', values))
+                changed.append(name)
+        return changed
+
+    def on_change(self, listener):
+        """listener(config, changed_sections) вызывается после применения новых значений"""
+        self._listeners.append(listener)
+        return listener
+
+    # --- слежение за файлом ---
+
+    def watch(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch_loop, name='config-watch', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch_loop(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                mtime = self.path.stat().st_mtime_ns
+            except OSError:
+                continue
+            if mtime == self._mtime:
+                continue
+            try:
+                self._pending = self._read()
+            except (OSError, ValueError, tomllib.TOMLDecodeError) as e:
+                log.warning("⚙️ %s не применён: %s", self.path.name, e)
+
+    def apply_pending(self):
+        """Применяет перечитанный файл (вызывать из игрового потока, например раз в кадр)"""
+        if self._pending is None:
+            return []
+        data, self._pending = self._pending, None
+        changed = self._apply(data)
+        if changed:
+            log.info("⚙️ Настройки обновлены: %s", ', '.join(changed))
+            for listener in self._listeners:
+                listener(self, changed)
+        return changed
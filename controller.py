@@ -0,0 +1,126 @@
+from ursina import *
+from time import perf_counter
+
+
+class CharacterController:
+    """Перемещение персонажа: земля по карте высот, свип-тесты для ходьбы, рывка и прыжка"""
+
+    def __init__(self, entity, terrain=None, colliders=None, radius=0.4, ground_snap=0.2, skin=0.02, coyote_time=0.1):
+        self.entity = entity
+        self.terrain = terrain          # Terrain с height_at(x, z)
+        self.colliders = colliders      # SpatialHash со всеми остальными коллайдерами
+        self.radius = radius
+        self.ground_snap = ground_snap  # насколько ниже ног земля ещё считается "под ногами"
+        self.skin = skin                # зазор, чтобы не застревать в стене после столкновения
+        self.coyote_time = coyote_time  # сколько после схода с края ещё можно прыгнуть
+        self.velocity_y = 0
+        self.is_grounded = False
+        self.air_time = 0               # сколько секунд без опоры
+        self.counters = {
+            'ground_queries': 0, 'heightfield': 0, 'raycasts': 0, 'sweeps': 0,
+            'ground_ms': 0.0, 'sweep_ms': 0.0,
+        }
+
+    def _solid(self, entity):
+        # Ландшафт обрабатывается картой высот, сам персонаж - не препятствие
+        return not getattr(entity, 'is_terrain', False) and entity is not self.entity
+
+    def _props_below(self, position):
+        """Коллайдеры (кроме ландшафта), на которые персонаж может сейчас опираться"""
+        r = self.radius
+        lo = (position[0] - r, position[1] - self.ground_snap, position[2] - r)
+        hi = (position[0] + r, position[1] + 0.1, position[2] + r)
+        return [
+            body.entity for body in self.colliders.nearby(lo, hi)
+            if self._solid(body.entity) and all(body.lo[i] <= hi[i] and body.hi[i] >= lo[i] for i in range(3))
+        ]
+
+    def ground_height(self):
+        """Высота опоры под персонажем (None, если опоры нет)"""
+        start = perf_counter()
+        counters = self.counters
+        counters['ground_queries'] += 1
+        position = self.entity.position
+
+        ground = None
+        if self.terrain is not None:
+            ground = self.terrain.height_at(position.x, position.z)
+            counters['heightfield'] += 1
+
+        # Луч только рядом с другими объектами, на которые можно встать, и только по ним самим
+        if self.colliders is None:
+            targets = [scene]
+        else:
+            targets = self._props_below(position)
+        for target in targets:
+            counters['raycasts'] += 1
+            ray = raycast(position + Vec3(0, 0.1, 0), Vec3(0, -1, 0), distance=0.1 + self.ground_snap,
+                          traverse_target=target, ignore=[self.entity])
+            if ray.hit and not getattr(ray.entity, 'is_terrain', False):
+                ground = ray.world_point.y if ground is None else max(ground, ray.world_point.y)
+
+        counters['ground_ms'] += (perf_counter() - start) * 1000
+        return ground
+
+    def move(self, displacement):
+        """Сдвигает персонажа, останавливая его у первого препятствия на пути"""
+        if displacement.length() == 0:
+            return False
+        entity = self.entity
+        if self.colliders is None:
+            entity.position += displacement
+            return False
+
+        start_time = perf_counter()
+        self.counters['sweeps'] += 1
+        start = entity.position
+        hit = self.colliders.sweep(start, start + displacement, self.radius, where=self._solid)
+        if hit.hit:
+            travel = max(0, hit.distance - self.skin)
+            entity.position = start + displacement.normalized() * travel
+        else:
+            entity.position = start + displacement
+        self.counters['sweep_ms'] += (perf_counter() - start_time) * 1000
+        return hit.hit
+
+    @property
+    def can_jump(self):
+        # Не только на земле, но и чуть после того, как сошли с края (но не в прыжке)
+        return self.is_grounded or (self.air_time <= self.coyote_time and self.velocity_y <= 0)
+
+    def jump(self, speed):
+        if self.can_jump:
+            self.velocity_y = speed
+            self.is_grounded = False
+            self.air_time = float('inf')     # запас "койота" на прыжок уже потрачен
+            return True
+        return False
+
+    def apply_gravity(self, dt, gravity):
+        """Вертикальное движение за тик: гравитация, удар головой и приземление без пролёта сквозь землю"""
+        ground = self.ground_height()
+        y = self.entity.y
+        self.is_grounded = ground is not None and y - ground <= self.ground_snap and self.velocity_y <= 0
+
+        if not self.is_grounded:
+            self.velocity_y -= gravity * dt
+            self.air_time += dt
+        else:
+            self.velocity_y = max(0, self.velocity_y)
+            self.air_time = 0
+
+        dy = self.velocity_y * dt
+        if dy > 0:
+            if self.move(Vec3(0, dy, 0)):
+                self.velocity_y = 0
+            return
+
+        # На земле прилипаем к склону, в падении - не проскакиваем ниже поверхности
+        new_y = y + dy
+        if ground is not None and (new_y <= ground or self.is_grounded):
+            new_y = ground
+            self.velocity_y = max(0, self.velocity_y)
+        self.entity.y = new_y
+
+    def stats(self):
+        return dict(self.counters)
@@ -0,0 +1,246 @@
+from time import perf_counter
+import numpy as np
+
+
+# Метки: компонент у строки есть, только если значение истинно (spawn(rendered=False) - не рисуется)
+TAGS = ('rendered', 'tracked')
+
+
+class World:
+    """Сущности как строки таблицы: каждый компонент - непрерывный массив NumPy по номеру сущности.
+
+    Системы - функции system(world, dt) - обрабатывают сразу все строки с нужными компонентами
+    (query), без update() и словаря атрибутов на каждый объект. Сущности Ursina - только прокси
+    для отрисовки: sync() раз в кадр переносит в них интерполированные позиции. Отслеживаемые
+    сущности (track) - наоборот: их позиция каждый тик берётся из сцены (игрок, босс), чтобы
+    системы могли на них ссылаться по номеру.
+    """
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.proxies = [None] * capacity    # номер -> сущность Ursina (или None)
+        self._free = list(range(capacity - 1, -1, -1))
+        self._components = {}       # имя -> массив данных
+        self._has = {}              # имя -> у каких строк компонент есть
+        self._queries = {}          # кортеж имён -> номера строк; сбрасывается при изменении состава
+        self._tracked = {}          # id(сущности Ursina) -> номер
+        self.systems = []
+        self.tick_ms = 0.0          # последний тик
+        self.max_tick_ms = 0.0
+        self.sync_ms = 0.0
+
+        self.register('position', np.float32, 3)
+        self.register('prev_position', np.float32, 3)   # позиция на начало тика - для интерполяции
+        self.register('enabled', np.bool_)
+        self.register('rendered', np.bool_)             # есть прокси, в который пишет sync()
+        self.register('tracked', np.bool_)              # позиция берётся из прокси
+
+    def __len__(self):
+        return self.capacity - len(self._free)
+
+    def __getitem__(self, name):
+        return self._components[name]
+
+    def register(self, name, dtype, size=None):
+        """Новый компонент: массив на capacity строк (size - длина вектора, например 3 для позиции)"""
+        shape = (self.capacity,) if size is None else (self.capacity, size)
+        self._components[name] = np.zeros(shape, dtype=dtype)
+        self._has[name] = np.zeros(self.capacity, dtype=bool)
+
+    def _grow(self):
+        old = self.capacity
+        self.capacity = capacity = old * 2
+        for name, data in self._components.items():
+            grown = np.zeros((capacity,) + data.shape[1:], dtype=data.dtype)
+            grown[:old] = data
+            self._components[name] = grown
+            self._has[name] = np.concatenate([self._has[name], np.zeros(old, dtype=bool)])
+        self.alive = np.concatenate([self.alive, np.zeros(old, dtype=bool)])
+        self.proxies.extend([None] * old)
+        self._free[:0] = range(capacity - 1, old - 1, -1)
+
+    # --- состав ---
+
+    def spawn(self, proxy=None, **components):
+        """Новая сущность с данными компонентов; возвращает её номер"""
+        if not self._free:
+            self._grow()
+        eid = self._free.pop()
+        self.alive[eid] = True
+        self.proxies[eid] = proxy
+        components.setdefault('enabled', True)
+        if proxy is not None:
+            components.setdefault('position', proxy.getPos())
+            components.setdefault('rendered', not components.get('tracked', False))
+        if 'position' in components:
+            components.setdefault('prev_position', components['position'])
+        for name, value in components.items():
+            self._components[name][eid] = value
+            self._has[name][eid] = bool(value) if name in TAGS else True
+        self._queries.clear()
+        return eid
+
+    def despawn(self, eids):
+        """Удаляет сущность или массив сущностей; их номера пойдут под новые"""
+        eids = np.atleast_1d(eids)
+        if not len(eids):
+            return
+        eids = eids[self.alive[eids]]
+        self.alive[eids] = False
+        for has in self._has.values():
+            has[eids] = False
+        for eid in eids.tolist():
+            proxy = self.proxies[eid]
+            if proxy is not None and self._tracked.get(id(proxy)) == eid:
+                del self._tracked[id(proxy)]
+            self.proxies[eid] = None
+            self._free.append(eid)
+        self._queries.clear()
+
+    def query(self, *names):
+        """Номера живых сущностей, у которых есть все эти компоненты"""
+        rows = self._queries.get(names)
+        if rows is None:
+            mask = self.alive.copy()
+            for name in names:
+                mask &= self._has[name]
+            rows = self._queries[names] = np.flatnonzero(mask)
+        return rows
+
+    # --- связь со сценой ---
+
+    def track(self, entity, **components):
+        """Заводит строку для сущности сцены: позиция и enabled обновляются из неё каждый тик"""
+        eid = self.spawn(entity, tracked=True, enabled=entity.enabled, **components)
+        self._tracked[id(entity)] = eid
+        return eid
+
+    def id_of(self, entity):
+        """Номер отслеживаемой сущности; -1 - не отслеживается (или None)"""
+        return self._tracked.get(id(entity), -1)
+
+    def teleport(self, entity):
+        """Позиция отслеживаемой сущности без "хвоста" старой (после восстановления снимка)"""
+        eid = self.id_of(entity)
+        if eid >= 0:
+            self._components['position'][eid] = self._components['prev_position'][eid] = entity.getPos()
+
+    def _pull(self):
+        rows = self.query('tracked')
+        if not len(rows):
+            return
+        position, enabled, proxies = self._components['position'], self._components['enabled'], self.proxies
+        gone = []
+        for eid in rows.tolist():
+            entity = proxies[eid]
+            if entity.is_empty():
+                gone.append(eid)
+                continue
+            position[eid] = entity.getPos()
+            enabled[eid] = entity.enabled
+        if gone:
+            self.despawn(np.array(gone))
+
+    def tick(self, dt):
+        """Один тик: позиции из сцены, затем все системы по порядку (система Simulation)"""
+        start = perf_counter()
+        self._components['prev_position'][:] = self._components['position']
+        self._pull()
+        for system in self.systems:
+            system(self, dt)
+        self.tick_ms = (perf_counter() - start) * 1000
+        if self.tick_ms > self.max_tick_ms:
+            self.max_tick_ms = self.tick_ms
+
+    def add_system(self, system):
+        self.systems.append(system)
+        return system
+
+    def sync(self, alpha=1.0):
+        """Раз в кадр: интерполированные позиции - в прокси отрисовки"""
+        start = perf_counter()
+        rows = self.query('rendered')
+        if len(rows):
+            prev = self._components['prev_position'][rows]
+            positions = prev + (self._components['position'][rows] - prev) * alpha
+            proxies = self.proxies
+            for eid, (x, y, z) in zip(rows.tolist(), positions.tolist()):
+                proxies[eid].setPos(x, y, z)
+        self.sync_ms = (perf_counter() - start) * 1000
+
+    def stats(self):
+        return {'entities': len(self), 'capacity': self.capacity, 'max_tick_ms': self.max_tick_ms,
+                'sync_ms': self.sync_ms}
+
+
+def benchmark(counts=(100, 1000, 5000), frames=60):
+    """Кадр с count движущимися объектами: update() у каждой сущности Ursina против системы World"""
+    from ursina import Ursina, Entity, Vec3, time, destroy
+
+    app = Ursina(window_type='none')
+    rng = np.random.default_rng(0)
+
+    class Mover(Entity):
+        def update(self):
+            self.velocity.y -= 9.8 * time.dt
+            self.position += self.velocity * time.dt
+            if self.y < -10:
+                self.position = Vec3(0, 10, 0)
+                self.velocity = Vec3(0, 0, 0)
+
+    def move(world, dt):
+        rows = world.query('velocity')
+        velocity, position = world['velocity'], world['position']
+        velocity[rows, 1] -= 9.8 * dt
+        position[rows] += velocity[rows] * dt
+        fallen = rows[position[rows, 1] < -10]
+        position[fallen] = (0, 10, 0)
+        velocity[fallen] = 0
+
+    def frame_ms(step):
+        times = []
+        for _ in range(frames):
+            start = perf_counter()
+            step()
+            times.append(perf_counter() - start)
+        times.sort()
+        return times[len(times) // 2] * 1000
+
+    results = {}
+    idle = frame_ms(taskMgr.step)
+    for count in counts:
+        starts = rng.uniform(-50, 50, (count, 3))
+        movers = []
+        for p in starts:
+            mover = Mover(position=Vec3(*p))
+            mover.velocity = Vec3(0, 0, 0)
+            movers.append(mover)
+        entities = frame_ms(taskMgr.step) - idle
+        for mover in movers:
+            destroy(mover)
+
+        # Те же объекты: данные в World, в сцене - простые сущности без update()
+        world = World(capacity=count)
+        world.register('velocity', np.float32, 3)
+        world.add_system(move)
+        proxies = [Entity(position=Vec3(*p)) for p in starts]
+        for proxy in proxies:
+            world.spawn(proxy, velocity=(0, 0, 0))
+
+        def step():
+            world.tick(1 / 60)
+            world.sync()
+            taskMgr.step()
+        ecs = frame_ms(step) - idle
+        results[count] = {'entities': entities, 'world': ecs, 'tick': world.tick_ms, 'sync': world.sync_ms}
+        for proxy in proxies:
+            destroy(proxy)
+    return results
+
+
+if __name__ == '__main__':
+    results = benchmark()
+    print(f"{'объектов':>10}{'update(), мс':>16}{'World, мс':>14}{'из них тик':>14}{'sync':>10}")
+    for count, r in results.items():
+        print(f"{count:>10}{r['entities']:>16.3f}{r['world']:>14.3f}{r['tick']:>14.3f}{r['sync']:>10.3f}")
@@ -0,0 +1,122 @@
+import atexit
+import logging
+import os
+import queue
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+# Все игровые логгеры живут под этим корнем: game.dragon, game.player, ...
+ROOT = 'game'
+
+# Уровни по умолчанию для категорий; переопределяются через setup(levels=...) или GAME_LOG
+DEFAULT_LEVELS = {
+    '': 'INFO',
+}
+
+_listener = None
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Кладёт запись в очередь как есть: строка собирается уже в фоновом потоке"""
+
+    def prepare(self, record):
+        return record
+
+
+class RateLimitFilter(logging.Filter):
+    """Пропускает не больше burst одинаковых сообщений за interval секунд.
+
+    Одинаковыми считаются записи с тем же логгером и шаблоном (без аргументов),
+    поэтому "урон %s" с разными числами тоже схлопывается. Число подавленных
+    повторов дописывается к следующей пропущенной записи.
+    """
+
+    def __init__(self, interval=1.0, burst=1):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self._windows = {}      # (логгер, шаблон) -> [начало окна, пропущено, подавлено]
+
+    def filter(self, record):
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            suppressed = window[2] if window else 0
+            self._windows[key] = [now, 1, 0]
+            record.suppressed = suppressed
+            return True
+        if window[1] < self.burst:
+            window[1] += 1
+            record.suppressed = 0
+            return True
+        window[2] += 1
+        return False
+
+
+class _GameFormatter(logging.Formatter):
+    def format(self, record):
+        text = super().format(record)
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            text += f' (ещё {suppressed} таких же)'
+        return text
+
+
+def parse_levels(spec):
+    """'dragon=DEBUG,fireball=WARNING,INFO' -> {'dragon': 'DEBUG', 'fireball': 'WARNING', '': 'INFO'}"""
+    levels = {}
+    for part in filter(None, (p.strip() for p in spec.split(','))):
+        name, _, level = part.rpartition('=')
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup(levels=None, stream=None, interval=1.0, burst=1, fmt='%(message)s'):
+    """Настраивает логирование игры: очередь + фоновый писатель, уровни по категориям, антиспам.
+
+    Повторный вызов перенастраивает всё заново. Уровни из переменной окружения
+    GAME_LOG имеют приоритет над переданными.
+    """
+    global _listener
+    shutdown()
+
+    merged = dict(DEFAULT_LEVELS)
+    merged.update(levels or {})
+    merged.update(parse_levels(os.environ.get('GAME_LOG', '')))
+
+    root = logging.getLogger(ROOT)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.propagate = False
+    for name, level in merged.items():
+        get(name).setLevel(level)
+
+    # Вывод (и форматирование) - в отдельном потоке, игровой поток только кладёт запись в очередь
+    writer = logging.StreamHandler(stream or sys.stdout)
+    writer.setFormatter(_GameFormatter(fmt))
+    records = queue.SimpleQueue()
+    handler = _DeferredQueueHandler(records)
+    handler.addFilter(RateLimitFilter(interval, burst))
+    root.addHandler(handler)
+
+    _listener = QueueListener(records, writer, respect_handler_level=True)
+    _listener.start()
+    return root
+
+
+def shutdown():
+    """Дописывает всё из очереди и останавливает фоновый поток"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get(category=''):
+    """Логгер категории: get('dragon') -> game.dragon"""
+    return logging.getLogger(f'{ROOT}.{category}' if category else ROOT)
+
+
+atexit.register(shutdown)
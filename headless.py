@@ -0,0 +1,177 @@
+from ursina import *
+from panda3d.core import ClockObject
+from time import perf_counter
+import argparse
+import gc
+import json
+import sys
+
+# Сценарий по умолчанию: (кадр, действие, клавиша)
+# Идём к дракону (он уже в радиусе триггера), делаем рывок, прыгаем и бьём его
+DEFAULT_SCRIPT = [
+    (0, 'hold', 'w'),
+    (90, 'press', 'q'),
+    (150, 'press', 'space'),
+    (240, 'release', 'w'),
+] + [(300 + i * 60, 'press', 'f') for i in range(12)]
+
+# Проверка перезапуска: игрок погибает около 600-го кадра, жмёт F на экране проигрыша, затем R.
+# После перезапуска дракон должен быть с полным здоровьем - нажатия на паузе не доходят до игры
+RESTART_SCRIPT = DEFAULT_SCRIPT + [(1000, 'press', 'r')]
+
+SCRIPTS = {'default': DEFAULT_SCRIPT, 'restart': RESTART_SCRIPT}
+
+
+def parse_args(argv=None):
+    """Разбирает ключи запуска без окна; возвращает None, если запуск обычный"""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--headless', action='store_true')
+    parser.add_argument('--frames', type=int, default=3000)
+    parser.add_argument('--fps', type=int, default=60)
+    parser.add_argument('--script', choices=SCRIPTS, default='default', help='сценарий ввода (restart - проверка перезапуска)')
+    parser.add_argument('--report', default=None, help='куда сохранить отчёт в JSON')
+    parser.add_argument('--trace', default=None, help='куда сохранить трассу кадров (Chrome Trace JSON)')
+    parser.add_argument('--record', default=None, help='куда записать поток ввода (JSON)')
+    parser.add_argument('--replay', default=None, help='запись ввода, которую подать вместо сценария')
+    args, _ = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+    return args if args.headless else None
+
+
+def prepare_headless(fps=60):
+    """Готовит движок к работе без окна (window_type='none')"""
+    # Без окна Ursina не настраивает камеру, а префабы (например Sky) читают эти поля
+    camera._clip_plane_near = 0.1
+    camera._clip_plane_far = 10000
+    camera._fov = 90
+
+    # Игровое время идёт ровно 1/fps за кадр независимо от скорости машины
+    clock = ClockObject.getGlobalClock()
+    clock.setMode(ClockObject.MNonRealTime)
+    clock.setFrameRate(fps)
+
+
+class ScriptedInput:
+    """Подаёт заранее записанные нажатия клавиш по номерам кадров"""
+
+    def __init__(self, app, script=DEFAULT_SCRIPT):
+        self.app = app
+        self.script = sorted(script, key=lambda e: e[0])
+        self.index = 0
+
+    def feed(self, frame):
+        while self.index < len(self.script) and self.script[self.index][0] <= frame:
+            _, action, key = self.script[self.index]
+            self.index += 1
+            if action in ('hold', 'press'):
+                self._send(key)
+            if action in ('release', 'press'):
+                self._send(key, up=True)
+
+    def _send(self, key, up=False):
+        # Буквенные клавиши Ursina принимает только как "сырые" события
+        is_raw = key in 'abcdefghijklmnopqrstuvwxyz0123456789' and len(key) == 1
+        if up:
+            self.app.input_up(key, is_raw)
+        else:
+            self.app.input(key, is_raw)
+
+
+class Benchmark:
+    """Прогоняет игру без окна N кадров и собирает время по системам и число аллокаций"""
+
+    def __init__(self, app, sim, frames=3000, script=DEFAULT_SCRIPT):
+        self.app = app
+        self.sim = sim
+        self.frames = frames
+        self.input = ScriptedInput(app, script)
+        self.timings = {}
+        self.sim.timings = self.timings
+
+    def time_entity(self, entity, label):
+        """Замеряет update() сущности, которую вызывает сам Ursina"""
+        original = entity.update
+        timings = self.timings
+
+        def timed_update():
+            start = perf_counter()
+            original()
+            timings[label] = timings.get(label, 0) + perf_counter() - start
+
+        entity.update = timed_update
+
+    def run(self):
+        gc_before = [s['collections'] for s in gc.get_stats()]
+        blocks_before = sys.getallocatedblocks()
+        ticks_before = self.sim.tick_count
+        frame_times = []
+
+        start = perf_counter()
+        for frame in range(self.frames):
+            self.input.feed(frame)
+            frame_start = perf_counter()
+            self.app.step()
+            frame_times.append(perf_counter() - frame_start)
+        elapsed = perf_counter() - start
+
+        ticks = self.sim.tick_count - ticks_before
+        frame_times.sort()
+        return {
+            'frames': self.frames,
+            'ticks': ticks,
+            'seconds': elapsed,
+            'ticks_per_second': ticks / elapsed if elapsed else 0,
+            'frame_ms_p50': frame_times[len(frame_times) // 2] * 1000,
+            'frame_ms_p99': frame_times[int(len(frame_times) * 0.99)] * 1000,
+            'systems_ms_per_tick': {k: v * 1000 / max(ticks, 1) for k, v in sorted(self.timings.items())},
+            'allocated_blocks_delta': sys.getallocatedblocks() - blocks_before,
+            'gc_collections': [s['collections'] - b for s, b in zip(gc.get_stats(), gc_before)],
+            'entities': len(scene.entities),
+        }
+
+
+def print_report(report):
+    print(f"⏱ {report['frames']} кадров, {report['ticks']} тиков за {report['seconds']:.2f} с "
+          f"({report['ticks_per_second']:.0f} тиков/с)")
+    print(f"   кадр: p50 {report['frame_ms_p50']:.3f} мс, p99 {report['frame_ms_p99']:.3f} мс")
+    for name, ms in report['systems_ms_per_tick'].items():
+        print(f"   {name:<20} {ms:.4f} мс/тик")
+    print(f"   аллокации (блоков): {report['allocated_blocks_delta']:+d}, "
+          f"сборки мусора: {report['gc_collections']}, сущностей: {report['entities']}")
+    if 'ai' in report:
+        ai = report['ai']
+        print(f"   ИИ: агентов {ai['agents']}, в среднем {ai['avg_ran_per_tick']:.2f} за тик "
+              f"(максимум {ai['max_ran_per_tick']})")
+    if 'ground' in report:
+        g = report['ground']
+        queries = max(g['ground_queries'], 1)
+        print(f"   земля: {g['ground_queries']} запросов, лучей {g['raycasts']}, "
+              f"{g['ground_ms'] / queries * 1000:.1f} мкс/запрос; свипов {g['sweeps']}, "
+              f"{g['sweep_ms'] / max(g['sweeps'], 1) * 1000:.1f} мкс/свип")
+    if 'draw_calls' in report:
+        d = report['draw_calls']
+        print(f"   вызовы отрисовки: {d['before']} без батчей -> {d['after']} с батчами")
+    if 'combat' in report:
+        c = report['combat']
+        print(f"   бой: событий {c['events']}, применено изменений здоровья {c['applied']}, "
+              f"разбор {c['resolve_ms']:.3f} мс всего")
+    if 'ecs' in report:
+        e = report['ecs']
+        print(f"   ECS: сущностей {e['entities']} (ёмкость {e['capacity']}), худший тик {e['max_tick_ms']:.3f} мс, "
+              f"синхронизация {e['sync_ms']:.3f} мс")
+    if 'timers' in report:
+        t = report['timers']
+        print(f"   таймеры: сработало {t['fired']}, отменено {t['cancelled']}, ждут {t['pending']}, "
+              f"отложено бюджетом {t['deferred']}, худший тик {t['max_tick_ms']:.3f} мс")
+    if 'lod' in report:
+        lod = report['lod']
+        print(f"   LOD существ: {lod['models']} моделей, по уровням {lod['tiers']}, скрыто {lod['culled']}, "
+              f"проверка {lod['check_ms']:.3f} мс")
+    if 'restart' in report:
+        r = report['restart']
+        print(f"   {'✅' if r['ok'] else '❌'} перезапуск: дракон {r['dragon_health']}/{r['dragon_max']}, "
+              f"игрок {'жив' if r['player_alive'] else 'мёртв'}")
+
+
+def save_report(report, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,314 @@
+from ursina import *
+from panda3d.core import (BoundingSphere, Geom, GeomEnums, GeomTriangles, GeomVertexData, SparseArray,
+                          TransformBlendTable)
+from time import perf_counter
+import numpy as np
+
+# Уровни детализации: размер клетки кластеризации вершин в долях диагонали модели (None - исходная сетка)
+LOD_CELLS = (None, 1 / 64, 1 / 24)
+
+
+def cluster_triangles(positions, triangles, cell):
+    """Упрощение кластеризацией: вершины одной клетки сетки сливаются в одну (первую из них),
+    вырожденные и повторяющиеся треугольники выбрасываются.
+
+    Возвращает (номера исходных вершин, которые остаются; треугольники в новой нумерации).
+    """
+    lo = positions.min(axis=0)
+    q = np.floor((positions - lo) / cell).astype(np.int64)
+    _, first, cluster = np.unique(q, axis=0, return_index=True, return_inverse=True)
+    tris = cluster.ravel()[triangles]
+    tris = tris[(tris[:, 0] != tris[:, 1]) & (tris[:, 1] != tris[:, 2]) & (tris[:, 0] != tris[:, 2])]
+    _, unique = np.unique(np.sort(tris, axis=1), axis=0, return_index=True)
+    tris = tris[np.sort(unique)]
+
+    used = np.unique(tris)
+    remap = np.full(len(first), -1, dtype=np.int64)
+    remap[used] = np.arange(len(used))
+    return first[used], remap[tris]
+
+
+def _read_geom(geom):
+    """Позиции вершин и треугольники Geom как массивы NumPy"""
+    vdata = geom.getVertexData()
+    array_format = vdata.getFormat().getArray(0)
+    column = array_format.getColumn('vertex')
+    raw = np.frombuffer(vdata.getArray(0).getHandle().getData(), dtype=np.uint8).reshape(-1, array_format.getStride())
+    start = column.getStart()
+    positions = raw[:, start:start + 12].copy().view(np.float32).reshape(-1, 3)
+
+    triangles = []
+    for p in range(geom.getNumPrimitives()):
+        prim = geom.getPrimitive(p).decompose()
+        dtype = np.uint32 if prim.getIndexType() == GeomEnums.NT_uint32 else np.uint16
+        if prim.isIndexed():
+            indices = np.frombuffer(prim.getVertices().getHandle().getData(), dtype=dtype).astype(np.int64)
+        else:
+            indices = np.arange(prim.getFirstVertex(), prim.getFirstVertex() + prim.getNumVertices())
+        triangles.append(indices.reshape(-1, 3))
+    return positions, np.concatenate(triangles)
+
+
+def _make_triangles(tris, vertex_count):
+    prim = GeomTriangles(Geom.UH_static)
+    if vertex_count < 0xffff:
+        prim.setIndexType(GeomEnums.NT_uint16)
+        data = tris.astype(np.uint16).tobytes()
+    else:
+        prim.setIndexType(GeomEnums.NT_uint32)
+        data = tris.astype(np.uint32).tobytes()
+    prim.modifyVertices().modifyHandle().setData(data)
+    return prim
+
+
+def compact_vertex_data(vdata, rows):
+    """Копия вершинных данных только с нужными строками (скиннинг считает меньше вершин).
+
+    Таблица весов костей остаётся той же - копия привязана к скелету исходного Actor.
+    """
+    new = GeomVertexData(vdata)
+    for i in range(vdata.getNumArrays()):
+        stride = vdata.getFormat().getArray(i).getStride()
+        src = np.frombuffer(vdata.getArray(i).getHandle().getData(), dtype=np.uint8).reshape(-1, stride)
+        new.modifyArrayHandle(i).setData(src[rows].tobytes())
+    table = vdata.getTransformBlendTable()
+    if table is not None:
+        table = TransformBlendTable(table)
+        table.setRows(SparseArray.range(0, len(rows)))
+        new.setTransformBlendTable(table)
+    return new
+
+
+class LODPlan:
+    """Упрощённые сетки модели: общие для всех её копий (как AnimationSet), строятся один раз"""
+    _cache = {}
+
+    def __init__(self, geoms, cells=LOD_CELLS):
+        # tiers[уровень][слот] = (оставшиеся вершины, GeomTriangles) или None для исходной сетки
+        self.tiers = [[None] * len(geoms)]
+        self.triangles = [sum(len(_read_geom(g)[1]) for g in geoms)]
+        for cell in cells[1:]:
+            tier = []
+            count = 0
+            for geom in geoms:
+                positions, triangles = _read_geom(geom)
+                diagonal = float(np.linalg.norm(positions.max(axis=0) - positions.min(axis=0)))
+                rows, tris = cluster_triangles(positions, triangles, max(diagonal * cell, 1e-6))
+                tier.append((rows, _make_triangles(tris, len(rows))))
+                count += len(tris)
+            self.tiers.append(tier)
+            self.triangles.append(count)
+
+    @classmethod
+    def get(cls, model_name, actor, cells=LOD_CELLS):
+        plan = cls._cache.get(model_name)
+        if plan is None:
+            plan = cls._cache[model_name] = cls(_geom_slots(actor)[1], cells)
+        return plan
+
+
+def _geom_slots(actor):
+    """Все Geom модели по порядку: [(GeomNode, номер)], [Geom]"""
+    slots, geoms = [], []
+    for path in actor.findAllMatches('**/+GeomNode'):
+        node = path.node()
+        for i in range(node.getNumGeoms()):
+            slots.append((node, i))
+            geoms.append(node.getGeom(i))
+    return slots, geoms
+
+
+class LODModel:
+    """Уровни детализации одной копии модели: переключение - подмена Geom в её GeomNode"""
+    __slots__ = ('owner', 'actor', 'slots', 'geoms', 'tier', 'center', 'radius', 'culled')
+
+    def __init__(self, owner, actor, plan):
+        self.owner = owner
+        self.actor = actor
+        self.slots, original = _geom_slots(actor)
+        self.geoms = [original]
+        for tier in plan.tiers[1:]:
+            geoms = []
+            for geom, (rows, prim) in zip(original, tier):
+                simplified = Geom(compact_vertex_data(geom.getVertexData(), rows))
+                simplified.addPrimitive(prim)
+                geoms.append(simplified)
+            self.geoms.append(geoms)
+        self.tier = 0
+        self.culled = False
+
+        # Ограничивающая сфера в координатах владельца (по позе привязки)
+        lo, hi = actor.getTightBounds(owner)
+        self.center = (lo + hi) * 0.5
+        self.radius = (hi - lo).length() * 0.5
+
+    def set_tier(self, tier):
+        if tier == self.tier:
+            return
+        for (node, i), geom in zip(self.slots, self.geoms[tier]):
+            node.setGeom(i, geom)
+        self.tier = tier
+
+
+class CreatureLOD(Entity):
+    """LOD и отсечение моделей существ.
+
+    Уровень выбирается по размеру на экране (доля высоты кадра) с гистерезисом, чтобы модель не
+    мигала на границе. Меньше последнего порога, вне поля зрения или за рельефом модель не рисуется,
+    а её анимации встают на паузу (через visibility у AnimationSystem).
+    """
+
+    def __init__(self, thresholds=(0.3, 0.1, 0.01), hysteresis=0.15, check_interval=0.1, terrain=None, **kwargs):
+        super().__init__(eternal=True, **kwargs)
+        self.thresholds = thresholds    # крупнее thresholds[0] - LOD 0, ..., мельче последнего - не рисуем
+        self.hysteresis = hysteresis
+        self.check_interval = check_interval
+        self.terrain = terrain          # Terrain с heights_at - заслонение холмами
+        self.models = []
+        self._by_owner = {}
+        self._timer = 0
+        self.check_ms = 0.0
+        self.checks = 0
+
+    def add(self, owner, actor, model_name):
+        model = LODModel(owner, actor, LODPlan.get(model_name, actor))
+        self.models.append(model)
+        self._by_owner[id(owner)] = model
+        return model
+
+    def remove(self, owner):
+        model = self._by_owner.pop(id(owner), None)
+        if model is not None:
+            self.models.remove(model)
+
+    def is_visible(self, machine):
+        """Для AnimationSystem(visibility=...): анимировать ли модель автомата"""
+        model = self._by_owner.get(id(machine.owner))
+        return model is None or not model.culled
+
+    def _pick(self, size, tier):
+        # Переход на более детальный уровень - только заметно выше порога, на грубый - заметно ниже
+        h = self.hysteresis
+        while tier > 0 and size >= self.thresholds[tier - 1] * (1 + h):
+            tier -= 1
+        while tier < len(self.thresholds) and size < self.thresholds[tier] * (1 - h):
+            tier += 1
+        return tier
+
+    def _occluded(self, eye, point, samples=12):
+        terrain = self.terrain
+        # Отрезок целиком выше самого высокого холма - заслонять нечему
+        if terrain is None or min(eye[1], point[1]) > terrain.amplitude:
+            return False
+        # Высоты - из сеток загруженных чанков (height_at), с выходом на первом пересечении
+        for i in range(1, samples):
+            t = i / samples
+            if eye[1] + (point[1] - eye[1]) * t < terrain.height_at(eye[0] + (point[0] - eye[0]) * t,
+                                                                    eye[2] + (point[2] - eye[2]) * t):
+                return True
+        return False
+
+    def update(self):
+        self._timer -= time.dt
+        if self._timer > 0:
+            return
+        self._timer = self.check_interval
+        start = perf_counter()
+
+        if any(m.actor.is_empty() for m in self.models):
+            for model in [m for m in self.models if m.actor.is_empty()]:
+                self.remove(model.owner)
+
+        eye = camera.getPos(scene)
+        lens = getattr(camera, 'lens', None)
+        cam = application.base.cam
+        lens_bounds = lens.makeBounds() if lens is not None and cam else None
+        fov = lens.getFov()[1] if lens is not None else camera.fov
+        half_height = math.tan(math.radians(fov) * 0.5)
+
+        for model in self.models:
+            owner = model.owner
+            center = scene.getRelativePoint(owner, model.center)
+            radius = model.radius * owner.getScale(scene)[0]
+            distance = max((center - eye).length(), 1e-3)
+            tier = self._pick(radius / (distance * half_height), model.tier if not model.culled else len(self.thresholds))
+
+            visible = tier < len(self.thresholds)
+            if visible and lens_bounds is not None:
+                sphere = BoundingSphere(cam.getRelativePoint(scene, center), radius)
+                visible = bool(lens_bounds.contains(sphere))
+            if visible:
+                visible = not self._occluded(eye, center + Vec3(0, radius, 0))
+
+            if visible:
+                model.set_tier(min(tier, len(model.geoms) - 1))
+            if visible == model.culled:
+                model.culled = not visible
+                if visible:
+                    model.actor.show()
+                else:
+                    model.actor.hide()
+
+        self.checks += 1
+        self.check_ms += (perf_counter() - start) * 1000
+
+    def stats(self):
+        tiers = [0] * (len(LOD_CELLS) + 1)
+        for model in self.models:
+            tiers[len(LOD_CELLS) if model.culled else model.tier] += 1
+        return {'models': len(self.models), 'tiers': tiers[:-1], 'culled': tiers[-1],
+                'check_ms': self.check_ms / max(self.checks, 1)}
+
+
+def benchmark(count=48, frames=120, model_name='test10.glb'):
+    """Кадр с count драконами на разных расстояниях (часть - за спиной): без LOD и с ним.
+
+    Нужен настоящий рендер - запускается в окне offscreen.
+    """
+    from assets import AssetManager
+    import random
+
+    assets = AssetManager()
+    rng = random.Random(0)
+    owners = []
+    for i in range(count):
+        owner = Entity(position=(rng.uniform(-150, 150), 0, rng.uniform(-60, 300)), rotation_y=rng.uniform(0, 360),
+                       scale=2)
+        actor = assets.actor(model_name)
+        actor.reparent_to(owner)
+        actor.setScale(0.1)
+        actor.loop(actor.getAnimNames()[0])
+        owners.append((owner, actor))
+    camera.position = (0, 6, -20)
+    camera.rotation = (5, 0, 0)
+
+    def measure():
+        for _ in range(10):
+            taskMgr.step()
+        times = []
+        for _ in range(frames):
+            start = perf_counter()
+            taskMgr.step()
+            times.append(perf_counter() - start)
+        times.sort()
+        return times[len(times) // 2] * 1000
+
+    plain = measure()
+    lod = CreatureLOD(check_interval=0)
+    for owner, actor in owners:
+        lod.add(owner, actor, model_name)
+    with_lod = measure()
+    plan = LODPlan.get(model_name, None)
+    stats = lod.stats()
+    triangles = sum(plan.triangles[m.tier] for m in lod.models if not m.culled)
+    return {'models': count, 'plain_ms': plain, 'lod_ms': with_lod, 'tiers': stats['tiers'], 'culled': stats['culled'],
+            'triangles': (plan.triangles[0] * count, triangles), 'check_ms': stats['check_ms']}
+
+
+if __name__ == '__main__':
+    app = Ursina(window_type='offscreen', size=(1280, 720))
+    result = benchmark()
+    print(f"моделей: {result['models']}, уровни LOD {result['tiers']}, скрыто {result['culled']}")
+    print(f"треугольников: {result['triangles'][0]} -> {result['triangles'][1]}")
+    print(f"кадр (медиана): без LOD {result['plain_ms']:.2f} мс, с LOD {result['lod_ms']:.2f} мс "
+          f"(проверка {result['check_ms']:.3f} мс)")
@@ -0,0 +1,124 @@
+from ursina import *
+import numpy as np
+
+# Углы billboard-квада (в долях половины размера) и UV для них
+QUAD_CORNERS = np.array([(-1, -1), (1, -1), (1, 1), (-1, 1)], dtype=np.float32)
+QUAD_UVS = np.array([(0, 0), (1, 0), (1, 1), (0, 1)], dtype=np.float32)
+# Формат вершины: позиция, цвет, UV
+VERTEX_FORMAT = 'p3f,c4f,t2f'
+VERTEX_SIZE = 9
+
+
+def quad_indices(capacity):
+    """Заранее считает индексы треугольников для capacity квадов"""
+    base = np.arange(capacity, dtype=np.uint32)[:, None] * 4
+    return (base + np.array([0, 1, 2, 2, 3, 0], dtype=np.uint32)).ravel()
+
+
+def build_billboards(positions, half_sizes, colors, right, up):
+    """Собирает вершинный буфер из повернутых к камере квадов (все частицы сразу)"""
+    count = len(positions)
+    buffer = np.empty((count, 4, VERTEX_SIZE), dtype=np.float32)
+    offsets = QUAD_CORNERS[:, 0, None] * right + QUAD_CORNERS[:, 1, None] * up
+    buffer[:, :, 0:3] = positions[:, None, :] + offsets[None, :, :] * half_sizes[:, None, None]
+    buffer[:, :, 3:7] = colors[:, None, :]
+    buffer[:, :, 7:9] = QUAD_UVS
+    return buffer
+
+
+def upload_billboards(mesh, buffer, indices):
+    """Загружает буфер квадов в меш (пустой буфер очищает меш)"""
+    count = len(buffer)
+    if count == 0:
+        mesh.vertex_buffer = None
+        mesh.vertices = []
+        mesh.triangles = []
+    else:
+        mesh.vertex_buffer = buffer
+        mesh.vertex_buffer_length = count * 4
+        mesh.triangles = indices[:count * 6]
+    mesh.generate()
+
+
+class ParticleSystem(Entity):
+    """Пул частиц фиксированного размера: данные в массивах NumPy, отрисовка одним мешем"""
+
+    def __init__(self, capacity=2048, gravity=0, texture='circle', **kwargs):
+        mesh = Mesh(static=False, vertex_buffer_format=VERTEX_FORMAT)
+        super().__init__(
+            model=mesh,
+            texture=texture,
+            double_sided=True,
+            **kwargs
+        )
+        self.mesh = mesh
+        self.capacity = capacity
+        self.gravity = gravity
+
+        self.positions = np.zeros((capacity, 3), dtype=np.float32)
+        self.velocities = np.zeros((capacity, 3), dtype=np.float32)
+        self.start_colors = np.zeros((capacity, 4), dtype=np.float32)
+        self.end_colors = np.zeros((capacity, 4), dtype=np.float32)
+        self.start_sizes = np.zeros(capacity, dtype=np.float32)
+        self.end_sizes = np.zeros(capacity, dtype=np.float32)
+        self.ages = np.zeros(capacity, dtype=np.float32)
+        self.lifetimes = np.ones(capacity, dtype=np.float32)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+        self._indices = quad_indices(capacity)
+        self._drawn = 0
+
+    @property
+    def alive_count(self):
+        return int(np.count_nonzero(self.alive))
+
+    def emit(self, position, count=1, velocity=(0, 0, 0), spread=0, color=color.white,
+             end_color=color.clear, size=1, end_size=None, life=1):
+        """Выпускает частицы; если пул заполнен, лишние отбрасываются"""
+        slots = np.flatnonzero(~self.alive)[:count]
+        n = len(slots)
+        if n == 0:
+            return 0
+
+        self.positions[slots] = tuple(position)
+        self.velocities[slots] = tuple(velocity)
+        if spread:
+            self.velocities[slots] += np.random.uniform(-spread, spread, (n, 3))
+        self.start_colors[slots] = tuple(color)
+        self.end_colors[slots] = tuple(end_color)
+        self.start_sizes[slots] = size
+        self.end_sizes[slots] = size if end_size is None else end_size
+        self.ages[slots] = 0
+        self.lifetimes[slots] = life
+        self.alive[slots] = True
+        return n
+
+    def clear(self):
+        """Убивает все частицы"""
+        self.alive[:] = False
+        if self._drawn:
+            upload_billboards(self.mesh, self.positions[:0], self._indices)
+            self._drawn = 0
+
+    def update(self):
+        if not self._drawn and not self.alive.any():
+            return
+
+        dt = time.dt
+        alive = self.alive
+        self.ages += dt
+        alive &= self.ages < self.lifetimes
+
+        self.velocities[:, 1] -= self.gravity * dt
+        self.positions += self.velocities * dt
+
+        idx = np.flatnonzero(alive)
+        t = self.ages[idx] / self.lifetimes[idx]
+        sizes = self.start_sizes[idx] + (self.end_sizes[idx] - self.start_sizes[idx]) * t
+        colors = self.start_colors[idx] + (self.end_colors[idx] - self.start_colors[idx]) * t[:, None]
+
+        right = np.array(camera.right, dtype=np.float32)
+        up = np.array(camera.up, dtype=np.float32)
+        buffer = build_billboards(self.positions[idx], sizes * 0.5, colors, right, up)
+        upload_billboards(self.mesh, buffer, self._indices)
+        self._drawn = len(idx)
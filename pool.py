@@ -0,0 +1,56 @@
+from ursina import *
+
+
+class EntityPool:
+    """Пул заранее созданных сущностей: acquire() выдаёт, release() выключает и возвращает в пул"""
+
+    def __init__(self, factory, size=16, grow=True):
+        self.factory = factory
+        self.grow = grow            # создавать новые сущности, если пул опустел
+        self.items = []
+        self._free = []
+        self._in_use = set()
+        for i in range(size):
+            self._create()
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def active_count(self):
+        return len(self._in_use)
+
+    def _create(self):
+        entity = self.factory()
+        entity.enabled = False
+        self.items.append(entity)
+        self._free.append(entity)
+        return entity
+
+    def acquire(self, **kwargs):
+        """Выдаёт свободную сущность; kwargs передаются в её reset()"""
+        if not self._free:
+            if not self.grow:
+                return None
+            self._create()
+
+        entity = self._free.pop()
+        self._in_use.add(id(entity))
+        if hasattr(entity, 'reset'):
+            entity.reset(**kwargs)
+        entity.enabled = True
+        return entity
+
+    def release(self, entity):
+        """Выключает сущность и возвращает её в пул (повторный release игнорируется)"""
+        if id(entity) not in self._in_use:
+            return
+        self._in_use.discard(id(entity))
+        entity.enabled = False
+        if hasattr(entity, 'on_release'):
+            entity.on_release()
+        self._free.append(entity)
+
+    def release_all(self):
+        for entity in self.items:
+            self.release(entity)
@@ -0,0 +1,257 @@
+from ursina import *
+from panda3d.core import TextNode
+from time import perf_counter
+import json
+import numpy as np
+
+import gamelog
+
+log = gamelog.get('profiler')
+
+
+class _Scope:
+    """Контекстный менеджер замера; один объект на имя, чтобы не создавать их каждый кадр"""
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.profiler._stack.append(self.name)
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = perf_counter()
+        self.profiler._stack.pop()
+        self.profiler.record(self.name, self.start, end)
+        return False
+
+
+class _Label:
+    """Многострочная подпись на одном TextNode.
+
+    Text.text при каждом изменении пересоздаёт узлы и заново меряет строки (~1 мс на строку),
+    а оверлей обновляется несколько раз в секунду - здесь меняется только сам текст.
+    """
+
+    def __init__(self, parent, position, scale, color=color.white):
+        self.node = TextNode('profiler_label')
+        self.node.setFont(loader.loadFont(Text.default_font))
+        self.node.setTextColor(color)
+        self.path = parent.attachNewNode(self.node)
+        self.path.setScale(Text.size * scale)
+        # Как у Text с origin (-0.5, 0.5): позиция - левый верхний угол, а не базовая линия
+        self.path.setPos(position[0], position[1] - 0.75 * Text.size * scale, position[2])
+        self.line_height = self.node.getFont().getLineHeight() * Text.size * scale
+
+    @property
+    def text(self):
+        return self.node.getText()
+
+    @text.setter
+    def text(self, value):
+        self.node.setText(value)
+
+
+class FrameProfiler(Entity):
+    """Профайлер кадра: замеры систем в кольцевых буферах, оверлей поверх игры и трасса для chrome://tracing.
+
+    F3 - показать/скрыть оверлей, F4 - начать/закончить запись трассы.
+    """
+
+    def __init__(self, history=240, max_rows=10, refresh=0.25, budget_ms=1000 / 60,
+                 max_trace_events=200000, **kwargs):
+        super().__init__(
+            parent=camera.ui,
+            position=(0.45, 0.45),
+            ignore_paused=True,
+            eternal=True,
+            **kwargs
+        )
+        self.history = history          # сколько последних кадров хранится
+        self.max_rows = max_rows
+        self.refresh = refresh          # как часто перерисовывать оверлей (секунды)
+        self.budget_ms = budget_ms      # полная ширина полосы - один кадр при 60 FPS
+        self.max_trace_events = max_trace_events
+
+        self.frame_ms = np.zeros(history)
+        self.samples = {}               # имя -> np.array мс за кадр (кольцевой буфер)
+        self.parents = {}               # имя -> имя внешнего замера (None для верхнего уровня)
+        self.frame_count = 0
+        self._frame = {}                # накопленное за текущий кадр, секунды
+        self._scopes = {}
+        self._stack = []                # открытые сейчас замеры
+        self._last = None
+        self._refresh_timer = 0
+
+        self.trace = None               # список событий, пока идёт запись
+        self._trace_start = 0
+
+        self._build_overlay()
+        self.visible = False
+
+    # --- замеры ---
+
+    def scope(self, name):
+        """with profiler.scope('sim'): ... - замер блока кода"""
+        scope = self._scopes.get(name)
+        if scope is None:
+            scope = self._scopes[name] = _Scope(self, name)
+        return scope
+
+    def record(self, name, start, end):
+        """Добавляет готовый замер (perf_counter в начале и в конце)"""
+        self._frame[name] = self._frame.get(name, 0) + end - start
+        if name not in self.parents:
+            self.parents[name] = self._stack[-1] if self._stack else None
+        if self.trace is not None and len(self.trace) < self.max_trace_events:
+            self.trace.append((name, start, end - start, len(self._stack)))
+
+    def time_entity(self, entity, label):
+        """Замеряет update() сущности, которую вызывает сам Ursina"""
+        original = entity.update
+        scope = self.scope(label)
+
+        def timed_update():
+            with scope:
+                original()
+
+        entity.update = timed_update
+
+    def _end_frame(self, now):
+        slot = self.frame_count % self.history
+        if self._last is not None:
+            self.frame_ms[slot] = (now - self._last) * 1000
+            if self.trace is not None and len(self.trace) < self.max_trace_events:
+                self.trace.append(('frame', self._last, now - self._last, -1))
+        for name, buffer in self.samples.items():
+            buffer[slot] = self._frame.pop(name, 0) * 1000
+        for name, seconds in self._frame.items():
+            self.samples[name] = buffer = np.zeros(self.history)
+            buffer[slot] = seconds * 1000
+        self._frame.clear()
+        self.frame_count += 1
+        self._last = now
+
+    # --- статистика ---
+
+    def _filled(self, buffer):
+        return buffer if self.frame_count >= self.history else buffer[:self.frame_count]
+
+    def percentiles(self, q=(50, 95, 99)):
+        """Перцентили времени кадра (мс) по последним history кадрам"""
+        frames = self._filled(self.frame_ms)
+        if len(frames) == 0:
+            return {p: 0.0 for p in q}
+        return dict(zip(q, np.percentile(frames, q).tolist()))
+
+    def averages(self):
+        """Среднее время каждой системы за кадр (мс), от самых дорогих"""
+        result = {name: float(self._filled(buffer).mean()) for name, buffer in self.samples.items()
+                  if self.frame_count}
+        return dict(sorted(result.items(), key=lambda item: -item[1]))
+
+    def tree(self):
+        """Строки (имя, глубина, мс) в порядке flame graph: дочерние замеры сразу под родителем"""
+        averages = self.averages()
+        children = {}
+        for name in averages:
+            children.setdefault(self.parents.get(name), []).append(name)
+
+        rows = []
+
+        def walk(parent, depth):
+            for name in children.get(parent, ()):
+                rows.append((name, depth, averages[name]))
+                walk(name, depth + 1)
+
+        walk(None, 0)
+        return rows
+
+    # --- трасса ---
+
+    def start_trace(self):
+        self.trace = []
+        self._trace_start = perf_counter()
+
+    def stop_trace(self, path=None):
+        """Заканчивает запись и сохраняет её в формате Chrome Trace Event (chrome://tracing, Perfetto)"""
+        if self.trace is None:
+            return None
+        path = path or f'trace_{int(time.time())}.json'
+        origin = self._trace_start
+        events = [
+            {'name': name, 'cat': 'frame' if depth < 0 else 'game', 'ph': 'X', 'pid': 0, 'tid': 0,
+             'ts': (start - origin) * 1e6, 'dur': duration * 1e6}
+            for name, start, duration, depth in self.trace
+        ]
+        self.trace = None
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+        return path
+
+    # --- оверлей ---
+
+    def _build_overlay(self):
+        # Как у шкалы здоровья игрока: фон-квад и полосы-квады с origin слева,
+        # подписи всех полос - одна многострочная надпись поверх полос
+        top = -0.06
+        self.header = _Label(self, (0.01, -0.01, -0.1), 0.7)
+        self.labels = _Label(self, (0.012, top, -0.1), 0.8)
+        self.row_height = self.labels.line_height
+        self.bg = Entity(parent=self, model='quad', color=color.rgba(0, 0, 0, 0.6),
+                         origin=(-0.5, 0.5), scale=(0.42, -top + 0.01 + self.row_height * self.max_rows), z=1)
+        self.bars = [
+            Entity(parent=self, model='quad', origin=(-0.5, 0.5),
+                   position=(0.01, top - row * self.row_height - self.row_height * 0.1),
+                   scale=(0, self.row_height * 0.8), color=color.green)
+            for row in range(self.max_rows)
+        ]
+
+    def _redraw(self):
+        p = self.percentiles()
+        try:
+            nodes = render.count_num_descendants()
+        except Exception:
+            nodes = 0
+        self.header.text = (f'кадр p50 {p[50]:.2f}  p95 {p[95]:.2f}  p99 {p[99]:.2f} мс'
+                            f'\nсущностей {len(scene.entities)}, узлов {nodes}')
+
+        # Полосы в стиле flame graph: вложенные системы сдвинуты вправо, ширина - доля кадра
+        width = 0.4
+        rows = self.tree()[:self.max_rows]
+        lines = []
+        for row, bar in enumerate(self.bars):
+            if row >= len(rows):
+                bar.scale_x = 0
+                continue
+            name, depth, ms = rows[row]
+            indent = 0.015 * depth
+            share = min(ms / self.budget_ms, 1)
+            bar.x = 0.01 + indent
+            bar.scale_x = max(share * (width - indent), 0.002)
+            bar.color = color.green if share < 0.25 else color.orange if share < 0.5 else color.red
+            lines.append(f"{'  ' * depth}{name} {ms:.2f} мс")
+        self.labels.text = '\n'.join(lines)
+
+    def update(self):
+        now = perf_counter()
+        self._end_frame(now)
+        if not self.visible:
+            return
+        self._refresh_timer -= time.dt
+        if self._refresh_timer <= 0:
+            self._refresh_timer = self.refresh
+            self._redraw()
+
+    def input(self, key):
+        if key == 'f3':
+            self.visible = not self.visible
+        elif key == 'f4':
+            if self.trace is None:
+                self.start_trace()
+            else:
+                log.info("📈 Трасса сохранена: %s", self.stop_trace())
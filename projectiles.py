@@ -0,0 +1,207 @@
+from time import perf_counter
+import numpy as np
+
+import gamelog
+
+log = gamelog.get('projectiles')
+
+# Компоненты снаряда в World (позиция - общая для всех сущностей)
+COMPONENTS = (
+    ('direction', 'f4', 3),     # единичный вектор полёта
+    ('speed', 'f4', None),
+    ('turn_rate', 'f4', None),  # градусов в секунду
+    ('lifetime', 'f4', None),   # сколько осталось жить
+    ('homing', 'i4', None),     # номер цели (-1 - нет)
+    ('owner', 'i4', None),      # кто выстрелил
+    ('radius', 'f4', None),
+)
+PROJECTILE = ('direction', 'speed', 'lifetime')
+
+
+def steer(directions, desired, max_angles):
+    """Поворачивает единичные векторы к желаемым, но не больше чем на max_angles радиан (все строки разом)"""
+    cos = np.einsum('ij,ij->i', directions, desired).clip(-1, 1)
+    angles = np.arccos(cos)
+    max_angles = np.broadcast_to(max_angles, angles.shape)
+    result = desired.copy()
+    limited = angles > max_angles
+    if limited.any():
+        d = directions[limited]
+        # Поворот в плоскости (d, desired): ось - составляющая desired, перпендикулярная d
+        ortho = desired[limited] - d * cos[limited, None]
+        length = np.linalg.norm(ortho, axis=1)
+        back = length < 1e-6            # цель ровно позади - разворачиваемся через бок
+        if back.any():
+            ortho[back] = np.stack([-d[back, 2], np.zeros(np.count_nonzero(back)), d[back, 0]], axis=1)
+            length[back] = np.linalg.norm(ortho[back], axis=1)
+            vertical = length < 1e-6
+            ortho[vertical] = (1, 0, 0)
+            length[vertical] = 1
+        ortho /= length[:, None]
+        a = max_angles[limited]
+        result[limited] = d * np.cos(a)[:, None] + ortho * np.sin(a)[:, None]
+    return result
+
+
+def look_rotations(directions):
+    """Кватернионы (x, y, z, w), поворачивающие +z модели в направления полёта"""
+    q = np.empty((len(directions), 4), dtype=np.float32)
+    q[:, 0] = -directions[:, 1]
+    q[:, 1] = directions[:, 0]
+    q[:, 2] = 0
+    q[:, 3] = 1 + directions[:, 2]
+    back = q[:, 3] < 1e-6
+    q[back] = (0, 1, 0, 0)
+    q /= np.linalg.norm(q, axis=1)[:, None]
+    return q
+
+
+class Projectiles:
+    """Самонаводящиеся снаряды в World: время жизни, поворот к цели с ограниченной скоростью,
+    движение и уничтожение под землёй - одним проходом по массивам всех снарядов.
+
+    Столкновения и эффекты остаются у игры (step() отдаёт, кто ещё летит). Отрисовка - без прокси:
+    render() пишет позиции, повороты и размеры сразу в массивы InstancedBatch. Ёмкость пачки задана
+    шейдером, поэтому снарядов одновременно не больше batch.capacity - лишние не выпускаются.
+    """
+
+    def __init__(self, world, batch=None, color=(1, 1, 1, 1), target_offset=(0, 1, 0), kill_height=-10):
+        self.world = world
+        self.batch = batch
+        self.color = tuple(color)
+        self.target_offset = np.array(target_offset, dtype=np.float32)     # куда целиться относительно цели
+        self.kill_height = kill_height
+        for name, dtype, size in COMPONENTS:
+            world.register(name, dtype, size)
+        self.step_ms = 0.0
+        self.render_ms = 0.0
+        self.rejected = 0           # не выпущено из-за ёмкости пачки
+
+    def __len__(self):
+        return len(self.world.query(*PROJECTILE))
+
+    def spawn(self, position, speed, lifetime, target=-1, owner=-1, radius=0.5, turn_rate=90, **components):
+        """Новый снаряд; направление выберется на первом шаге - прямо на цель (или -z без цели).
+
+        Возвращает номер снаряда или -1, если пачка отрисовки уже заполнена.
+        """
+        if self.batch is not None and len(self) >= self.batch.capacity:
+            if not self.rejected:
+                log.warning("🔥 Снарядов уже %s - больше пачка не нарисует, новые не выпускаются",
+                            self.batch.capacity)
+            self.rejected += 1
+            return -1
+        return self.world.spawn(position=position, direction=(0, 0, 0), speed=speed, lifetime=lifetime,
+                                homing=target, owner=owner, radius=radius, turn_rate=turn_rate, **components)
+
+    def clear(self):
+        self.world.despawn(self.world.query(*PROJECTILE))
+        if self.batch is not None:
+            self.batch.write(np.zeros((0, 3), dtype=np.float32))
+
+    def step(self, dt):
+        """Шаг всех снарядов; возвращает (кто летит дальше, у кого кончилось время или кто ушёл под землю)"""
+        start = perf_counter()
+        w = self.world
+        rows = w.query(*PROJECTILE)
+        if not len(rows):
+            return rows, rows
+        position, direction, lifetime = w['position'], w['direction'], w['lifetime']
+
+        lifetime[rows] -= dt
+        alive = lifetime[rows] > 0
+        expired = rows[~alive]
+        rows = rows[alive]
+
+        target = w['homing'][rows]
+        homing = (target >= 0) & w.alive[target] & w['enabled'][target]
+        aim = position[target] + self.target_offset - position[rows]
+        length = np.linalg.norm(aim, axis=1)
+        homing &= length > 1e-6
+        current = direction[rows]
+        if homing.any():
+            h = np.flatnonzero(homing)
+            desired = aim[h] / length[h, None]
+            heading = current[h]
+            fresh = ~heading.any(axis=1)        # только что выпущен - сразу смотрит на цель
+            heading[fresh] = desired[fresh]
+            current[h] = steer(heading, desired, np.radians(w['turn_rate'][rows[h]]) * dt)
+        # Цели нет с самого выстрела - летим прямо; пропала по дороге - летим, куда летели
+        current[~current.any(axis=1)] = (0, 0, -1)
+        direction[rows] = current
+        position[rows] += current * (w['speed'][rows] * dt)[:, None]
+
+        below = position[rows, 1] < self.kill_height
+        self.step_ms = (perf_counter() - start) * 1000
+        return rows[~below], np.concatenate([expired, rows[below]])
+
+    def render(self, alpha=1.0):
+        """Раз в кадр: интерполированные позиции снарядов - в InstancedBatch одним копированием"""
+        if self.batch is None:
+            return
+        start = perf_counter()
+        w = self.world
+        rows = w.query(*PROJECTILE)     # spawn() не выпускает больше batch.capacity
+        prev = w['prev_position'][rows]
+        positions = prev + (w['position'][rows] - prev) * alpha
+        self.batch.write(positions, rotations=look_rotations(w['direction'][rows]),
+                         scales=(w['radius'][rows] * 2)[:, None], colors=self.color)
+        self.render_ms = (perf_counter() - start) * 1000
+
+
+def benchmark(counts=(1, 100, 10000), steps=60):
+    """Шаг count самонаводящихся снарядов: по объекту на снаряд (как прежний Fireball) против Projectiles"""
+    from ursina import Ursina, Entity, Vec3, destroy
+    from batching import InstancedBatch
+    from ecs import World
+
+    app = Ursina(window_type='none')
+    rng = np.random.default_rng(0)
+    target = Entity(position=(0, 0, 0))
+
+    class Homing(Entity):
+        def tick(self, dt):
+            direction = (target.position + Vec3(0, 1, 0) - self.position).normalized()
+            self.position += direction * dt * 12
+            if direction.length() > 0:
+                self.look_at(self.position + direction)
+
+    def median_ms(step):
+        times = []
+        for _ in range(steps):
+            start = perf_counter()
+            step()
+            times.append(perf_counter() - start)
+        times.sort()
+        return times[len(times) // 2] * 1000
+
+    results = {}
+    for count in counts:
+        starts = rng.uniform(-100, 100, (count, 3)).astype(np.float32)
+        objects = [Homing(position=Vec3(*p)) for p in starts.tolist()]
+
+        def tick_objects():
+            for o in objects:
+                o.tick(1 / 60)
+        per_object = median_ms(tick_objects)
+        for o in objects:
+            destroy(o)
+
+        world = World(capacity=count)
+        batch = InstancedBatch('sphere', capacity=count)
+        projectiles = Projectiles(world, batch=batch)
+        goal = world.track(target)
+        for p in starts:
+            projectiles.spawn(p, speed=12, lifetime=1e9, target=goal, turn_rate=180)
+        step = median_ms(lambda: projectiles.step(1 / 60))
+        render = median_ms(projectiles.render)
+        results[count] = {'objects': per_object, 'step': step, 'render': render}
+        destroy(batch)
+    return results
+
+
+if __name__ == '__main__':
+    results = benchmark()
+    print(f"{'снарядов':>10}{'объекты, мс':>14}{'step, мс':>12}{'render, мс':>12}")
+    for count, r in results.items():
+        print(f"{count:>10}{r['objects']:>14.3f}{r['step']:>12.3f}{r['render']:>12.3f}")
@@ -0,0 +1,242 @@
+from time import perf_counter
+import numpy as np
+
+from savegame import CapturedCreature, CREATURE
+
+# Виды существ: имя и модель; боевые характеристики - в config.toml (раздел с тем же key)
+DRAGON = 0
+SPECIES = {
+    DRAGON: dict(key='dragon', name='Дракон', model='test10.glb'),
+}
+
+# Та же раскладка, что и CREATURE в savegame: блоки из сохранения читаются без разбора по одной записи
+RECORD_DTYPE = np.dtype([
+    ('id', '<u4'), ('species', '<u2'), ('level', '<u2'), ('health', '<f4'), ('max_health', '<f4'),
+    ('position', '<f4', (3,)), ('caught_at', '<f8'), ('name', 'S24'),
+])
+assert RECORD_DTYPE.itemsize == CREATURE.size
+
+# Столбцы, по которым можно фильтровать и сортировать
+COLUMNS = ('id', 'species', 'level', 'health', 'max_health', 'caught_at')
+
+
+class Roster:
+    """Реестр пойманных существ: данные по столбцам (NumPy) и вторичные индексы по виду и уровню.
+
+    Индексы перестраиваются лениво - при первом запросе после изменений. Реестр из сохранения
+    (from_store) тоже собирается при первом обращении, а не при загрузке.
+    """
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self._columns = {name: np.zeros(capacity, dtype=RECORD_DTYPE[name]) for name in COLUMNS}
+        self.positions = np.zeros((capacity, 3), dtype=np.float32)
+        self.names = np.zeros(capacity, dtype='S24')
+        self._species_index = None      # вид -> номера строк
+        self._level_order = None        # номера строк по возрастанию уровня
+        self._store = None              # CreatureStore, ещё не перенесённый в столбцы
+        self._stored = 0                # сколько записей из него взять
+
+    def __len__(self):
+        if self._store is not None:
+            self._load()
+        return self.size
+
+    def column(self, name):
+        if self._store is not None:
+            self._load()
+        return self._columns[name][:self.size]
+
+    # --- добавление ---
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        capacity = len(self.names)
+        if needed <= capacity:
+            return
+        capacity = max(capacity * 2, needed)      # с нуля удвоение не растёт
+        for name, data in self._columns.items():
+            self._columns[name] = np.resize(data, capacity)
+        self.positions = np.resize(self.positions, (capacity, 3))
+        self.names = np.resize(self.names, capacity)
+
+    def _changed(self):
+        self._species_index = None
+        self._level_order = None
+
+    def add(self, creature):
+        """Добавляет одно существо (CapturedCreature); у реестра из сохранения строки сохранённых
+        существ при сборке встанут перед ним"""
+        self._reserve(1)
+        row = self.size
+        for name in COLUMNS:
+            self._columns[name][row] = getattr(creature, name)
+        self.positions[row] = creature.position
+        self.names[row] = creature.name.encode('utf-8')[:24]
+        self.size += 1
+        self._changed()
+
+    def extend_records(self, buffer):
+        """Добавляет пачку упакованных записей CREATURE одним копированием по столбцам"""
+        records = np.frombuffer(buffer, dtype=RECORD_DTYPE)
+        count = len(records)
+        self._reserve(count)
+        rows = slice(self.size, self.size + count)
+        for name in COLUMNS:
+            self._columns[name][rows] = records[name]
+        self.positions[rows] = records['position']
+        self.names[rows] = records['name']
+        self.size += count
+        self._changed()
+
+    @classmethod
+    def from_store(cls, store):
+        """Реестр из CreatureStore сохранения. Блоки распаковываются и переносятся целиком, без объектов
+        на каждую запись, но только при первом обращении к реестру"""
+        roster = cls()
+        roster._store = store
+        roster._stored = len(store)
+        return roster
+
+    def _load(self):
+        store, count = self._store, self._stored
+        self._store = None
+        # Добавленные до сборки (add) переезжают в конец, после сохранённых
+        added = {name: data[:self.size].copy() for name, data in self._columns.items()}
+        positions, names = self.positions[:self.size].copy(), self.names[:self.size].copy()
+        self.size = 0
+        self._reserve(count + len(names))
+        for buffer in store.record_blocks():
+            if count <= 0:
+                break
+            buffer = buffer[:count * CREATURE.size]
+            count -= len(buffer) // CREATURE.size
+            self.extend_records(buffer)
+        rows = slice(self.size, self.size + len(names))
+        for name, data in added.items():
+            self._columns[name][rows] = data
+        self.positions[rows] = positions
+        self.names[rows] = names
+        self.size += len(names)
+        self._changed()
+
+    def get(self, row):
+        if self._store is not None:
+            self._load()
+        c = self._columns
+        return CapturedCreature(int(c['id'][row]), int(c['species'][row]), int(c['level'][row]),
+                                float(c['health'][row]), float(c['max_health'][row]),
+                                tuple(self.positions[row].tolist()), float(c['caught_at'][row]),
+                                self.names[row].decode('utf-8', 'ignore'))
+
+    # --- индексы ---
+
+    def _species_rows(self, species):
+        if self._species_index is None:
+            values = self.column('species')
+            order = np.argsort(values, kind='stable')
+            keys, starts = np.unique(values[order], return_index=True)
+            self._species_index = dict(zip(keys.tolist(), np.split(order, starts[1:])))
+        return self._species_index.get(species, np.zeros(0, dtype=np.intp))
+
+    def _level_rows(self, lo, hi):
+        if self._level_order is None:
+            self._level_order = np.argsort(self.column('level'), kind='stable')
+        levels = self.column('level')[self._level_order]
+        start = np.searchsorted(levels, lo, side='left')
+        end = np.searchsorted(levels, hi, side='right')
+        return self._level_order[start:end]
+
+    # --- запросы ---
+
+    def query(self, species=None, level=None, min_health=None, sort=None, descending=False, limit=None, offset=0):
+        """Номера строк, подходящих под фильтр, в нужном порядке.
+
+        species - вид (или None), level - (от, до) включительно, min_health - не меньше этого здоровья,
+        sort - имя столбца для сортировки, limit/offset - страница списка.
+        """
+        if self._store is not None:
+            self._load()
+        # Стартуем с самого узкого индекса, остальные условия - масками по столбцам
+        if species is not None:
+            rows = self._species_rows(species)
+            if level is not None:
+                levels = self.column('level')[rows]
+                rows = rows[(levels >= level[0]) & (levels <= level[1])]
+        elif level is not None:
+            rows = self._level_rows(*level)
+        else:
+            rows = np.arange(self.size)
+
+        if min_health is not None:
+            rows = rows[self.column('health')[rows] >= min_health]
+
+        if sort is not None:
+            keys = self.column(sort)[rows]
+            if descending:
+                keys = -keys.astype(np.float64)
+            end = None if limit is None else offset + limit
+            if end is not None and end < len(rows):
+                # Для страницы не нужна полная сортировка: сначала отбираем первые end
+                part = np.argpartition(keys, end - 1)[:end]
+                rows, keys = rows[part], keys[part]
+            rows = rows[np.argsort(keys, kind='stable')]
+
+        if limit is not None:
+            return rows[offset:offset + limit]
+        return rows[offset:]
+
+    def count_by_species(self):
+        values, counts = np.unique(self.column('species'), return_counts=True)
+        return dict(zip(values.tolist(), counts.tolist()))
+
+
+def random_roster(count, species_count=8, seed=0):
+    """Реестр со случайными существами (для замеров)"""
+    rng = np.random.default_rng(seed)
+    records = np.zeros(count, dtype=RECORD_DTYPE)
+    records['id'] = np.arange(1, count + 1)
+    records['species'] = rng.integers(0, species_count, count)
+    records['level'] = rng.integers(1, 101, count)
+    records['max_health'] = rng.uniform(50, 500, count)
+    records['health'] = records['max_health'] * rng.uniform(0, 1, count)
+    records['position'] = rng.uniform(-500, 500, (count, 3))
+    records['caught_at'] = rng.uniform(0, 1e6, count)
+    records['name'] = [f'Voild {i}'.encode() for i in range(count)]
+    roster = Roster(capacity=count)
+    roster.extend_records(records.tobytes())
+    return roster
+
+
+def benchmark(sizes=(1000, 10000, 100000), repeats=20):
+    """Задержка типичных запросов списка существ; бюджет кадра при 60 FPS - 16.7 мс"""
+    queries = {
+        'вид + уровень, по здоровью, 50': dict(species=DRAGON, level=(20, 60), sort='health', descending=True, limit=50),
+        'уровень 90-100, по уровню': dict(level=(90, 100), sort='level', descending=True),
+        'здоровье >= 400, все': dict(min_health=400),
+        'все, по дате поимки, 50': dict(sort='caught_at', descending=True, limit=50),
+    }
+    results = {}
+    for size in sizes:
+        roster = random_roster(size)
+        start = perf_counter()
+        roster.query(species=DRAGON, level=(1, 1))     # первое обращение строит индексы
+        index_ms = (perf_counter() - start) * 1000
+        results[size] = {'индексы': index_ms}
+        for label, kwargs in queries.items():
+            times = []
+            for _ in range(repeats):
+                start = perf_counter()
+                roster.query(**kwargs)
+                times.append(perf_counter() - start)
+            times.sort()
+            results[size][label] = times[len(times) // 2] * 1000
+    return results
+
+
+if __name__ == '__main__':
+    results = benchmark()
+    labels = list(next(iter(results.values())))
+    print(f"{'запрос (медиана, мс)':<34}" + ''.join(f'{size:>10}' for size in results))
+    for label in labels:
+        print(f'{label:<34}' + ''.join(f'{results[size][label]:>10.3f}' for size in results))
@@ -0,0 +1,235 @@
+from concurrent.futures import ThreadPoolExecutor
+from bisect import bisect_right
+from pathlib import Path
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+
+import gamelog
+
+log = gamelog.get('save')
+
+# Формат файла сохранения (все числа little-endian):
+#   заголовок   HEADER: магия, версия, seed мира, размеры секций
+#   состояние   zlib(JSON снимка мира) - игрок, его здоровье и остальное из WorldSnapshot
+#   индекс      BLOCK_INDEX на каждый блок существ: длина сжатого блока и число записей
+#   блоки       zlib(CREATURE записей подряд) - распаковываются только при обращении
+MAGIC = b'VSAV'
+SAVE_VERSION = 1
+HEADER = struct.Struct('<4sHHqIII')          # магия, версия, резерв, seed, длина состояния, существ, блоков
+BLOCK_INDEX = struct.Struct('<II')           # длина сжатого блока, записей в нём
+CREATURE = struct.Struct('<IHHff3fd24s')     # id, вид, уровень, здоровье, макс. здоровье, где пойман, когда, имя
+BLOCK_SIZE = 256
+
+SAVE_FOLDER = Path(__file__).resolve().parent / 'saves'
+
+
+class CapturedCreature:
+    """Пойманное существо (Voild) - одна запись в сохранении"""
+    __slots__ = ('id', 'species', 'level', 'health', 'max_health', 'position', 'caught_at', 'name')
+
+    def __init__(self, id, species, level=1, health=100.0, max_health=100.0, position=(0, 0, 0),
+                 caught_at=None, name=''):
+        self.id = id
+        self.species = species
+        self.level = level
+        self.health = health
+        self.max_health = max_health
+        self.position = tuple(position)
+        self.caught_at = time.time() if caught_at is None else caught_at
+        self.name = name
+
+    def pack(self):
+        return CREATURE.pack(self.id, self.species, self.level, self.health, self.max_health,
+                             *self.position, self.caught_at, self.name.encode('utf-8')[:24])
+
+    @classmethod
+    def unpack_from(cls, buffer, offset=0):
+        id, species, level, health, max_health, x, y, z, caught_at, name = CREATURE.unpack_from(buffer, offset)
+        return cls(id, species, level, health, max_health, (x, y, z), caught_at,
+                   name.rstrip(b'\0').decode('utf-8', 'ignore'))
+
+
+class CreatureStore:
+    """Список пойманных существ с ленивой загрузкой: блок распаковывается при первом обращении к нему.
+
+    Блоки, прочитанные из файла, при следующем сохранении записываются как есть, без пересжатия.
+    """
+
+    def __init__(self, blocks=()):
+        self._blocks = [[data, None, count] for data, count in blocks]   # [сжатые байты, распакованные, записей]
+        self._ends = []             # накопленное число записей в конце каждого блока (для bisect)
+        total = 0
+        for block in self._blocks:
+            total += block[2]
+            self._ends.append(total)
+        self._tail = []             # пойманные после загрузки, ещё не упакованные в блоки
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return (self._ends[-1] if self._ends else 0) + len(self._tail)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        stored = self._ends[-1] if self._ends else 0
+        if index >= stored:
+            return self._tail[index - stored]
+        b = bisect_right(self._ends, index)
+        start = self._ends[b - 1] if b else 0
+        return CapturedCreature.unpack_from(self._records(b), (index - start) * CREATURE.size)
+
+    def __iter__(self):
+        start = 0
+        for b, end in enumerate(self._ends):
+            records = self._records(b)
+            for i in range(end - start):
+                yield CapturedCreature.unpack_from(records, i * CREATURE.size)
+            start = end
+        yield from self._tail
+
+    def append(self, creature):
+        self._tail.append(creature)
+
+    @property
+    def loaded_blocks(self):
+        return sum(1 for block in self._blocks if block[1] is not None)
+
+    def _records(self, b):
+        block = self._blocks[b]
+        if block[1] is None:
+            with self._lock:
+                if block[1] is None:
+                    block[1] = zlib.decompress(block[0])
+        return block[1]
+
+    def record_blocks(self):
+        """Упакованные записи блоками - для массового разбора (например в roster.Roster)"""
+        for b in range(len(self._blocks)):
+            yield self._records(b)
+        if self._tail:
+            yield b''.join(c.pack() for c in self._tail)
+
+    def freeze(self):
+        """Данные для фоновой записи: готовые блоки и упакованные (ещё не сжатые) новые записи"""
+        return [(block[0], block[2]) for block in self._blocks], [c.pack() for c in self._tail]
+
+
+class SaveGame:
+    """Открытое сохранение: состояние мира уже разобрано, существа - лениво"""
+
+    def __init__(self, seed, state, creatures):
+        self.seed = seed
+        self.state = state              # снимок WorldSnapshot
+        self.creatures = creatures      # CreatureStore
+
+
+def encode_save(seed, state, blocks, new_records, level=6):
+    """Собирает байты файла; новые записи сжимаются блоками по BLOCK_SIZE"""
+    blocks = list(blocks)
+    for i in range(0, len(new_records), BLOCK_SIZE):
+        chunk = new_records[i:i + BLOCK_SIZE]
+        blocks.append((zlib.compress(b''.join(chunk), level), len(chunk)))
+
+    state_bytes = zlib.compress(json.dumps(state, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), level)
+    count = sum(n for data, n in blocks)
+    parts = [HEADER.pack(MAGIC, SAVE_VERSION, 0, seed, len(state_bytes), count, len(blocks)), state_bytes]
+    parts.extend(BLOCK_INDEX.pack(len(data), n) for data, n in blocks)
+    parts.extend(data for data, n in blocks)
+    return b''.join(parts)
+
+
+def write_atomic(path, data):
+    """Пишет во временный файл рядом и подменяет им старый: сбой не оставит битое сохранение"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+def read_save(path):
+    """Читает заголовок, состояние и индекс; блоки существ остаются сжатыми до первого обращения"""
+    data = Path(path).read_bytes()
+    try:
+        magic, version, _, seed, state_len, count, block_count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{path}: это не файл сохранения')
+        if version > SAVE_VERSION:
+            raise ValueError(f'{path}: сохранение версии {version} новее игры (поддерживается {SAVE_VERSION})')
+
+        offset = HEADER.size
+        state = json.loads(zlib.decompress(data[offset:offset + state_len]))
+        offset += state_len
+
+        index = [BLOCK_INDEX.unpack_from(data, offset + i * BLOCK_INDEX.size) for i in range(block_count)]
+        offset += block_count * BLOCK_INDEX.size
+    except (struct.error, zlib.error, UnicodeDecodeError) as e:
+        raise ValueError(f'{path}: сохранение повреждено ({e})') from e
+    blocks = []
+    for length, n in index:
+        if offset + length > len(data):
+            raise ValueError(f'{path}: сохранение обрезано')
+        blocks.append((data[offset:offset + length], n))
+        offset += length
+    return SaveGame(seed, state, CreatureStore(blocks))
+
+
+class SaveManager:
+    """Сохранения в фоновом потоке: в игровом кадре только снимок состояния, сжатие и запись - в рабочем"""
+
+    def __init__(self, path, autosave_interval=60):
+        self.path = Path(path)
+        self.autosave_interval = autosave_interval
+        self.last_save_ms = 0
+        self._timer = autosave_interval
+        self._future = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='save')
+
+    @property
+    def busy(self):
+        return self._future is not None and not self._future.done()
+
+    def save(self, seed, state, creatures, path=None):
+        """Ставит сохранение в очередь; возвращает Future с путём к файлу"""
+        blocks, new_records = creatures.freeze()
+        self._future = self._executor.submit(self._write, path or self.path, seed, state, blocks, new_records)
+        self._future.add_done_callback(self._report)
+        return self._future
+
+    def _report(self, future):
+        # Выполняется в потоке записи; ошибку не пробрасываем - только в журнал (и для автосохранения тоже)
+        error = future.exception()
+        if error is not None:
+            log.error("💾 Не удалось сохранить игру: %s", error)
+
+    def _write(self, path, seed, state, blocks, new_records):
+        start = time.perf_counter()
+        path = write_atomic(path, encode_save(seed, state, blocks, new_records))
+        self.last_save_ms = (time.perf_counter() - start) * 1000
+        return path
+
+    def load(self, path=None):
+        self.wait()
+        return read_save(path or self.path)
+
+    def wait(self):
+        """Дожидается записи, начатой раньше (перед загрузкой или выходом); её ошибка уже в журнале"""
+        if self._future is not None:
+            self._future.exception()
+
+    def tick(self, dt, capture=None):
+        """Автосохранение по таймеру; capture() возвращает аргументы save() - (seed, state, creatures)"""
+        self._timer -= dt
+        if self._timer > 0 or capture is None:
+            return
+        self._timer = self.autosave_interval
+        if not self.busy:       # предыдущая запись ещё идёт - пропускаем, а не копим очередь
+            self.save(*capture())
@@ -0,0 +1,119 @@
+from ursina import *
+from time import perf_counter
+
+
+class Simulation:
+    """Симуляция с фиксированным шагом: аккумулятор кадрового времени и интерполяция для отрисовки"""
+
+    def __init__(self, tick_rate=60, max_ticks_per_frame=5):
+        self.tick_rate = tick_rate
+        self.dt = 1 / tick_rate
+        self.max_ticks_per_frame = max_ticks_per_frame  # защита от "спирали смерти" на медленных кадрах
+        self.accumulator = 0
+        self.alpha = 0          # доля следующего тика для интерполяции (0..1)
+        self.tick_count = 0
+        self.dropped_time = 0   # сколько времени симуляции пропущено из-за лимита тиков
+        self.systems = []       # функции system(dt), выполняются каждый тик до сущностей
+        self.entities = []      # сущности с методом tick(dt)
+        self.timings = None     # словарь {система: секунды}, если нужно профилирование
+        self.profiler = None    # FrameProfiler: каждая система и тип сущностей отдельной полосой
+
+    def add_system(self, system):
+        self.systems.append(system)
+        return system
+
+    def add(self, entity, interpolate=True):
+        """Регистрирует сущность; её позиция будет интерполироваться между тиками"""
+        entity.sim_interpolate = interpolate
+        entity.sim_prev_position = Vec3(entity.position)
+        entity.sim_position = Vec3(entity.position)
+        self.entities.append(entity)
+        return entity
+
+    def teleport(self, entity):
+        """Сбрасывает интерполяцию, чтобы сущность не "проезжала" от старой позиции"""
+        entity.sim_prev_position = Vec3(entity.position)
+        entity.sim_position = Vec3(entity.position)
+
+    def remove(self, entity):
+        if entity in self.entities:
+            self.entities.remove(entity)
+
+    def clear(self):
+        self.entities.clear()
+        self.accumulator = 0
+        self.alpha = 0
+
+    def step(self, frame_dt):
+        """Выполняет столько тиков, сколько накопилось времени, и интерполирует позиции"""
+        self.accumulator += frame_dt
+        if self.accumulator < self.dt:
+            self._interpolate()
+            return 0
+
+        # Тики считаются от настоящих (не интерполированных) позиций
+        self.entities = [e for e in self.entities if not e.is_empty()]
+        for e in self.entities:
+            if e.sim_interpolate:
+                e.position = e.sim_position
+
+        ticks = 0
+        while self.accumulator >= self.dt and ticks < self.max_ticks_per_frame:
+            for e in self.entities:
+                if e.sim_interpolate:
+                    e.sim_prev_position = Vec3(e.position)
+
+            if self.timings is None and self.profiler is None:
+                for system in self.systems:
+                    system(self.dt)
+                for e in self.entities:
+                    if e.enabled and not e.is_empty():
+                        e.tick(self.dt)
+            else:
+                self._timed_tick()
+
+            self.accumulator -= self.dt
+            self.tick_count += 1
+            ticks += 1
+
+        if self.accumulator >= self.dt:
+            # Не успеваем: отбрасываем хвост, чтобы не догонять бесконечно
+            self.dropped_time += self.accumulator - self.dt
+            self.accumulator = self.dt * 0.999
+
+        self.entities = [e for e in self.entities if not e.is_empty()]
+        for e in self.entities:
+            if e.sim_interpolate:
+                e.sim_position = Vec3(e.position)
+        self._interpolate()
+        return ticks
+
+    def _timed_tick(self):
+        """Тот же тик, но с замером времени каждой системы и каждого типа сущностей"""
+        timings = self.timings
+        profiler = self.profiler
+        for system in self.systems:
+            start = perf_counter()
+            system(self.dt)
+            end = perf_counter()
+            key = getattr(system, '__qualname__', system.__name__)
+            if timings is not None:
+                timings[key] = timings.get(key, 0) + end - start
+            if profiler is not None:
+                profiler.record(key, start, end)
+        for e in self.entities:
+            if e.enabled and not e.is_empty():
+                start = perf_counter()
+                e.tick(self.dt)
+                end = perf_counter()
+                key = type(e).__name__
+                if timings is not None:
+                    timings[key] = timings.get(key, 0) + end - start
+                if profiler is not None:
+                    profiler.record(key, start, end)
+
+    def _interpolate(self):
+        self.alpha = self.accumulator / self.dt
+        for e in self.entities:
+            if e.sim_interpolate and not e.is_empty():
+                e.position = lerp(e.sim_prev_position, e.sim_position, self.alpha)
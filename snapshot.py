@@ -0,0 +1,56 @@
+from ursina import *
+
+# Увеличивать при любом изменении состава частей (новые или переименованные ключи в snapshot()):
+# снимок другой версии отклоняется целиком, а не падает на середине восстановления.
+# 2 - части игрока, камеры и управления после контроллера персонажа, рига камеры и ActionInput
+SNAPSHOT_VERSION = 2
+
+
+def vec(v):
+    """Vec3/Vec2/цвет -> список чисел (чтобы снимок можно было сохранить в JSON)"""
+    return [float(c) for c in v]
+
+
+def stop_timers(entity, timers=None):
+    """Отменяет отложенные вызовы (её таймеры в TimerWheel) и анимации сущности,
+    чтобы они не сработали после восстановления"""
+    if timers is not None:
+        timers.cancel_owner(entity)
+    for sequence in list(getattr(entity, 'animations', ())):
+        sequence.kill()
+    if hasattr(entity, 'animations'):
+        entity.animations.clear()
+
+
+class WorldSnapshot:
+    """Снимок состояния мира: каждая часть сама отдаёт и принимает своё состояние (словари и списки чисел).
+
+    Снимок можно сохранить в JSON; на диск его пишет savegame.SaveManager.
+    """
+
+    def __init__(self):
+        self._parts = {}        # имя -> (capture(), restore(state))
+
+    def register(self, name, capture, restore):
+        self._parts[name] = (capture, restore)
+
+    def add(self, name, obj):
+        """Регистрирует объект с методами snapshot() и restore(state)"""
+        self.register(name, obj.snapshot, obj.restore)
+        return obj
+
+    def capture(self):
+        return {
+            'version': SNAPSHOT_VERSION,
+            'parts': {name: capture() for name, (capture, restore) in self._parts.items()},
+        }
+
+    def restore(self, snapshot):
+        """Возвращает все части в сохранённое состояние (сущности не пересоздаются)"""
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"Неподдерживаемая версия снимка: {snapshot.get('version')} (нужна {SNAPSHOT_VERSION})")
+        parts = snapshot['parts']
+        # В порядке регистрации: от этого зависит, например, что игрок уже на месте, когда сбрасывается камера
+        for name, (capture, restore) in self._parts.items():
+            if name in parts:
+                restore(parts[name])
@@ -0,0 +1,300 @@
+from ursina import *
+from ursina.collider import Collider
+from panda3d.core import CollisionPolygon, Point3
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+
+def _lattice(ix, iz, seed):
+    """Псевдослучайное значение 0..1 в узлах целочисленной решётки (одинаковое для всех чанков)"""
+    h = (ix * 374761393 + iz * 668265263 + seed * 1442695041) & 0xffffffff
+    h = ((h ^ (h >> 13)) * 1274126177) & 0xffffffff
+    h ^= h >> 16
+    return h.astype(np.float64) / 0xffffffff
+
+
+def value_noise(x, z, seed=0):
+    """Сглаженный value noise для массивов координат"""
+    x0 = np.floor(x)
+    z0 = np.floor(z)
+    fx = x - x0
+    fz = z - z0
+    ix = x0.astype(np.int64)
+    iz = z0.astype(np.int64)
+    # smoothstep по обеим осям
+    u = fx * fx * (3 - 2 * fx)
+    v = fz * fz * (3 - 2 * fz)
+    a = _lattice(ix, iz, seed)
+    b = _lattice(ix + 1, iz, seed)
+    c = _lattice(ix, iz + 1, seed)
+    d = _lattice(ix + 1, iz + 1, seed)
+    return (a + (b - a) * u) * (1 - v) + (c + (d - c) * u) * v
+
+
+def fractal_noise(x, z, seed=0, octaves=4):
+    """Сумма октав value noise, результат примерно в 0..1"""
+    total = np.zeros(np.shape(x))
+    amplitude, frequency, norm = 1.0, 1.0, 0.0
+    for octave in range(octaves):
+        total += value_noise(x * frequency, z * frequency, seed + octave * 101) * amplitude
+        norm += amplitude
+        amplitude *= 0.5
+        frequency *= 2
+    return total / norm
+
+
+class TerrainChunk(Entity):
+    """Один квадрат ландшафта; lo/hi - его AABB для широкой фазы столкновений"""
+    is_terrain = True
+
+    def __init__(self, terrain, key, lod, mesh, polygons, heights, lo, hi, **kwargs):
+        super().__init__(
+            parent=terrain,
+            model=mesh,
+            position=(key[0] * terrain.chunk_size, 0, key[1] * terrain.chunk_size),
+            double_sided=True,
+            eternal=terrain.eternal,
+            **kwargs
+        )
+        self.terrain = terrain
+        self.key = key
+        self.lod = lod
+        self.heights = heights      # сетка высот [z][x] для LOD 0 - быстрые запросы земли
+        self.world_bounds = (lo, hi)
+        if polygons:
+            self.collider = Collider(self, polygons)
+
+    def sweep_test(self, start, delta, radius):
+        """Уточнение для SpatialHash: первое касание сферой поверхности по карте высот"""
+        steps = max(2, int(delta.length() / (self.terrain.chunk_size / 32)) + 1)
+        t = np.linspace(0, 1, steps + 1)
+        xs = start[0] + delta[0] * t
+        ys = start[1] + delta[1] * t
+        zs = start[2] + delta[2] * t
+        below = ys - radius <= self.terrain.heights_at(xs, zs)
+        if not below.any():
+            return None
+        return float(t[np.argmax(below)])
+
+
+class Terrain(Entity):
+    """Бесконечный ландшафт из чанков: генерация по seed, подгрузка вокруг игрока в фоновом потоке, LOD"""
+
+    def __init__(self, seed=0, chunk_size=32, view_distance=3, lod_distances=(1, 2), resolutions=(32, 16, 8),
+                 amplitude=6, noise_scale=60, flat_radius=40, focus=None, colliders=None, batcher=None,
+                 max_uploads_per_frame=2, workers=1, **kwargs):
+        super().__init__(**kwargs)
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.view_distance = view_distance      # радиус подгрузки в чанках
+        self.lod_distances = lod_distances      # до какого расстояния (в чанках) действует каждый LOD
+        self.resolutions = resolutions          # клеток на сторону чанка для LOD 0, 1, 2
+        self.amplitude = amplitude
+        self.noise_scale = noise_scale
+        self.flat_radius = flat_radius          # ровная арена вокруг начала координат
+        self.focus = focus
+        self.colliders = colliders              # SpatialHash, куда регистрировать чанки с коллайдером
+        self.batcher = batcher                  # StaticBatcher: чанки рисуются общими мешами по клеткам
+        self.max_uploads_per_frame = max_uploads_per_frame
+
+        self.chunks = {}        # (cx, cz) -> TerrainChunk
+        self._pending = {}      # (cx, cz) -> (lod, Future)
+        self._wanted = {}
+        self._center = None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='terrain')
+
+    # --- высоты ---
+
+    def heights_at(self, x, z):
+        """Высота поверхности (как у меша LOD 0) для массивов координат"""
+        x = np.asarray(x, dtype=np.float64)
+        z = np.asarray(z, dtype=np.float64)
+        step = self.chunk_size / self.resolutions[0]
+        gx = x / step
+        gz = z / step
+        i = np.floor(gx)
+        j = np.floor(gz)
+        u = gx - i
+        v = gz - j
+        ha = self._raw_heights(i * step, j * step)
+        hb = self._raw_heights((i + 1) * step, j * step)
+        hc = self._raw_heights((i + 1) * step, (j + 1) * step)
+        hd = self._raw_heights(i * step, (j + 1) * step)
+        # Квад делится диагональю a-c, как в build_chunk
+        return np.where(u >= v,
+                        ha + (hb - ha) * u + (hc - hb) * v,
+                        ha + (hc - hd) * u + (hd - ha) * v)
+
+    def height_at(self, x, z):
+        """Высота земли в точке: из сетки загруженного чанка LOD 0, иначе по шуму"""
+        size = self.chunk_size
+        cx = math.floor(x / size)
+        cz = math.floor(z / size)
+        chunk = self.chunks.get((cx, cz))
+        if chunk is None or chunk.heights is None:
+            return float(self.heights_at(x, z))
+
+        res = len(chunk.heights) - 1
+        gx = (x - cx * size) * res / size
+        gz = (z - cz * size) * res / size
+        i = min(int(gx), res - 1)
+        j = min(int(gz), res - 1)
+        u = gx - i
+        v = gz - j
+        row, next_row = chunk.heights[j], chunk.heights[j + 1]
+        ha, hb, hc, hd = row[i], row[i + 1], next_row[i + 1], next_row[i]
+        if u >= v:
+            return ha + (hb - ha) * u + (hc - hb) * v
+        return ha + (hc - hd) * u + (hd - ha) * v
+
+    def _raw_heights(self, x, z):
+        h = (fractal_noise(x / self.noise_scale, z / self.noise_scale, self.seed) - 0.5) * 2 * self.amplitude
+        if self.flat_radius:
+            dist = np.sqrt(x * x + z * z)
+            blend = np.clip((dist - self.flat_radius) / self.flat_radius, 0, 1)
+            h *= blend * blend * (3 - 2 * blend)
+        return h
+
+    # --- построение чанков (в рабочем потоке) ---
+
+    def build_chunk(self, key, lod):
+        """Строит меш (и полигоны коллайдера для LOD 0) одного чанка; не трогает граф сцены"""
+        res = self.resolutions[lod]
+        size = self.chunk_size
+        local = np.linspace(0, size, res + 1)
+        lx, lz = np.meshgrid(local, local)      # [строка z, столбец x]
+        heights = self._raw_heights(lx + key[0] * size, lz + key[1] * size)
+
+        vertices = np.stack([lx, heights, lz], axis=-1).astype(np.float32)
+
+        # Нормали по разностям высот
+        step = size / res
+        gx = np.gradient(heights, step, axis=1)
+        gz = np.gradient(heights, step, axis=0)
+        normals = np.stack([-gx, np.ones_like(heights), -gz], axis=-1)
+        normals /= np.linalg.norm(normals, axis=-1, keepdims=True)
+
+        # Цвет по высоте: трава -> камень
+        t = np.clip((heights + self.amplitude) / (2 * self.amplitude), 0, 1)[..., None]
+        grass = np.array([0.35, 0.55, 0.3, 1])
+        rock = np.array([0.55, 0.52, 0.5, 1])
+        colors = grass + (rock - grass) * t
+
+        i, j = np.meshgrid(np.arange(res), np.arange(res))
+        a = (j * (res + 1) + i).ravel()
+        b = a + 1
+        c = a + res + 2
+        d = a + res + 1
+        triangles = np.stack([a, b, c, c, d, a], axis=-1).astype(np.uint32).ravel()
+
+        mesh = Mesh(
+            vertices=vertices.ravel(),
+            triangles=triangles,
+            normals=normals.astype(np.float32).ravel(),
+            colors=colors.astype(np.float32).ravel(),
+        )
+
+        polygons = grid = None
+        if lod == 0:
+            grid = heights.tolist()
+            # Обратный порядок вершин, чтобы полигоны смотрели вверх (как в MeshCollider)
+            verts = vertices.reshape(-1, 3)
+            polygons = [
+                CollisionPolygon(Point3(*verts[tri[2]]), Point3(*verts[tri[1]]), Point3(*verts[tri[0]]))
+                for tri in triangles.reshape(-1, 3)
+            ]
+
+        x0, z0 = key[0] * size, key[1] * size
+        lo = (x0, float(heights.min()), z0)
+        hi = (x0 + size, float(heights.max()), z0 + size)
+        return mesh, polygons, grid, lo, hi
+
+    # --- стриминг ---
+
+    def _chunk_key(self, position):
+        return math.floor(position[0] / self.chunk_size), math.floor(position[2] / self.chunk_size)
+
+    def _lod_for(self, distance):
+        for lod, limit in enumerate(self.lod_distances):
+            if distance <= limit:
+                return lod
+        return len(self.lod_distances)
+
+    def load_around(self, position):
+        """Синхронно строит ближайшие чанки (при старте, чтобы игрок не висел в пустоте)"""
+        cx, cz = self._chunk_key(position)
+        for dx in (-1, 0, 1):
+            for dz in (-1, 0, 1):
+                key = (cx + dx, cz + dz)
+                if key not in self.chunks:
+                    self._attach(key, 0, self.build_chunk(key, 0))
+
+    def _refresh_wanted(self, center):
+        r = self.view_distance
+        wanted = {}
+        for dx in range(-r, r + 1):
+            for dz in range(-r, r + 1):
+                wanted[(center[0] + dx, center[1] + dz)] = self._lod_for(max(abs(dx), abs(dz)))
+        self._wanted = wanted
+
+        # Выгружаем то, что дальше радиуса + 1 (запас, чтобы чанки не мигали на границе)
+        for key in list(self.chunks):
+            if max(abs(key[0] - center[0]), abs(key[1] - center[1])) > r + 1:
+                self._detach(key)
+
+        # Ближние чанки строятся первыми
+        order = sorted(wanted, key=lambda k: max(abs(k[0] - center[0]), abs(k[1] - center[1])))
+        for key in order:
+            lod = wanted[key]
+            chunk = self.chunks.get(key)
+            pending = self._pending.get(key)
+            if (chunk and chunk.lod == lod) or (pending and pending[0] == lod):
+                continue
+            self._pending[key] = (lod, self._executor.submit(self.build_chunk, key, lod))
+
+    def _attach(self, key, lod, built):
+        mesh, polygons, grid, lo, hi = built
+        self._detach(key)
+        chunk = TerrainChunk(self, key, lod, mesh, polygons, grid, lo, hi)
+        self.chunks[key] = chunk
+        if self.colliders is not None and polygons:
+            self.colliders.add(chunk, static=True)
+        if self.batcher is not None:
+            self.batcher.add(chunk)
+
+    def _detach(self, key):
+        chunk = self.chunks.pop(key, None)
+        if chunk:
+            if self.colliders is not None:
+                self.colliders.remove(chunk)
+            if self.batcher is not None:
+                self.batcher.remove(chunk)
+            chunk.eternal = False
+            destroy(chunk)
+
+    def update(self):
+        focus = self.focus() if callable(self.focus) else self.focus
+        if focus is None or focus.is_empty():
+            return
+
+        center = self._chunk_key(focus.world_position)
+        if center != self._center:
+            self._center = center
+            self._refresh_wanted(center)
+
+        # Готовые чанки подключаем к сцене понемногу, чтобы не было рывков
+        uploads = 0
+        for key, (lod, future) in list(self._pending.items()):
+            if uploads >= self.max_uploads_per_frame:
+                break
+            if not future.done():
+                continue
+            del self._pending[key]
+            if self._wanted.get(key) != lod:
+                continue
+            self._attach(key, lod, future.result())
+            uploads += 1
+
+        # Склеиваем в том же кадре, чтобы старый и новый LOD не мелькнули вместе
+        if self.batcher is not None:
+            self.batcher.flush()
@@ -1,49 +1,129 @@
 from ursina import *
-from direct.actor.Actor import Actor
-from ursina.prefabs.first_person_controller import FirstPersonController
 from random import uniform
+from particles import ParticleSystem
+from weather import Weather
+from assets import AssetManager
+from simulation import Simulation
+from collision import SpatialHash
+from ai import AIScheduler
+from terrain import Terrain
+from controller import CharacterController
+from profiler import FrameProfiler
+from animation import AnimationSet, AnimationStateMachine, AnimationSystem
+from camera_rig import CameraRig
+from actions import ActionInput
+from batching import StaticBatcher, InstancedBatch, BarBatch, draw_call_report
+from lod import CreatureLOD
+from timers import TimerWheel
+from ecs import World
+from projectiles import Projectiles
+from combat import CombatEvents, DEATH
+from snapshot import WorldSnapshot, stop_timers, vec
+from savegame import SaveManager, CreatureStore, CapturedCreature, SAVE_FOLDER
+from roster import Roster, SPECIES, DRAGON
+from config import Config
+import gamelog
+import headless
+
+# python test.py --headless [--frames N] [--report out.json] [--trace trace.json] - прогон без окна для замеров
+# python test.py --headless --script restart - проверка перезапуска после смерти (код выхода 1 при ошибке)
+headless_args = headless.parse_args()
+if headless_args:
+    app = Ursina(window_type='none')
+    headless.prepare_headless(headless_args.fps)
+else:
+    app = Ursina()
+
+# Сообщения игры пишутся в фоне; уровни по категориям можно задать через GAME_LOG=dragon=WARNING,...
+gamelog.setup()
+log_dragon = gamelog.get('dragon')
+log_fireball = gamelog.get('fireball')
+log_player = gamelog.get('player')
+log_game = gamelog.get('game')
+
+# Модели драконов грузятся в фоне сразу при старте
+assets = AssetManager()
+assets.preload(SPECIES[DRAGON]['model'])
+
+# Настройки движения, камеры, дракона и файрболов - в config.toml, правки подхватываются на лету
+config = Config().watch()
 
-app = Ursina()
+Sky()
 
-SPEED = 5
-DASH_SPEED = 25
-DASH_TIME = 0.15
-DASH_COOLDOWN = 1.0
-JUMP_HEIGHT = 5
-GRAVITY = 9.8
-CAM_DIST = 10
-CAM_HEIGHT = 2
-MOUSE_SENS = 800
+# Широкая фаза столкновений: снаряды проверяют только ближайшие коллайдеры
+colliders = SpatialHash(cell_size=4)
 
-Sky()
-ground = Entity(model='plane', scale=(100, 0, 100), collider='box', texture='white_cube', texture_scale=(100, 100))
+# Открытый мир: чанки ландшафта подгружаются вокруг игрока, у спавна ровная арена
+# Батчи: неподвижное склеивается в общие меши по материалу, одинаковые снаряды рисуются инстансингом
+scenery = StaticBatcher(cell_size=64, eternal=True)
+ui_batch = StaticBatcher(parent=camera.ui, cell_size=None, eternal=True)
+fireball_batch = InstancedBatch('sphere', capacity=64, eternal=True)
+boss_bars = BarBatch(eternal=True)     # шкалы здоровья всех боссов - один меш
+
+ground = Terrain(seed=1, focus=lambda: player, colliders=colliders, batcher=scenery, eternal=True)
+ground.load_around(Vec3(0, 0, 0))
+
+# Общий пул частиц для хвостов и взрывов файрболов (переживает scene.clear())
+fire_fx = ParticleSystem(capacity=2048, eternal=True)
+
+# Логика игры идёт фиксированными тиками, отрисовка интерполируется между ними
+sim = Simulation(tick_rate=60)
+
+# Ввод: клавиши и геймпад -> действия; нажатия применяются в начале тика, их можно записать и повторить
+actions = ActionInput(sim)
+sim.add_system(actions.tick)
+sim.add_system(colliders.refresh)
+
+# Отложенные вызовы игровой логики: идут тиками, принадлежат сущностям и отменяются вместе с ними
+timers = TimerWheel(sim.dt)
+sim.add_system(timers.tick)
+
+# Массовые объекты (файрболы) - строки в массивах компонентов; системы обрабатывают их все разом.
+# Игрок и дракон отслеживаются, чтобы на них можно было наводиться
+ecs = World(capacity=64)
+
+# Файрболы: наведение и движение - одним проходом по всем, рисуются прямо из массивов инстансингом
+projectiles = Projectiles(ecs, batch=fireball_batch, color=color.orange)
+ecs.register('tail_timer', 'f4')
+
+# ИИ существ: в бою - каждый тик, остальные реже (по дистанции до игрока)
+ai = AIScheduler(focus=lambda: player)
+sim.add_system(ai.tick)
+
+# Профайлер: F3 - оверлей с временем систем, F4 - запись трассы для chrome://tracing
+profiler = FrameProfiler()
+sim.profiler = profiler
+profiler.time_entity(ground, 'terrain')
+profiler.time_entity(fire_fx, 'particles')
+
+# LOD существ по размеру на экране; вне кадра, за холмами и совсем мелкие - не рисуются и не анимируются
+creature_lod = CreatureLOD(terrain=ground)
+profiler.time_entity(creature_lod, 'lod')
+
+# Переходы и смешивание анимаций
+animations = AnimationSystem(visibility=creature_lod.is_visible)
+profiler.time_entity(animations, 'animations')
 
 
 class HealthBar(Entity):
-    def __init__(self, max_health=100, is_boss=False, **kwargs):
-        super().__init__(**kwargs)
+    # Изменения здоровья только отмечают шкалу; перерисовка - не чаще раза в кадр, в update()
+    def __init__(self, max_health=100, is_boss=False, batcher=None, **kwargs):
+        super().__init__(ignore_paused=True, **kwargs)
+        self.batcher = batcher      # StaticBatcher для экранной шкалы
         self.max_health = max_health
         self.current_health = max_health
         self.is_boss = is_boss
+        self.dirty = False
 
         if is_boss:
-            # Шкала здоровья для босса (над его головой)
+            # Шкала здоровья для босса (над его головой) рисуется общим мешем boss_bars; здесь - её место и размер
             self.bg = Entity(
                 parent=self,
-                model='quad',
-                color=color.dark_gray,
                 scale=(1.5, 0.3),
-                position=(0, 1.2, 0),
-                billboard=True
-            )
-            self.fill = Entity(
-                parent=self.bg,
-                model='quad',
-                color=color.red,
-                scale=(1, 1),
-                position=(-0.49, -0.06, -0.1),
-                origin=(-0.5, 0)
+                position=(0, 1.2, 0)
             )
+            self.fill = None
+            boss_bars.add(self.bg)
         else:
             # Шкала здоровья для игрока (на экране)
             self.bg = Entity(
@@ -61,32 +141,55 @@ class HealthBar(Entity):
                 position=(-0.5, 0, -0.1),
                 origin=(-0.5, 0)
             )
+            if batcher is not None:
+                batcher.add(self.bg)
+                batcher.add(self.fill)
 
         self.update_display()
 
     def update_display(self):
         """Обновляет отображение шкалы здоровья"""
-        health_ratio = self.current_health / self.max_health
-        self.fill.scale_x = max(0, health_ratio)  # Защита от отрицательных значений
+        self.dirty = False
+        health_ratio = max(0, self.current_health / self.max_health)  # Защита от отрицательных значений
 
         # Изменение цвета в зависимости от уровня здоровья
         if health_ratio > 0.6:
-            self.fill.color = color.green
+            fill_color = color.green
         elif health_ratio > 0.3:
-            self.fill.color = color.orange
+            fill_color = color.orange
         else:
-            self.fill.color = color.red
+            fill_color = color.red
+
+        if self.is_boss:
+            boss_bars.set(self.bg, health_ratio, fill_color)
+            return
+        self.fill.scale_x = health_ratio
+        self.fill.color = fill_color
+        if self.batcher is not None:
+            self.batcher.refresh(self.fill)
+
+    def update(self):
+        if self.dirty:
+            self.update_display()
 
     def take_damage(self, amount):
         """Наносит урон"""
         self.current_health = max(0, self.current_health - amount)
-        self.update_display()
+        self.dirty = True
         return self.current_health <= 0
 
     def heal(self, amount):
         """Восстанавливает здоровье"""
         self.current_health = min(self.max_health, self.current_health + amount)
-        self.update_display()
+        self.dirty = True
+
+    def snapshot(self):
+        return {'health': self.current_health, 'enabled': self.enabled}
+
+    def restore(self, state):
+        self.current_health = state['health']
+        self.enabled = state['enabled']
+        self.dirty = True
 
 
 class DragonBoss(Entity):
@@ -97,34 +200,30 @@ class DragonBoss(Entity):
             collider='box',
             **kwargs
         )
+        self.species = SPECIES[DRAGON]      # модель и имя вида - общие с реестром существ
 
         # Безопасная загрузка модели с обработкой ошибок
         self.actor = None
-        self.animations_list = []
-        self.current_animation = None
+        self.animator = None
 
         try:
-            # Пробуем загрузить модель
-            self.actor = Actor("test10.glb")
+            # Берём копию модели из кэша (без повторного парсинга GLB)
+            self.actor = assets.actor(self.species['model'])
             if self.actor and not self.actor.is_empty():
                 self.actor.reparent_to(self)
                 self.actor.setScale(0.1)
 
-                # Получаем список доступных анимаций
-                self.animations_list = self.actor.getAnimNames()
-                print("🐉 Доступные анимации дракона:", self.animations_list)
-
-                # Запускаем стартовую анимацию
-                if self.animations_list:
-                    self.current_animation = self.animations_list[0]
-                    self.actor.loop(self.current_animation)
-                    print(f"▶️ Запущена анимация: {self.current_animation}")
+                # Таблица состояний и клипов общая для всех копий модели, автомат - свой у каждой
+                animation_set = AnimationSet.get(self.species['model'], assets.anim_names(self.species['model']))
+                log_dragon.debug("🐉 Доступные анимации дракона: %s", sorted(animation_set.clip_names))
+                self.animator = animations.add(AnimationStateMachine(self.actor, animation_set, 'stand', owner=self))
+                creature_lod.add(self, self.actor, self.species['model'])
             else:
                 raise Exception("Модель не загружена или пустая")
 
         except Exception as e:
-            print(f"❌ Ошибка загрузки анимированной модели: {e}")
-            print("🔄 Используем простую модель куба")
+            log_dragon.error("❌ Ошибка загрузки анимированной модели: %s", e)
+            log_dragon.warning("🔄 Используем простую модель куба")
             # Запасной вариант - простая модель
             self.model = 'cube'
             self.color = color.red
@@ -133,44 +232,38 @@ class DragonBoss(Entity):
         self.target = target
         self.state = 'idle'
         self.in_fight = False
-        self.trigger_radius = 30
-        self.fly_height = 8
         self.attack_cooldown = 0
-        self.attack_interval = 3
 
         # Здоровье босса
-        self.health_bar = HealthBar(max_health=500, is_boss=True, parent=self)
+        self.health_bar = HealthBar(max_health=config.dragon.max_health, is_boss=True, parent=self)
         self.is_alive = True
 
-    def play_animation(self, anim_name):
-        """Воспроизводит анимацию по имени"""
-        try:
-            if self.actor and not self.actor.is_empty() and anim_name in self.animations_list:
-                self.actor.loop(anim_name)
-                self.current_animation = anim_name
-                print(f"▶️ Дракон: {anim_name}")
-            else:
-                print(f"ℹ️ Анимация '{anim_name}' недоступна, используется простая модель")
-        except Exception as e:
-            print(f"❌ Ошибка воспроизведения анимации {anim_name}: {e}")
+        ai.add(self)
+        colliders.add(self)
 
-    def take_damage(self, amount):
-        """Наносит урон дракону"""
-        if not self.is_alive:
+    def play_animation(self, state):
+        """Переводит автомат анимаций в состояние (stand/fly/skill01/deaddown)"""
+        if self.animator is None or self.actor.is_empty():
             return
+        try:
+            if self.animator.request(state):
+                log_dragon.debug("▶️ Дракон: %s (клип %s)", state, self.animator.clip)
+        except Exception as e:
+            log_dragon.error("❌ Ошибка воспроизведения анимации %s: %s", state, e)
 
-        print(f"🐉 Дракон получает {amount} урона! Осталось здоровья: {self.health_bar.current_health - amount}")
-        if self.health_bar.take_damage(amount):
-            self.die()
-        else:
+    def on_damage(self, amount):
+        """Урон за тик (его наносит combat): эффекты; возвращает, сколько урона принять"""
+        log_dragon.info("🐉 Дракон получает %s урона! Осталось здоровья: %s", amount, self.health_bar.current_health - amount)
+        if self.health_bar.current_health > amount:
             # Эффект получения урона
             original_color = self.color
             self.color = color.orange
-            invoke(setattr, self, 'color', original_color, delay=0.2)
+            timers.after(0.2, setattr, self, 'color', original_color, owner=self)
+        return amount
 
     def die(self):
         """Смерть дракона"""
-        print("💀 Дракон побежден!")
+        log_dragon.info("💀 Дракон побежден!")
         self.is_alive = False
         self.in_fight = False
         self.state = 'dead'
@@ -183,47 +276,82 @@ class DragonBoss(Entity):
         self.animate_rotation((0, 0, 90), duration=2, curve=curve.in_out_sine)
         self.color = color.gray
 
-        # Удаление через время
+        # Скрываем через время; сущность не удаляется, чтобы перезапуск вернул её на место
         if hasattr(self, 'health_bar') and self.health_bar:
-            destroy(self.health_bar, delay=2)
-        destroy(self, delay=3)
+            timers.after(2, setattr, self.health_bar, 'enabled', False, owner=self)
+        timers.after(3, setattr, self, 'enabled', False, owner=self)
+
+    def snapshot(self):
+        return {
+            'position': vec(self.position),
+            'rotation': vec(self.rotation),
+            'color': vec(self.color),
+            'enabled': self.enabled,
+            'is_alive': self.is_alive,
+            'state': self.state,
+            'in_fight': self.in_fight,
+            'attack_cooldown': self.attack_cooldown,
+            'animation': self.animator.state if self.animator else None,
+            'health_bar': self.health_bar.snapshot(),
+        }
+
+    def restore(self, state):
+        stop_timers(self, timers)
+        self.position = state['position']
+        self.rotation = state['rotation']
+        ecs.teleport(self)
+        self.color = color.Color(*state['color'])
+        self.enabled = state['enabled']
+        self.is_alive = state['is_alive']
+        self.state = state['state']
+        # Отложенные шаги пробуждения (взлёт, начало атаки) отменены - если бой ещё не дошёл
+        # до атаки, он начнётся заново, когда игрок окажется рядом
+        self.in_fight = state['in_fight'] and self.state == 'attack'
+        self.attack_cooldown = state['attack_cooldown']
+        if self.animator and state['animation']:
+            self.animator.reset(state['animation'])
+        self.health_bar.restore(state['health_bar'])
+        if not self.is_alive and self.enabled:
+            # Снимок сделан сразу после смерти - тело всё равно должно исчезнуть
+            timers.after(2, setattr, self.health_bar, 'enabled', False, owner=self)
+            timers.after(3, setattr, self, 'enabled', False, owner=self)
 
     def start_fight(self):
         if not self.in_fight and self.is_alive:
             self.in_fight = True
-            print("🐉 Босс проснулся!")
+            log_dragon.info("🐉 Босс проснулся!")
             self.play_animation('stand')
-            invoke(self.fly_up, delay=1.0)
+            timers.after(1.0, self.fly_up, owner=self)
 
     def stop_fight(self):
         if self.in_fight and self.is_alive:
-            print("💤 Игрок ушёл — дракон возвращается в ожидание.")
+            log_dragon.info("💤 Игрок ушёл — дракон возвращается в ожидание.")
             self.in_fight = False
             self.play_animation('stand')
             self.animate_y(2, duration=2, curve=curve.in_out_sine)
 
     def fly_up(self):
         if self.in_fight and self.is_alive:
-            print("🛫 Дракон взлетает!")
+            log_dragon.info("🛫 Дракон взлетает!")
             self.play_animation('fly')
-            self.animate_y(self.fly_height, duration=2, curve=curve.out_cubic)
-            invoke(self.start_attack, delay=2)
+            self.animate_y(config.dragon.fly_height, duration=2, curve=curve.out_cubic)
+            timers.after(2, self.start_attack, owner=self)
 
     def start_attack(self):
         if self.in_fight and self.is_alive:
-            print("🔥 Дракон начинает атаку!")
+            log_dragon.info("🔥 Дракон начинает атаку!")
             self.state = 'attack'
             self.play_animation('skill01')
-            invoke(self.shoot_fireball, delay=1.0)
+            timers.after(1.0, self.shoot_fireball, owner=self)
 
-    def update(self):
+    def tick(self, dt):
         if not self.target or not self.is_alive:
             return
 
         dist = distance(self, self.target)
 
         # Проверка триггера боя
-        if dist <= self.trigger_radius:
+        if dist <= config.dragon.trigger_radius:
             if not self.in_fight and self.is_alive:
                 self.start_fight()
         else:
@@ -236,103 +364,77 @@ class DragonBoss(Entity):
             direction = self.target.position - self.position
             if direction.length() > 0:
                 self.rotation_y = lerp_angle(self.rotation_y, math.degrees(math.atan2(-direction.x, -direction.z)),
-                                             6 * time.dt)
+                                             6 * dt)
 
-            self.attack_cooldown -= time.dt
+            self.attack_cooldown -= dt
             if self.attack_cooldown <= 0:
                 self.shoot_fireball()
-                self.attack_cooldown = self.attack_interval
+                self.attack_cooldown = config.dragon.attack_interval
 
     def shoot_fireball(self):
         if self.in_fight and self.target and self.is_alive:
-            print("🎯 Дракон выпускает файрбол!")
+            log_fireball.debug("🎯 Дракон выпускает файрбол!")
             # Создаем файрбол немного перед драконом
             fireball_pos = self.position + Vec3(0, 2, -3)
-            Fireball(position=fireball_pos, target=self.target)
-
-
-class Fireball(Entity):
-    def __init__(self, position, target=None, **kwargs):
-        super().__init__(
-            model='sphere',
-            color=color.orange,
-            scale=1.5,
-            position=position,
-            collider='sphere',
-            **kwargs
-        )
-        self.speed = 12
-        self.target = target
-        self.tail_timer = 0
-        self.life_timer = 0
-        self.max_life = 5
-        self.damage = 25
-
-    def update(self):
-        if not self.enabled:
-            return
-
-        self.life_timer += time.dt
-        if self.life_timer >= self.max_life:
-            self.explode()
-            return
-
-        # Следуем за целью
-        if self.target and self.target.enabled and hasattr(self.target, 'position'):
-            target_pos = self.target.position + Vec3(0, 1, 0)
-            direction = (target_pos - self.position).normalized()
-        else:
-            # Если цель исчезла, летим прямо
-            direction = Vec3(0, 0, -1)
+            spawn_fireball(fireball_pos, target=self.target, owner=self)
 
-        self.position += direction * time.dt * self.speed
 
-        # Плавный поворот в направлении движения
-        if direction.length() > 0:
-            self.look_at(self.position + direction)
+def spawn_fireball(position, target=None, owner=None):
+    # Файрбол - сфера масштаба 1.5; в коллайдер того, кто выстрелил, он не врезается
+    return projectiles.spawn(position, speed=config.fireball.speed, lifetime=config.fireball.max_life,
+                             target=ecs.id_of(target), owner=ecs.id_of(owner), radius=0.75,
+                             turn_rate=config.fireball.turn_rate, tail_timer=0)
 
-        # Эффект хвоста
-        self.tail_timer += time.dt
-        if self.tail_timer > 0.05:
-            self.create_tail()
-            self.tail_timer = 0
 
-        # Проверка столкновений
-        hit_info = self.intersects()
-        if hit_info.hit:
-            if self.target and hit_info.entity == self.target:
-                print("💥 Игрок получил урон от файрбола!")
-                if hasattr(self.target, 'take_damage'):
-                    self.target.take_damage(self.damage)
-            self.explode()
-            return
+def explode_fireball(eid):
+    # Создаем эффект взрыва
+    fire_fx.emit(
+        ecs['position'][eid],
+        color=color.rgb(255, 100, 0),
+        size=0.5,
+        end_size=6,
+        life=0.3
+    )
+    ecs.despawn(eid)
 
-        if self.y < -10:
-            self.explode()
 
-    def create_tail(self):
-        tail = Entity(
-            model='sphere',
+@ecs.add_system
+def fireball_tick(ecs, dt):
+    """Все файрболы за тик: время жизни, наведение и движение - разом, столкновения - по одному"""
+    rows, gone = projectiles.step(dt)       # gone - кончилось время или ушли под землю
+    if not len(rows) and not len(gone):
+        return
+    position, direction = ecs['position'], ecs['direction']
+
+    # Эффект хвоста
+    tail = ecs['tail_timer']
+    tail[rows] += dt
+    for eid in rows[tail[rows] > 0.05].tolist():
+        fire_fx.emit(
+            position[eid] - direction[eid] * 0.3,
             color=color.rgb(255, uniform(100, 150), 0),
-            scale=uniform(0.2, 0.4),
-            position=self.position - self.forward * 0.3,
-        )
-        tail.animate_scale(0.1, duration=0.3)
-        tail.animate_color(color.clear, duration=0.3)
-        destroy(tail, delay=0.3)
-
-    def explode(self):
-        # Создаем эффект взрыва
-        explosion = Entity(
-            model='sphere',
-            color=color.rgb(255, 100, 0),
-            scale=0.5,
-            position=self.position,
+            size=uniform(0.2, 0.4),
+            end_size=0.1,
+            life=0.3
         )
-        explosion.animate_scale(6, duration=0.3)
-        explosion.animate_color(color.clear, duration=0.3)
-        destroy(explosion, delay=0.4)
-        destroy(self)
+        tail[eid] = 0
+
+    # Проверка столкновений: только ближайшие коллайдеры, с учётом всего пути за тик
+    gone = gone.tolist()
+    prev, radius, owners, targets, proxies = ecs['prev_position'], ecs['radius'], ecs['owner'], ecs['homing'], ecs.proxies
+    for eid, target_id in zip(rows.tolist(), targets[rows].tolist()):
+        owner = proxies[owners[eid]] if owners[eid] >= 0 else None
+        hit_info = colliders.sweep(Vec3(*prev[eid].tolist()), Vec3(*position[eid].tolist()), float(radius[eid]),
+                                   ignore=(owner,))
+        if hit_info.hit:
+            target_entity = proxies[target_id] if target_id >= 0 else None
+            if target_entity is not None and hit_info.entity is target_entity:
+                log_fireball.info("💥 Игрок получил урон от файрбола!")
+                combat.damage(target_entity, config.fireball.damage)
+            gone.append(eid)
+
+    for eid in gone:
+        explode_fireball(eid)
 
 
 class Player(Entity):
@@ -345,53 +447,61 @@ class Player(Entity):
             collider='box',
             **kwargs
         )
-        self.health_bar = HealthBar(max_health=100, is_boss=False)
+        self.health_bar = HealthBar(max_health=100, is_boss=False, batcher=ui_batch)
         self.is_alive = True
         self.invincible = False
         self.invincible_timer = 0
+        self.game_over_text = None
+        self.controller = CharacterController(self, terrain=ground, colliders=colliders,
+                                              coyote_time=config.player.coyote_time)
+        sim.add(self)
+        colliders.add(self)
+
+    def on_damage(self, amount):
+        """Урон за тик (его наносит combat): неуязвимость и эффекты; возвращает, сколько урона принять"""
+        if self.invincible:
+            return 0
 
-    def take_damage(self, amount):
-        """Наносит урон игроку"""
-        if not self.is_alive or self.invincible:
-            return
-
-        print(f"❤️ Игрок получает {amount} урона! Осталось здоровья: {self.health_bar.current_health - amount}")
+        log_player.info("❤️ Игрок получает %s урона! Осталось здоровья: %s", amount, self.health_bar.current_health - amount)
 
         # Включаем неуязвимость на 1 секунду после получения урона
         self.invincible = True
         self.invincible_timer = 1.0
         self.color = color.red
-        invoke(self.reset_color, delay=0.3)
+        timers.after(0.3, self.reset_color, owner=self)
 
-        if self.health_bar.take_damage(amount):
-            self.die()
-        else:
+        if self.health_bar.current_health > amount:
             # Мигание при получении урона
             original_color = self.color
             self.animate_color(color.red, duration=0.1)
-            invoke(self.animate_color, original_color, duration=0.1, delay=0.1)
+            timers.after(0.1, self.animate_color, original_color, duration=0.1, owner=self)
+        return amount
 
     def reset_color(self):
         """Восстанавливает цвет игрока"""
         self.color = color.blue
         self.invincible = False
 
-    def update(self):
+    def tick(self, dt):
         # Обновление таймера неуязвимости
         if self.invincible:
-            self.invincible_timer -= time.dt
+            self.invincible_timer -= dt
             if self.invincible_timer <= 0:
                 self.invincible = False
                 self.color = color.blue
 
     def die(self):
         """Смерть игрока"""
-        print("💀 Игрок погиб!")
+        log_player.info("💀 Игрок погиб!")
         self.is_alive = False
+        self.show_game_over()
+
+    def show_game_over(self):
+        """Экран проигрыша: серый игрок, сообщение и пауза до перезапуска"""
         self.color = color.gray
 
         # Сообщение о проигрыше
-        game_over_text = Text(
+        self.game_over_text = Text(
             text='ВЫ ПРОИГРАЛИ!\nНажмите R для перезапуска',
             origin=(0, 0),
             scale=2,
@@ -402,154 +512,344 @@ class Player(Entity):
         # Останавливаем игру
         application.paused = True
 
+    def snapshot(self):
+        return {
+            'position': vec(self.position),
+            'rotation_y': self.rotation_y,
+            'is_alive': self.is_alive,
+            'invincible': self.invincible,
+            'invincible_timer': self.invincible_timer,
+            'velocity_y': self.controller.velocity_y,
+            'health_bar': self.health_bar.snapshot(),
+        }
+
+    def restore(self, state):
+        stop_timers(self, timers)
+        if self.game_over_text:
+            destroy(self.game_over_text)
+            self.game_over_text = None
+        self.position = state['position']
+        self.rotation_y = state['rotation_y']
+        sim.teleport(self)
+        ecs.teleport(self)
+        self.is_alive = state['is_alive']
+        self.invincible = state['invincible']
+        self.invincible_timer = state['invincible_timer']
+        self.color = color.red if self.invincible else color.blue
+        self.controller.velocity_y = state['velocity_y']
+        self.controller.is_grounded = False
+        self.health_bar.restore(state['health_bar'])
+        if not self.is_alive:       # снимок сделан после смерти - снова экран проигрыша
+            self.show_game_over()
 
-player = Player()
 
-mouse.locked = True
-camera.rotation_x = 15
-yaw = 0
-pitch = 15
+player = Player()
 
+if not headless_args:
+    mouse.locked = True
 is_dashing = False
 dash_time = 0
 dash_cooldown = 0
 dash_dir = Vec3(0, 0, 0)
 move = Vec3(0, 0, 0)
 
-velocity_y = 0
-is_grounded = False
+# Снег следует за камерой и обновляется сам (одним шагом NumPy за кадр)
+snow = Weather('snow', count=2000, area=20, ground=ground.heights_at, eternal=True)
+profiler.time_entity(snow, 'snow')
+
+
+def input(key):
+    # Игровые клавиши разбирает ActionInput
+    if key == 'escape':
+        application.quit()
 
-snowflakes = []
 
+def report_quicksave(future):
+    # Ошибку записи уже записал в журнал SaveManager
+    if future.exception() is None:
+        log_game.info("💾 Сохранено: %s", future.result())
 
-def spawn_snowflake():
-    flake = Entity(
-        model='quad',
-        color=color.rgb(240, 240, 255),
-        scale=0.03,
-        position=(uniform(-20, 20), uniform(5, 10), uniform(-20, 20)),
-        rotation=(uniform(0, 360), 0, 0),
-        billboard=True
-    )
-    snowflakes.append(flake)
 
+def system_input(key):
+    """Клавиши, которые работают и на паузе (после смерти игрока игра стоит на паузе)"""
+    # Перезапуск игры
+    if key == 'r' and not player.is_alive:
+        restart_game()
+
+    # Быстрое сохранение и загрузка (F5/F9 в Ursina заняты горячей перезагрузкой кода)
+    if key == 'k':
+        saves.save(*capture_save(), path=QUICKSAVE_PATH).add_done_callback(report_quicksave)
+    if key == 'l':
+        if QUICKSAVE_PATH.exists():
+            load_game(QUICKSAVE_PATH)
+        else:
+            log_game.warning("📂 Быстрого сохранения пока нет")
+
+    # Запись ввода вместе со снимком мира - повторяется через test.py --headless --replay
+    if key == 'o':
+        if actions.recording is None:
+            actions.start_recording(world.capture())
+            log_game.info("⏺ Запись ввода началась")
+        else:
+            actions.stop_recording(INPUT_RECORDING_PATH)
+            log_game.info("⏹ Ввод записан: %s", INPUT_RECORDING_PATH)
 
-for i in range(80):
-    spawn_snowflake()
 
+def capture_save():
+    """Что попадает в файл сохранения: seed мира, снимок мира и пойманные существа"""
+    return ground.seed, world.capture(), captured
 
-def update_snow():
-    for flake in snowflakes:
-        flake.y -= time.dt * 1.5
-        flake.rotation_x += time.dt * 50
-        if flake.y < -1:
-            flake.y = uniform(5, 10)
-            flake.x = uniform(-20, 20)
-            flake.z = uniform(-20, 20)
 
+def load_game(path):
+    """Загружает сохранение; если файл не читается или снимок не подходит, игра остаётся как была"""
+    global captured, roster
+    try:
+        game = saves.load(path)
+    except (OSError, ValueError) as e:
+        log_game.error("📂 Не удалось загрузить сохранение: %s", e)
+        return
+    current = world.capture()
+    try:
+        world.restore(game.state)
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        world.restore(current)      # часть мира могла успеть восстановиться - возвращаем как было
+        log_game.error("📂 Сохранение %s не подходит к этой версии игры: %r", path, e)
+        return
+    if game.seed != ground.seed:
+        log_game.warning("⚠️ Сохранение сделано в мире с другим seed (%s), ландшафт не совпадёт", game.seed)
+    captured = game.creatures   # блоки существ распакуются, только когда к ним обратятся
+    roster = Roster.from_store(captured)    # и реестр соберётся при первом запросе
+    log_game.info("📂 Загружено: %s, пойманных существ: %s", path, len(captured))
 
-def input(key):
-    global is_dashing, dash_time, dash_dir, dash_cooldown, move
-    global velocity_y
 
-    if key == 'escape':
-        application.quit()
+def restart_game():
+    """Перезапускает игру: мир возвращается к снимку, сделанному при старте (без пересоздания сущностей)"""
+    world.restore(initial_snapshot)
+    log_game.info("🔄 Игра перезапущена!")
 
-    if key == 'q' and not is_dashing and dash_cooldown <= 0:
-        if move.length() > 0:
-            dash_dir = move.normalized()
-            is_dashing = True
-            dash_time = DASH_TIME
 
-    if key == 'space' and is_grounded:
-        velocity_y = JUMP_HEIGHT
+def capture_controls():
+    return {
+        'is_dashing': is_dashing, 'dash_time': dash_time, 'dash_cooldown': dash_cooldown,
+        'dash_dir': vec(dash_dir),
+    }
 
-    # Тестовый урон по дракону
-    if key == 'f' and dragon.is_alive:
-        dragon.take_damage(50)
 
-    # Перезапуск игры
-    if key == 'r' and not player.is_alive:
-        application.paused = False
-        scene.clear()
-        invoke(restart_game, delay=0.1)
+def restore_controls(state):
+    global is_dashing, dash_time, dash_cooldown, dash_dir
+    is_dashing = state['is_dashing']
+    dash_time = state['dash_time']
+    dash_cooldown = state['dash_cooldown']
+    dash_dir = Vec3(*state['dash_dir'])
+    actions.clear()
 
 
-def restart_game():
-    """Перезапускает игру"""
-    global player, dragon
-    player = Player()
-    dragon = DragonBoss(target=player, trigger_radius=50)
-    print("🔄 Игра перезапущена!")
+def restore_effects(state):
+    """Снаряды и частицы в снимок не попадают - при восстановлении их просто убираем"""
+    fire_fx.clear()
+    projectiles.clear()
+    combat.clear()
+    snow.count = snow.count     # заново рассыпаем снег вокруг камеры
+    sim.accumulator = 0
+    application.paused = not player.is_alive    # игрок восстанавливается раньше (см. порядок world.add)
 
 
 def update():
-    global yaw, pitch, is_dashing, dash_time, dash_cooldown, dash_dir, move
-    global velocity_y, is_grounded
-
+    config.apply_pending()
     if application.paused:
         return
 
     dt = time.dt
-    update_snow()
-
-    if mouse.locked:
-        yaw += mouse.velocity[0] * MOUSE_SENS * dt
-        pitch -= mouse.velocity[1] * MOUSE_SENS * dt
-        pitch = clamp(pitch, -10, 60)
-
-    camera.rotation = Vec3(pitch, yaw, 0)
-    cam_target = player.position + Vec3(0, CAM_HEIGHT, 0)
-    camera.position = cam_target - camera.forward * CAM_DIST
-    camera.look_at(cam_target)
 
-    forward = Vec3(camera.forward.x, 0, camera.forward.z).normalized()
-    right = Vec3(camera.right.x, 0, camera.right.z).normalized()
+    if mouse.locked and not actions.replaying:
+        sensitivity = config.camera.mouse_sensitivity * dt
+        camera_rig.aim(mouse.velocity[0] * sensitivity, -mouse.velocity[1] * sensitivity)
+
+    # Физика и логика - фиксированными тиками, камера - каждый кадр по интерполированной позиции
+    with profiler.scope('sim'):
+        sim.step(dt)
+
+    with profiler.scope('ecs sync'):
+        ecs.sync(sim.alpha)
+        projectiles.render(sim.alpha)
+
+    with profiler.scope('camera'):
+        camera_rig.update(dt)
+
+
+@sim.add_system
+def player_tick(dt):
+    """Движение, рывок и гравитация игрока за один тик"""
+    global is_dashing, dash_time, dash_cooldown, dash_dir
+    controller = player.controller
+    buffer_time = config.player.input_buffer
+
+    # Поворот камеры тоже часть ввода: без него повтор записи разошёлся бы с оригиналом
+    yaw = actions.track('camera_yaw', camera_rig.yaw)
+    pitch = actions.track('camera_pitch', camera_rig.pitch)
+    if actions.replaying:
+        camera_rig.aim(yaw - camera_rig.yaw, pitch - camera_rig.pitch)
+
+    # Направление от камеры; move переиспользуется, а не создаётся заново каждый тик
+    x, y = actions.axis('move_x'), actions.axis('move_y')
+    forward, right = camera_rig.flat_forward, camera_rig.right
+    mx = forward[0] * y + right[0] * x
+    mz = forward[2] * y + right[2] * x
+    length = math.hypot(mx, mz)
+    if length > 1:      # по диагонали не быстрее; стик наклонён не до конца - медленнее
+        mx, mz, length = mx / length, mz / length, 1
+    move.set(mx, 0, mz)
+
+    # Нажатия, которые сейчас нельзя выполнить, ждут в буфере input_buffer секунд
+    if not is_dashing and dash_cooldown <= 0 and length > 0 and actions.consume('dash', buffer_time):
+        dash_dir = move.normalized()
+        is_dashing = True
+        dash_time = config.player.dash_time
+    if controller.can_jump and actions.consume('jump', buffer_time):
+        controller.jump(config.player.jump_height)
 
-    move = Vec3(0, 0, 0)
-    if held_keys['w']: move += forward
-    if held_keys['s']: move -= forward
-    if held_keys['a']: move -= right
-    if held_keys['d']: move += right
-    if move.length() > 0:
-        move = move.normalized()
+    # Тестовый урон по дракону
+    if actions.consume('test_damage') and dragon.is_alive:
+        combat.damage(dragon, 50)
 
+    # Перемещения идут через свип-тест, поэтому рывок не проскакивает сквозь препятствия
     if is_dashing:
-        player.position += dash_dir * DASH_SPEED * dt
+        controller.move(dash_dir * config.player.dash_speed * dt)
         dash_time -= dt
         if dash_time <= 0:
             is_dashing = False
-            dash_cooldown = DASH_COOLDOWN
+            dash_cooldown = config.player.dash_cooldown
     else:
-        player.position += move * SPEED * dt
+        controller.move(move * config.player.speed * dt)
         if dash_cooldown > 0:
             dash_cooldown -= dt
 
-    ray = raycast(player.position + Vec3(0, 0.1, 0), Vec3(0, -1, 0), distance=0.3, ignore=[player])
-    is_grounded = ray.hit
-
-    if not is_grounded:
-        velocity_y -= GRAVITY * dt
-    else:
-        velocity_y = max(0, velocity_y)
-
-    player.position += Vec3(0, velocity_y * dt, 0)
+    controller.apply_gravity(dt, config.player.gravity)
 
     # Плавный поворот игрока в направлении движения
-    if move.length() > 0:
+    if length > 0:
         target_rotation = math.degrees(math.atan2(-move.x, -move.z))
         player.rotation_y = lerp_angle(player.rotation_y, target_rotation, 8 * dt)
 
 
+# Файрболы двигаются после игрока - как раньше, когда они были сущностями симуляции
+sim.add_system(ecs.tick)
+
+# Урон и лечение за тик копятся и применяются разом в конце тика: по разу на цель
+# (combat.resolve регистрируется последней системой - после автосохранения, см. ниже)
+combat = CombatEvents()
+
+
+@combat.on(DEATH)
+def capture_creature(target, damage):
+    """Побеждённое существо попадает в пойманные"""
+    if not isinstance(target, DragonBoss):
+        return
+    creature = CapturedCreature(len(captured) + 1, species=DRAGON, level=10,
+                                health=0, max_health=target.health_bar.max_health,
+                                position=target.position, name=target.species['name'])
+    captured.append(creature)
+    roster.add(creature)
+
 # Создаем дракона
-dragon = DragonBoss(target=player, trigger_radius=50)
+dragon = DragonBoss(target=player)
+ecs.track(player)
+ecs.track(dragon)
+
+# Камера обходит ландшафт и препятствия, но не персонажей
+camera_rig = CameraRig(player, colliders=colliders, distance=config.camera.distance, height=config.camera.height,
+                       ignore=(player, dragon))
+camera_rig.snap()
+
+@config.on_change
+def apply_config(config, changed):
+    """То, что не читается из config каждый тик, обновляем сами"""
+    if 'dragon' in changed:
+        dragon.health_bar.max_health = config.dragon.max_health
+        dragon.health_bar.current_health = min(dragon.health_bar.current_health, config.dragon.max_health)
+        dragon.health_bar.dirty = True
+    if 'player' in changed:
+        player.controller.coyote_time = config.player.coyote_time
+    if 'camera' in changed:
+        camera_rig.distance = config.camera.distance
+        camera_rig.height = config.camera.height
+
+
+# Снимок мира: R возвращает к начальному, K/L - быстрое сохранение и загрузка
+QUICKSAVE_PATH = SAVE_FOLDER / 'quicksave.vsav'
+INPUT_RECORDING_PATH = SAVE_FOLDER / 'input.json'
+world = WorldSnapshot()
+world.add('player', player)
+world.add('dragon', dragon)
+world.add('camera', camera_rig)
+world.register('controls', capture_controls, restore_controls)
+world.register('effects', dict, restore_effects)
+initial_snapshot = world.capture()
+
+# Пойманные существа и сохранения: запись и сжатие в фоне, автосохранение раз в минуту
+captured = CreatureStore()
+roster = Roster()           # то же самое по столбцам - для фильтров и сортировки в списках
+saves = SaveManager(SAVE_FOLDER / 'autosave.vsav', autosave_interval=60)
+
+
+@sim.add_system
+def autosave(dt):
+    saves.tick(dt, capture_save)
+
+
+# Последняя система тика: автосохранение не застанет смерть, применённую без экрана проигрыша
+sim.add_system(combat.resolve)
+
+system_keys = Entity(ignore_paused=True, eternal=True)
+system_keys.input = system_input
 
 # Добавляем подсказки для управления
 Text(
-    text='Управление:\nWASD - движение\nSpace - прыжок\nQ - рывок\nF - нанести урон дракону (тест)\nR - перезапуск',
+    text='Управление:\nWASD - движение\nSpace - прыжок\nQ - рывок\nF - нанести урон дракону (тест)\nR - перезапуск\nK/L - быстрое сохранение/загрузка\nO - запись ввода',
     position=(-0.85, 0.3),
     scale=1.0,
     color=color.white
 )
 
-app.run()
\ No newline at end of file
+if headless_args:
+    script = headless.SCRIPTS[headless_args.script]
+    if headless_args.replay:
+        recording = actions.replay(headless_args.replay)
+        if recording['state'] is not None:
+            world.restore(recording['state'])
+        script = ()
+    if headless_args.record:
+        actions.start_recording(world.capture())
+    bench = headless.Benchmark(app, sim, frames=headless_args.frames, script=script)
+    bench.time_entity(snow, 'snow')
+    bench.time_entity(fire_fx, 'particles')
+    if headless_args.trace:
+        profiler.start_trace()
+    report = bench.run()
+    if headless_args.trace:
+        profiler.stop_trace(headless_args.trace)
+    report['frame_profile'] = profiler.percentiles()
+    report['ai'] = ai.summary()
+    report['ground'] = player.controller.stats()
+    report['draw_calls'] = draw_call_report((scenery, ui_batch, fireball_batch, boss_bars))
+    report['lod'] = creature_lod.stats()
+    report['timers'] = timers.stats()
+    report['ecs'] = ecs.stats()
+    report['batches'] = {'scenery': scenery.stats(), 'ui': ui_batch.stats(), 'fireballs': fireball_batch.stats(),
+                         'boss_bars': boss_bars.stats()}
+    report['combat'] = combat.stats()
+    if headless_args.script == 'restart':
+        health = dragon.health_bar
+        report['restart'] = {'dragon_health': health.current_health, 'dragon_max': health.max_health,
+                             'player_alive': player.is_alive,
+                             'ok': player.is_alive and health.current_health == health.max_health}
+    if headless_args.record:
+        actions.stop_recording(headless_args.record)
+    gamelog.shutdown()      # сначала допечатываем очередь сообщений, потом отчёт
+    headless.print_report(report)
+    if headless_args.report:
+        headless.save_report(report, headless_args.report)
+    if 'restart' in report and not report['restart']['ok']:
+        sys.exit(1)
+else:
+    app.run()
\ No newline at end of file
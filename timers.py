@@ -0,0 +1,234 @@
+from time import perf_counter
+from collections import deque
+
+import gamelog
+
+log = gamelog.get('timers')
+
+# Колесо: LEVELS уровней по 2**BITS ячеек; уровень 0 - по тику, каждый следующий в 2**BITS раз грубее
+BITS = 8
+SLOTS = 1 << BITS
+MASK = SLOTS - 1
+LEVELS = 4
+
+
+class Timer:
+    """Отложенный вызов в TimerWheel; cancel() снимает его за O(1)"""
+    __slots__ = ('wheel', 'due', 'function', 'args', 'kwargs', 'owner', 'active')
+
+    def __init__(self, wheel, due, function, args, kwargs, owner):
+        self.wheel = wheel
+        self.due = due              # номер тика, на котором сработает
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.owner = owner
+        self.active = True          # ещё не сработал и не отменён
+
+    def cancel(self):
+        self.wheel.cancel(self)
+
+
+class TimerWheel:
+    """Отложенные вызовы игровой логики на иерархическом колесе таймеров (вместо invoke с delay).
+
+    Идёт тиками Simulation (tick - её система), поэтому задержки детерминированы и встают на паузу
+    вместе с игрой. Добавление и отмена - O(1): таймер кладётся в ячейку колеса по номеру тика,
+    дальние таймеры спускаются на нижний уровень, когда до них доходит очередь. Таймер принадлежит
+    сущности (owner): после destroy() он не сработает, cancel_owner() снимает все её таймеры разом.
+    На вызовы за тик есть бюджет budget_ms - что не успели, выполняется в начале следующего тика.
+    """
+
+    def __init__(self, dt=1 / 60, budget_ms=2.0):
+        self.dt = dt
+        self.budget_ms = budget_ms
+        self.now = 0                # текущий тик
+        self._wheels = [[[] for _ in range(SLOTS)] for _ in range(LEVELS)]
+        self._overflow = []         # дальше, чем охватывает колесо
+        self._late = deque()        # сработавшие, но не уложившиеся в бюджет прошлого тика
+        self._owned = {}            # id(владельца) -> множество его таймеров
+        self.pending = 0
+        self.fired = 0
+        self.cancelled = 0
+        self.deferred = 0
+        self.tick_ms = 0.0          # последний тик
+        self.max_tick_ms = 0.0
+
+    def __len__(self):
+        return self.pending
+
+    # --- добавление и отмена ---
+
+    def after(self, delay, function, *args, owner=None, **kwargs):
+        """Вызовет function(*args, **kwargs) через delay секунд (не раньше следующего тика)"""
+        ticks = max(1, round(delay / self.dt))
+        timer = Timer(self, self.now + ticks, function, args, kwargs, owner)
+        self._insert(timer)
+        self.pending += 1
+        if owner is not None:
+            owned = self._owned.get(id(owner))
+            if owned is None:
+                owned = self._owned[id(owner)] = set()
+            owned.add(timer)
+        return timer
+
+    def _insert(self, timer):
+        delta = timer.due - self.now
+        for level in range(LEVELS):
+            if delta < SLOTS << (BITS * level):
+                self._wheels[level][(timer.due >> (BITS * level)) & MASK].append(timer)
+                return
+        self._overflow.append(timer)
+
+    def cancel(self, timer):
+        """Снимает таймер; из ячейки он не удаляется - колесо пропустит его, когда дойдёт"""
+        if not timer.active:
+            return
+        timer.active = False
+        self.pending -= 1
+        self.cancelled += 1
+        self._forget(timer)
+
+    def cancel_owner(self, owner):
+        """Снимает все таймеры сущности (перед восстановлением снимка, при перезапуске)"""
+        for timer in list(self._owned.get(id(owner), ())):
+            self.cancel(timer)
+
+    def clear(self):
+        for timer in self._all():
+            timer.active = False
+        self._wheels = [[[] for _ in range(SLOTS)] for _ in range(LEVELS)]
+        self._overflow.clear()
+        self._late.clear()
+        self._owned.clear()
+        self.pending = 0
+
+    def _all(self):
+        for wheel in self._wheels:
+            for bucket in wheel:
+                yield from bucket
+        yield from self._overflow
+        yield from self._late
+
+    def _forget(self, timer):
+        if timer.owner is not None:
+            owned = self._owned.get(id(timer.owner))
+            if owned is not None:
+                owned.discard(timer)
+                if not owned:
+                    del self._owned[id(timer.owner)]
+
+    # --- ход времени ---
+
+    def _cascade(self):
+        """Спускает таймеры с верхних уровней, чьи ячейки пришлись на этот тик (сверху вниз)"""
+        now = self.now
+        if now & MASK:
+            return
+        if now & ((1 << (BITS * LEVELS)) - 1) == 0 and self._overflow:
+            overflow, self._overflow = self._overflow, []
+            for timer in overflow:
+                if timer.active:
+                    self._insert(timer)
+        top = 1
+        while top < LEVELS - 1 and now & ((1 << (BITS * (top + 1))) - 1) == 0:
+            top += 1
+        for level in range(top, 0, -1):
+            slot = (now >> (BITS * level)) & MASK
+            bucket = self._wheels[level][slot]
+            if bucket:
+                self._wheels[level][slot] = []
+                for timer in bucket:
+                    if timer.active:
+                        self._insert(timer)
+
+    def tick(self, dt=None):
+        """Продвигает колесо на тик и выполняет наступившие вызовы (в пределах бюджета)"""
+        start = perf_counter()
+        deadline = start + self.budget_ms / 1000
+        self.now += 1
+        self._cascade()
+
+        slot = self.now & MASK
+        due = self._wheels[0][slot]
+        if due:
+            self._wheels[0][slot] = []
+            self._late.extend(due)
+
+        late = self._late
+        while late:
+            if perf_counter() > deadline:
+                self.deferred += len(late)
+                log.debug("⏳ Таймеры не уложились в %.1f мс, отложено: %s", self.budget_ms, len(late))
+                break
+            timer = late.popleft()
+            if not timer.active:
+                continue
+            timer.active = False
+            self.pending -= 1
+            self._forget(timer)
+            owner = timer.owner
+            if owner is not None and owner.is_empty():     # владельца уничтожили
+                continue
+            self.fired += 1
+            timer.function(*timer.args, **timer.kwargs)
+
+        self.tick_ms = (perf_counter() - start) * 1000
+        if self.tick_ms > self.max_tick_ms:
+            self.max_tick_ms = self.tick_ms
+
+    def stats(self):
+        return {'pending': self.pending, 'fired': self.fired, 'cancelled': self.cancelled,
+                'deferred': self.deferred, 'max_tick_ms': self.max_tick_ms}
+
+
+def benchmark(count=10000, frames=120):
+    """count ожидающих таймеров: TimerWheel против invoke() (Sequence на каждый вызов)"""
+    from ursina import Ursina, invoke, application
+    import random
+
+    app = Ursina(window_type='none')
+    rng = random.Random(0)
+    delays = [rng.uniform(5, 60) for _ in range(count)]     # за время замера ни один не сработает
+
+    def frame_ms(step):
+        times = []
+        for _ in range(frames):
+            start = perf_counter()
+            step()
+            times.append(perf_counter() - start)
+        times.sort()
+        return times[len(times) // 2] * 1000
+
+    results = {}
+    idle = frame_ms(taskMgr.step)
+
+    start = perf_counter()
+    sequences = [invoke(print, delay=d) for d in delays]
+    add = (perf_counter() - start) * 1000
+    frame = frame_ms(taskMgr.step) - idle
+    start = perf_counter()
+    for sequence in sequences:
+        sequence.kill()
+    cancel = (perf_counter() - start) * 1000
+    application.sequences.clear()
+    results['invoke'] = {'add': add, 'frame': frame, 'cancel': cancel}
+
+    wheel = TimerWheel()
+    start = perf_counter()
+    timers = [wheel.after(d, print) for d in delays]
+    add = (perf_counter() - start) * 1000
+    frame = frame_ms(wheel.tick)
+    start = perf_counter()
+    for timer in timers:
+        timer.cancel()
+    cancel = (perf_counter() - start) * 1000
+    results['TimerWheel'] = {'add': add, 'frame': frame, 'cancel': cancel}
+    return results
+
+
+if __name__ == '__main__':
+    results = benchmark()
+    print(f"{'10000 таймеров, мс':<20}{'добавить':>12}{'кадр':>12}{'отменить':>12}")
+    for name, r in results.items():
+        print(f"{name:<20}{r['add']:>12.3f}{r['frame']:>12.4f}{r['cancel']:>12.3f}")
@@ -0,0 +1,135 @@
+from ursina import *
+import numpy as np
+
+from particles import build_billboards, upload_billboards, quad_indices
+
+# Настройки осадков: скорость падения, боковой снос, размер и цвет частиц
+WEATHER_PRESETS = {
+    'snow': dict(fall_speed=1.5, drift=0.3, size=0.03, color=color.rgb(240, 240, 255)),
+    'rain': dict(fall_speed=14, drift=0.05, size=0.02, color=color.rgba(0.6, 0.7, 1, 0.6)),
+    'ash': dict(fall_speed=0.6, drift=0.6, size=0.05, color=color.rgba(0.3, 0.3, 0.3, 0.8)),
+}
+
+
+class Weather(Entity):
+    """Осадки (снег, дождь, пепел): все частицы в одном массиве, отрисовка одним мешем"""
+
+    def __init__(self, kind='snow', count=100, area=20, height=(5, 10), floor=-1, follow=camera, ground=None,
+                 ground_cells=8, texture='circle', **kwargs):
+        preset = WEATHER_PRESETS[kind]
+        mesh = Mesh(static=False, vertex_buffer_format='p3f,c4f,t2f')
+        super().__init__(
+            model=mesh,
+            texture=texture,
+            double_sided=True,
+            **kwargs
+        )
+        self.mesh = mesh
+        self.kind = kind
+        self.area = area            # половина стороны области вокруг камеры
+        self.height = height        # диапазон высоты появления над землёй
+        self.floor = floor          # ниже этой высоты над землёй частица появляется заново
+        self.follow = follow        # за кем следует область осадков
+        self.ground = ground        # heights_at(xs, zs) ландшафта; None - земля на высоте 0
+        self.ground_cells = ground_cells
+        self._ground_grid = None    # (x0, z0, шаг, высоты [x][z]) - земля под областью осадков
+        self.fall_speed = preset['fall_speed']
+        self.drift = preset['drift']
+
+        self.positions = np.zeros((0, 3), dtype=np.float32)
+        self.phases = np.zeros(0, dtype=np.float32)
+        self.sizes = np.zeros(0, dtype=np.float32)
+        self.colors = np.zeros((0, 4), dtype=np.float32)
+        self._base_size = preset['size']
+        self._base_color = tuple(preset['color'])
+        self._indices = quad_indices(0)
+        self._time = 0
+        self.count = count
+
+    @property
+    def count(self):
+        return len(self.positions)
+
+    @count.setter
+    def count(self, value):
+        """Меняет плотность осадков, пересоздавая буферы"""
+        cx, cz = self._center()
+        self.positions = np.empty((value, 3), dtype=np.float32)
+        self.positions[:, 0] = np.random.uniform(cx - self.area, cx + self.area, value)
+        self.positions[:, 2] = np.random.uniform(cz - self.area, cz + self.area, value)
+        self.positions[:, 1] = self._ground_under(self.positions[:, 0], self.positions[:, 2], cx, cz)
+        self.positions[:, 1] += np.random.uniform(self.floor, self.height[1], value)
+        self.phases = np.random.uniform(0, 2 * math.pi, value).astype(np.float32)
+        self.sizes = np.full(value, self._base_size * 0.5, dtype=np.float32)
+        self.colors = np.tile(np.array(self._base_color, dtype=np.float32), (value, 1))
+        self._indices = quad_indices(value)
+        if not value:
+            upload_billboards(self.mesh, (), self._indices)     # update() пустой меш не обновляет
+
+    def _ground_under(self, x, z, cx, cz):
+        """Высота земли под частицами: билинейно по сетке ground_cells x ground_cells вокруг области.
+
+        Сетка пересчитывается, только когда центр области уходит на другую клетку.
+        """
+        if self.ground is None:
+            return np.zeros(len(x), dtype=np.float32)
+        step = 2 * self.area / self.ground_cells
+        x0 = (math.floor(cx / step) - self.ground_cells // 2 - 1) * step
+        z0 = (math.floor(cz / step) - self.ground_cells // 2 - 1) * step
+        grid = self._ground_grid
+        if grid is None or grid[0] != x0 or grid[1] != z0:
+            points = x0 + np.arange(self.ground_cells + 3) * step, z0 + np.arange(self.ground_cells + 3) * step
+            gx, gz = np.meshgrid(*points, indexing='ij')
+            grid = self._ground_grid = (x0, z0, step, np.asarray(self.ground(gx, gz), dtype=np.float32))
+        heights = grid[3]
+        last = len(heights) - 2
+        u = np.clip((x - x0) / step, 0, last + 0.999)
+        v = np.clip((z - z0) / step, 0, last + 0.999)
+        i = u.astype(np.intp)
+        j = v.astype(np.intp)
+        u -= i
+        v -= j
+        return ((heights[i, j] * (1 - u) + heights[i + 1, j] * u) * (1 - v)
+                + (heights[i, j + 1] * (1 - u) + heights[i + 1, j + 1] * u) * v)
+
+    def _center(self):
+        if self.follow:
+            return self.follow.world_x, self.follow.world_z
+        return 0, 0
+
+    def update(self):
+        count = len(self.positions)
+        if count == 0:
+            return
+
+        dt = time.dt
+        self._time += dt
+        pos = self.positions
+
+        # Падение и покачивание из стороны в сторону
+        pos[:, 1] -= self.fall_speed * dt
+        if self.drift:
+            sway = np.sin(self._time + self.phases) * (self.drift * dt)
+            pos[:, 0] += sway
+            pos[:, 2] += sway[::-1]
+
+        # Область следует за камерой: частицы, оставшиеся позади, переносятся на другую сторону
+        cx, cz = self._center()
+        size = 2 * self.area
+        pos[:, 0] = (pos[:, 0] - cx + self.area) % size + cx - self.area
+        pos[:, 2] = (pos[:, 2] - cz + self.area) % size + cz - self.area
+
+        # Упавшие на землю частицы появляются заново сверху
+        fallen = pos[:, 1] < self._ground_under(pos[:, 0], pos[:, 2], cx, cz) + self.floor
+        respawned = int(np.count_nonzero(fallen))
+        if respawned:
+            x = np.random.uniform(cx - self.area, cx + self.area, respawned)
+            z = np.random.uniform(cz - self.area, cz + self.area, respawned)
+            pos[fallen, 0] = x
+            pos[fallen, 1] = self._ground_under(x, z, cx, cz) + np.random.uniform(*self.height, respawned)
+            pos[fallen, 2] = z
+
+        right = np.array(camera.right, dtype=np.float32)
+        up = np.array(camera.up, dtype=np.float32)
+        buffer = build_billboards(pos, self.sizes, self.colors, right, up)
+        upload_billboards(self.mesh, buffer, self._indices)